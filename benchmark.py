@@ -0,0 +1,287 @@
+"""!
+@file benchmark.py
+@brief Benchmark reprodutível do caminho receção -> processamento -> desenho.
+@details Abre a MainWindow em modo offscreen (QT_QPA_PLATFORM=offscreen),
+         gera carga com o GeradorCarga do test_sender.py e mede:
+         - débito: amostras/s e datagramas/s recebidos e processados;
+         - perdas: amostras enviadas que não chegaram ao processamento;
+         - latência ponta-a-ponta (percentis), do envio até ao processamento
+           e do envio até ao frame que desenha a amostra;
+         - tempo de cada frame da interface (renderizar_frame).
+
+         Modos:
+         - udp (padrão): datagramas reais para o UDPListener da janela, numa
+           porta própria (não interfere com um monitor já a correr);
+         - direto: os pacotes entram por MainWindow.update_data(), sem rede,
+           para isolar o custo do processamento e do desenho.
+
+         O gerador corre no mesmo processo (e partilha o GIL com o listener e o
+         processamento); para medir só o monitor, corra o test_sender.py noutro
+         processo contra `python main.py`.
+
+         Exemplos:
+             python benchmark.py --taxa 20000 --sensores 50 --duracao 10
+             python benchmark.py --formato binario --por-datagrama 200 --taxa 200000
+             python benchmark.py --modo direto --taxa 0 --duracao 5
+"""
+
+import argparse
+import configparser
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from test_sender import GeradorCarga, FORMATO_JSON, FORMATO_BINARIO
+from src.configuracao import CONFIG_FILENAME, ALERTAS_FILENAME
+from src.wire_format import decodificar_datagrama
+
+MODO_UDP = 'udp'
+MODO_DIRETO = 'direto'
+DEFAULT_PORTA_BENCHMARK = 5099
+# Tempo (s) para a janela arrancar antes da carga e para escoar as filas depois
+AQUECIMENTO = 0.5
+TEMPO_MAXIMO_ESCOAMENTO = 5.0
+PERCENTIS = (50, 95, 99)
+
+
+class GeradorDireto(GeradorCarga):
+    """!
+    @brief GeradorCarga que entrega os pacotes a MainWindow.update_data() em vez de os enviar.
+    """
+
+    def __init__(self, destino, *args, **kwargs):
+        """!
+        @brief Construtor do GeradorDireto.
+        @param destino (callable): Recebe cada pacote (dict), ex: MainWindow.update_data.
+        """
+        super().__init__(*args, **kwargs)
+        self.entregar = destino
+
+    def enviar_um(self):
+        for data_dict in decodificar_datagrama(self.datagrama(), {}):
+            self.entregar(data_dict)
+        self.datagramas_enviados += 1
+
+
+def resumo(nome, valores_ms):
+    """!
+    @brief Formata mínimo, percentis e máximo de uma série de tempos.
+    @param nome (str): O nome da métrica.
+    @param valores_ms (list | numpy.ndarray): Os tempos em milissegundos.
+    @return (str): A linha do relatório.
+    """
+    valores_ms = np.asarray(valores_ms, dtype=np.float64)
+    if valores_ms.size == 0:
+        return f"{nome:<28} (sem amostras)"
+    partes = [f"p{p}={np.percentile(valores_ms, p):8.2f}" for p in PERCENTIS]
+    return (f"{nome:<28} n={valores_ms.size:<8d} mín={valores_ms.min():8.2f} "
+            f"{' '.join(partes)} máx={valores_ms.max():8.2f}  (ms)")
+
+
+def criar_config(pasta, porta):
+    """!
+    @brief Copia o config.ini para `pasta`, trocando a porta e desligando os endpoints extra.
+    @details O log de eventos de alerta também fica em `pasta`. O relay, os grupos
+             multicast e os serviços HTTP (métricas e consultas) são desligados,
+             para a carga sintética não sair da máquina nem chocar com uma
+             instância a correr.
+    @param pasta (str): A pasta temporária do benchmark.
+    @param porta (int): A porta UDP do benchmark.
+    @return (str): O caminho do config criado.
+    """
+    config = configparser.ConfigParser()
+    config.optionxform = str
+    config.read(CONFIG_FILENAME, encoding='utf-8')
+    if not config.has_section('Network'):
+        config.add_section('Network')
+    config['Network']['UDP_IP'] = '127.0.0.1'
+    config['Network']['UDP_PORT'] = str(porta)
+    config['Network']['ENDPOINTS'] = ''
+    config['Network']['MULTICAST'] = ''
+    for secao, chave in (('Relay', 'DESTINOS'), ('Metricas', 'FICHEIRO'),
+                         ('Metricas', 'HTTP_PORTA'), ('Consultas', 'HTTP_PORTA')):
+        if config.has_section(secao):
+            config[secao][chave] = '0' if chave == 'HTTP_PORTA' else ''
+    if not config.has_section('Alertas'):
+        config.add_section('Alertas')
+    config['Alertas']['FICHEIRO_EVENTOS'] = os.path.join(pasta, ALERTAS_FILENAME)
+    caminho = os.path.join(pasta, 'config_benchmark.ini')
+    with open(caminho, 'w', encoding='utf-8') as f:
+        config.write(f)
+    return caminho
+
+
+class Benchmark:
+    """!
+    @brief Instrumenta uma MainWindow e corre uma carga contra ela.
+    """
+
+    def __init__(self, args, pasta):
+        """!
+        @brief Cria a janela (offscreen) e instala as medições.
+        @param args (argparse.Namespace): As opções da linha de comandos.
+        @param pasta (str): Pasta temporária (config e log automático).
+        """
+        from src.main_window import MainWindow
+
+        self.args = args
+        self.window = MainWindow(criar_config(pasta, args.porta))
+        self.window.show()
+        if args.log:
+            self.window.log_filename = os.path.join(pasta, os.path.basename(self.window.log_filename))
+            self.window.log_auto_checkbox.setChecked(True)
+
+        # --- Medições (listas só acrescentadas; lidas no fim) ---
+        self.lotes_processados = []   # (hora de fim do processamento, [ts_epoch, ...])
+        self.latencias_ecra = []      # ms entre o envio e o desenho da amostra mais recente
+        self.tempos_frame = []        # ms por renderizar_frame()
+        self._instrumentar()
+
+        if args.modo == MODO_DIRETO:
+            self.gerador = GeradorDireto(
+                self.window.update_data, taxa=args.taxa, n_sensores=args.sensores,
+                formato=args.formato, rajada=args.rajada, por_datagrama=args.por_datagrama
+            )
+        else:
+            self.gerador = GeradorCarga(
+                '127.0.0.1', args.porta, args.taxa, args.sensores, args.formato,
+                args.rajada, args.por_datagrama
+            )
+        self.thread_envio = None
+        self.inicio = self.fim_envio = None
+
+    def _instrumentar(self):
+        window = self.window
+        processor = window.processor
+
+        processar_lote = processor.processar_lote
+        def processar_lote_medido(lote):
+            processar_lote(lote)
+            self.lotes_processados.append((time.time(), [d.get('ts_epoch') for d in lote]))
+        processor.processar_lote = processar_lote_medido
+
+        desenhar_vista = window.desenhar_vista
+        def desenhar_vista_medido(vista):
+            desenhar_vista(vista)
+            if vista.sensor.tempo is not None:
+                self.latencias_ecra.append((time.time() - vista.sensor.tempo) * 1000.0)
+        window.desenhar_vista = desenhar_vista_medido
+
+        # O timer guardou o método original: volta a ligá-lo à versão medida
+        renderizar_frame = window.renderizar_frame
+        def renderizar_frame_medido():
+            t0 = time.perf_counter()
+            renderizar_frame()
+            self.tempos_frame.append((time.perf_counter() - t0) * 1000.0)
+        window.render_timer.timeout.disconnect()
+        window.render_timer.timeout.connect(renderizar_frame_medido)
+
+    def iniciar_carga(self):
+        """!
+        @brief Começa o envio numa thread (a thread da interface fica livre para desenhar).
+        """
+        self.inicio = time.perf_counter()
+        self.thread_envio = threading.Thread(
+            target=self.gerador.executar, kwargs={'duracao': self.args.duracao}, daemon=True
+        )
+        self.thread_envio.start()
+
+    def envio_terminado(self):
+        return self.thread_envio is not None and not self.thread_envio.is_alive()
+
+    def escoado(self):
+        """!
+        @brief True quando tudo o que foi enviado já foi processado (ou contado como inválido).
+        """
+        return self.window.processor.amostras_processadas + \
+            self.window.processor.amostras_invalidas >= self.gerador.amostras_enviadas
+
+    def relatorio(self):
+        """!
+        @brief Imprime os resultados do benchmark.
+        """
+        window = self.window
+        args = self.args
+        duracao = self.fim_envio - self.inicio
+        enviadas = self.gerador.amostras_enviadas
+        processadas = window.processor.amostras_processadas
+        perdidas = max(0, enviadas - processadas)
+
+        latencias = [
+            (fim - ts) * 1000.0
+            for fim, tempos in self.lotes_processados for ts in tempos if ts is not None
+        ]
+        print()
+        print(f"=== Benchmark ({args.modo}, {args.formato}, {args.sensores} sensores, "
+              f"taxa {args.taxa:g}/s, rajada {args.rajada}, {args.por_datagrama} por datagrama) ===")
+        print(f"Duração do envio:          {duracao:.2f} s")
+        print(f"Amostras enviadas:         {enviadas} ({enviadas / duracao:.0f}/s, "
+              f"{self.gerador.datagramas_enviados} datagramas, {self.gerador.erros_envio} erros de envio)")
+        if args.modo == MODO_UDP:
+            print(f"Datagramas recebidos:      {window.listener.pacotes_recebidos} "
+                  f"({window.listener.pacotes_malformados} malformados, "
+                  f"{window.listener.pacotes_descartados_kernel} perdidos no kernel)")
+        print(f"Amostras processadas:      {processadas} ({processadas / duracao:.0f}/s, "
+              f"{window.processor.amostras_invalidas} inválidas, "
+              f"{window.processor.lotes_descartados} lotes descartados na fila)")
+        print(f"Perdas:                    {perdidas} ({100.0 * perdidas / max(enviadas, 1):.2f}%)")
+        if window.log_writer is not None:
+            print(f"Log automático:            {window.log_writer.linhas_escritas} escritas, "
+                  f"{window.log_writer.linhas_descartadas} descartadas")
+        print(resumo("Latência até processamento", latencias))
+        print(resumo("Latência até ao ecrã", self.latencias_ecra))
+        print(resumo("Tempo de frame", self.tempos_frame))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do monitor de sensores (offscreen)")
+    parser.add_argument('--modo', choices=(MODO_UDP, MODO_DIRETO), default=MODO_UDP)
+    parser.add_argument('--porta', type=int, default=DEFAULT_PORTA_BENCHMARK)
+    parser.add_argument('--taxa', type=float, default=10000.0,
+                        help="Amostras por segundo, somando todos os sensores (0 = máximo)")
+    parser.add_argument('--sensores', type=int, default=10)
+    parser.add_argument('--formato', choices=(FORMATO_JSON, FORMATO_BINARIO), default=FORMATO_JSON)
+    parser.add_argument('--por-datagrama', type=int, default=1,
+                        help="Amostras por datagrama (só no formato binário)")
+    parser.add_argument('--rajada', type=int, default=1)
+    parser.add_argument('--duracao', type=float, default=5.0, help="Duração do envio em segundos")
+    parser.add_argument('--log', action='store_true', help="Liga o log automático (numa pasta temporária)")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QTimer
+
+    app = QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as pasta:
+        benchmark = Benchmark(args, pasta)
+
+        def verificar():
+            # Depois do envio, espera que as filas escoem (com limite de tempo)
+            if not benchmark.envio_terminado():
+                return
+            if benchmark.fim_envio is None:
+                benchmark.fim_envio = time.perf_counter()
+            if benchmark.escoado() or \
+                    time.perf_counter() - benchmark.fim_envio > TEMPO_MAXIMO_ESCOAMENTO:
+                # Um último frame para desenhar o que acabou de ser processado
+                benchmark.window.renderizar_frame()
+                timer.stop()
+                benchmark.window.close()
+                app.quit()
+
+        timer = QTimer()
+        timer.setInterval(50)
+        timer.timeout.connect(verificar)
+        QTimer.singleShot(int(AQUECIMENTO * 1000), benchmark.iniciar_carga)
+        timer.start()
+        app.exec()
+        benchmark.relatorio()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,29 +4,45 @@
 @details Este script inicializa a QApplication do PyQt6,
          cria a instância da MainWindow (a interface gráfica principal)
          e inicia o loop de eventos da aplicação.
+         Com `--headless`, corre apenas o coletor (receção, alertas e log
+         contínuo) sem interface gráfica, ver src/headless.py.
 """
 
+import argparse
 import sys
-from PyQt6.QtWidgets import QApplication
-from src.main_window import MainWindow 
 
 if __name__ == "__main__":
     """!
     @brief Função principal que executa a aplicação.
-    
+
     Cria a aplicação, instancia a janela principal (MainWindow),
     exibe-a e entra no loop de execução do Qt.
     """
-    
+
+    parser = argparse.ArgumentParser(description="Monitor de sensores UDP")
+    parser.add_argument('--headless', action='store_true',
+                        help="Corre só o coletor (sem interface gráfica)")
+    parser.add_argument('--config', default='config.ini',
+                        help="Caminho do ficheiro de configuração (padrão: config.ini)")
+    args = parser.parse_args()
+
+    if args.headless:
+        # Não importa QtWidgets/pyqtgraph: arranque rápido e pouca memória
+        from src.headless import executar
+        sys.exit(executar(sys.argv[:1], args.config))
+
+    from PyQt6.QtWidgets import QApplication
+    from src.main_window import MainWindow
+
     # 1. Cria a "aplicação"
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1])
 
     # 2. Cria a nossa janela principal
-    window = MainWindow()
+    window = MainWindow(args.config)
 
     # 3. Mostra a janela
     window.show()
 
     # 4. Inicia o loop da aplicação
     # (Faz o programa esperar por cliques, etc., e não fechar)
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
@@ -0,0 +1,200 @@
+"""!
+@file alertas.py
+@brief Motor de alertas com histerese e debounce, que só produz eventos nas transições.
+@details Cada sensor tem um estado (normal / em alerta). Um alerta começa quando
+         o valor sai de [limite_min, limite_max] (ou o declive passa o limite)
+         e só termina quando o valor volta a estar dentro da banda mais
+         estreita [limite_min + histerese, limite_max - histerese] (e o declive
+         abaixo do limite). Em ambos os sentidos a condição tem de se manter
+         durante `atraso` segundos de 'ts' antes da transição (debounce), por
+         isso um sensor com ruído à volta de um limite não alterna a cada pacote.
+         A histerese é limitada a FRACAO_MAXIMA_HISTERESE do intervalo entre os
+         limites: com uma margem maior a banda de fim ficaria vazia e o alerta
+         nunca terminaria.
+
+         Cada transição gera um EventoAlerta (início ou fim), que a interface e
+         o modo headless aplicam, e que pode ser gravado no log de eventos.
+"""
+
+# Valores padrão da histerese (unidades do sensor) e do debounce (s de 'ts')
+DEFAULT_HISTERESE = 0.5
+DEFAULT_ATRASO = 1.0
+# Máximo da histerese, em fração de (limite_max - limite_min): a banda de fim
+# do alerta fica sempre com pelo menos metade do intervalo entre os limites
+FRACAO_MAXIMA_HISTERESE = 0.25
+
+# Motivos de um alerta
+MOTIVO_MINIMO = 'minimo'
+MOTIVO_MAXIMO = 'maximo'
+MOTIVO_DECLIVE = 'declive'
+# Fim forçado (ex: os históricos foram limpos ao entrar/sair do replay)
+MOTIVO_LIMPEZA = 'limpeza'
+
+EVENTO_INICIO = 'inicio'
+EVENTO_FIM = 'fim'
+
+
+class EventoAlerta:
+    """!
+    @brief Uma transição de alerta de um sensor.
+    """
+    __slots__ = ('tempo', 'chave', 'nome', 'indice', 'inicio', 'motivo', 'valor', 'unidade')
+
+    def __init__(self, tempo, buffer, inicio, motivo, valor):
+        """!
+        @brief Construtor do EventoAlerta.
+        @param tempo (float): Timestamp (segundos desde a epoch) da amostra que causou a transição.
+        @param buffer (SensorBuffer): O buffer do sensor.
+        @param inicio (bool): True se o alerta começou, False se terminou.
+        @param motivo (str): MOTIVO_MINIMO, MOTIVO_MAXIMO, MOTIVO_DECLIVE ou MOTIVO_LIMPEZA.
+        @param valor (float): O valor da amostra.
+        """
+        self.tempo = tempo
+        self.chave = buffer.chave
+        self.nome = buffer.nome
+        self.indice = buffer.indice
+        self.inicio = inicio
+        self.motivo = motivo
+        self.valor = valor
+        self.unidade = buffer.unidade
+
+    @property
+    def evento(self):
+        """!
+        @brief O tipo do evento, como gravado no log.
+        @return (str): EVENTO_INICIO ou EVENTO_FIM.
+        """
+        return EVENTO_INICIO if self.inicio else EVENTO_FIM
+
+    def linha_log(self):
+        """!
+        @brief A linha do log de eventos (ver ALERTAS_HEADER em configuracao.py).
+        @return (list): [ts, group, sensor_id, evento, motivo, valor, unidade].
+        """
+        return [self.tempo, *self.chave, self.evento, self.motivo, self.valor, self.unidade]
+
+
+class EstadoAlerta:
+    """!
+    @brief Estado de alerta de um sensor (só usado pela thread de processamento).
+    """
+    __slots__ = ('ativo', 'motivo', 'pendente_desde')
+
+    def __init__(self):
+        self.ativo = False
+        self.motivo = None
+        # Timestamp desde o qual a condição pede a transição (None = nenhuma)
+        self.pendente_desde = None
+
+
+class MotorAlertas:
+    """!
+    @brief Avalia as amostras de cada sensor e devolve só as transições.
+    """
+
+    def __init__(self, limite_min, limite_max, histerese=DEFAULT_HISTERESE,
+                 atraso=DEFAULT_ATRASO, limite_declive=0.0):
+        """!
+        @brief Construtor do MotorAlertas.
+        @param limite_min (float): O limite mínimo.
+        @param limite_max (float): O limite máximo.
+        @param histerese (float): Margem (unidades) para dentro dos limites que o valor
+               tem de atingir para o alerta terminar.
+        @param atraso (float): Tempo (s de 'ts') que a condição tem de durar antes de cada transição.
+        @param limite_declive (float): Variação máxima em unidades/min (0 = sem alerta de declive).
+        """
+        # A histerese configurada; a usada (self.histerese) depende dos limites
+        self.histerese_pedida = max(0.0, histerese)
+        self.histerese = None
+        self.definir_limites(limite_min, limite_max)
+        self.atraso = max(0.0, atraso)
+        self.limite_declive = limite_declive
+        self._estados = {}
+
+    def definir_limites(self, limite_min, limite_max):
+        """!
+        @brief Atualiza os limites (aplicados a partir da próxima amostra).
+        @details Se a histerese pedida for maior do que FRACAO_MAXIMA_HISTERESE do
+                 intervalo entre os limites, é reduzida (com um aviso) até os limites
+                 voltarem a permitir o valor pedido.
+        @param limite_min (float): O limite mínimo.
+        @param limite_max (float): O limite máximo.
+        """
+        self.limites = (limite_min, limite_max)
+        histerese = min(self.histerese_pedida,
+                        max(0.0, (limite_max - limite_min) * FRACAO_MAXIMA_HISTERESE))
+        if histerese < self.histerese_pedida and histerese != self.histerese:
+            print(f"Aviso: histerese de {self.histerese_pedida} demasiado grande para os limites "
+                  f"{limite_min}-{limite_max}; a usar {histerese:g}.")
+        self.histerese = histerese
+
+    def estado(self, chave):
+        """!
+        @brief O estado atual de um sensor.
+        @param chave (tuple): O par (group, sensor_id).
+        @return (EstadoAlerta): O estado (None se o sensor ainda não foi avaliado).
+        """
+        return self._estados.get(chave)
+
+    def avaliar(self, buffer, tempos, valores, declive=None):
+        """!
+        @brief Avalia um lote de amostras de um sensor, por ordem.
+        @param buffer (SensorBuffer): O buffer do sensor (só lidos chave, nome, índice e unidade).
+        @param tempos (list): Timestamps das amostras.
+        @param valores (list): Valores alinhados com `tempos`.
+        @param declive (float): Declive atual (unidades/s) da janela mais curta, ou None.
+        @return (list): Os EventoAlerta das transições (normalmente vazia).
+        """
+        estado = self._estados.get(buffer.chave)
+        if estado is None:
+            estado = self._estados[buffer.chave] = EstadoAlerta()
+        limite_min, limite_max = self.limites
+        fim_min = limite_min + self.histerese
+        fim_max = limite_max - self.histerese
+        limite_declive = self.limite_declive / 60.0
+        declive_alto = limite_declive > 0 and declive is not None and abs(declive) > limite_declive
+        atraso = self.atraso
+
+        eventos = []
+        for tempo, valor in zip(tempos, valores):
+            # Motivo pelo qual o sensor deve estar em alerta (None = deve estar normal)
+            if estado.ativo:
+                if valor < fim_min:
+                    motivo = MOTIVO_MINIMO
+                elif valor > fim_max:
+                    motivo = MOTIVO_MAXIMO
+                else:
+                    motivo = MOTIVO_DECLIVE if declive_alto else None
+            elif valor < limite_min:
+                motivo = MOTIVO_MINIMO
+            elif valor > limite_max:
+                motivo = MOTIVO_MAXIMO
+            else:
+                motivo = MOTIVO_DECLIVE if declive_alto else None
+
+            if (motivo is not None) == estado.ativo:
+                estado.pendente_desde = None
+                if motivo is not None:
+                    estado.motivo = motivo
+                continue
+            if estado.pendente_desde is None:
+                estado.pendente_desde = tempo
+            if tempo - estado.pendente_desde < atraso:
+                continue
+
+            # Transição confirmada
+            estado.pendente_desde = None
+            estado.ativo = motivo is not None
+            if estado.ativo:
+                estado.motivo = motivo
+            eventos.append(EventoAlerta(tempo, buffer, estado.ativo, estado.motivo, valor))
+        return eventos
+
+    def limpar(self):
+        """!
+        @brief Esquece o estado de todos os sensores.
+        @return (list): As chaves dos sensores que estavam em alerta, com o motivo.
+        """
+        ativos = [(chave, estado.motivo) for chave, estado in self._estados.items() if estado.ativo]
+        self._estados.clear()
+        return ativos
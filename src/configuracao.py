@@ -0,0 +1,186 @@
+"""!
+@file configuracao.py
+@brief Leitura do config.ini, partilhada pela interface gráfica e pelo modo headless.
+@details Este módulo só depende da biblioteca padrão e de módulos sem widgets,
+         para que o coletor headless (src/headless.py) possa ler a mesma
+         configuração sem importar QtWidgets nem pyqtgraph.
+"""
+
+import configparser
+
+from src.udp_listener import DEFAULT_MAXIMO_LOTE, parse_endpoints
+from src.wire_format import parse_sensores_binarios
+from src.log_writer import (
+    DEFAULT_TAMANHO_FILA, DEFAULT_LINHAS_POR_FLUSH, DEFAULT_INTERVALO_FLUSH,
+    FORMATO_CSV, FORMATO_BINARIO
+)
+from src.processor import DEFAULT_TAMANHO_FILA as DEFAULT_TAMANHO_FILA_PROCESSAMENTO
+from src.metrics import DEFAULT_INTERVALO_FICHEIRO, DEFAULT_HTTP_IP
+from src.estatisticas import DEFAULT_JANELAS, parse_janelas
+from src.alertas import DEFAULT_HISTERESE, DEFAULT_ATRASO
+from src.consultas import DEFAULT_CONSULTAS_IP, DEFAULT_MAXIMO_PONTOS
+from src.relay import (
+    MODO_LOTE, DEFAULT_BYTES_DATAGRAMA, DEFAULT_INTERVALO_RELAY, DEFAULT_TTL_MULTICAST
+)
+from src.historico_niveis import (
+    DEFAULT_BRUTO_SEGUNDOS, DEFAULT_LARGURAS, DEFAULT_MEMORIA_MB, parse_larguras
+)
+
+# Máximo de leituras na tabela do sensor selecionado (scroll-back)
+DEFAULT_LINHAS_TABELA = 10000
+
+CONFIG_FILENAME = 'config.ini'
+
+# --- Constantes de Alerta (Valores Padrão) ---
+DEFAULT_TEMP_MIN = 15.0
+DEFAULT_TEMP_MAX = 30.0
+# ---------------------------------------------
+
+# Janela do histórico (em segundos de timestamp 'ts', não em número de amostras)
+DEFAULT_HISTORICO_SEGUNDOS = 60
+# Taxa máxima esperada por sensor; dimensiona o buffer (janela x taxa amostras)
+DEFAULT_TAXA_MAXIMA_HZ = 10
+
+# Frequência (frames/s) com que a UI é redesenhada, independente da taxa de pacotes
+DEFAULT_RENDER_FPS = 20
+# Intervalo (s) entre as linhas de estado do modo headless
+DEFAULT_INTERVALO_STATUS = 60.0
+
+LOG_FILENAME = "sensor_log_continuo.csv"
+# Ficheiro do log contínuo no formato binário colunar (FORMATO = binario)
+ARCHIVE_FILENAME = "sensor_log_continuo.slog"
+# Cabeçalho do CSV
+CSV_HEADER = ['ts', 'group', 'sensor_id', 'value', 'unit']
+# Log de eventos de alerta (uma linha por início/fim de alerta)
+ALERTAS_FILENAME = "alertas_eventos.csv"
+ALERTAS_HEADER = ['ts', 'group', 'sensor_id', 'evento', 'motivo', 'value', 'unit']
+
+
+class Configuracao:
+    """!
+    @brief Valores do config.ini já convertidos (com os valores padrão aplicados).
+    """
+
+    def __init__(self, filename=CONFIG_FILENAME):
+        """!
+        @brief Lê e valida o ficheiro de configuração.
+        @param filename (str): O caminho do ficheiro (por omissão, 'config.ini').
+        @exception KeyError Se faltar a secção [Network] ou UDP_IP/UDP_PORT.
+        @exception ValueError Se algum valor não estiver no formato esperado.
+        """
+        config = configparser.ConfigParser()
+        config.read(filename, encoding='utf-8')
+
+        # --- Rede ---
+        self.udp_ip = config['Network']['UDP_IP']
+        self.udp_port = int(config['Network']['UDP_PORT'])
+        self.udp_rcvbuf = config.getint('Network', 'RCVBUF_BYTES', fallback=0)
+        self.udp_maximo_lote = config.getint('Network', 'MAXIMO_LOTE', fallback=DEFAULT_MAXIMO_LOTE)
+        # Endpoints extra (ex: uma porta por linha de produção); vazio = só UDP_IP:UDP_PORT
+        self.udp_endpoints = parse_endpoints(config.get('Network', 'ENDPOINTS', fallback=''))
+        self.sensores_binarios = parse_sensores_binarios(
+            config['SensoresBinarios'] if config.has_section('SensoresBinarios') else {}
+        )
+        # Grupos multicast a escutar (ex: os datagramas de um relay); vazio = nenhum
+        self.udp_grupos_multicast = [
+            grupo.strip() for grupo in config.get('Network', 'MULTICAST', fallback='').split(',')
+            if grupo.strip()
+        ]
+
+        # --- Relay para outros monitores (argumentos do RelayUDP; vazio = desligado) ---
+        self.relay_destinos = parse_endpoints(config.get('Relay', 'DESTINOS', fallback=''))
+        self.config_relay = {
+            'modo': config.get('Relay', 'MODO', fallback=MODO_LOTE).strip().lower(),
+            'bytes_datagrama': config.getint('Relay', 'BYTES_DATAGRAMA', fallback=DEFAULT_BYTES_DATAGRAMA),
+            'intervalo': config.getfloat('Relay', 'INTERVALO_MS', fallback=DEFAULT_INTERVALO_RELAY * 1000) / 1000,
+            'ttl_multicast': config.getint('Relay', 'TTL_MULTICAST', fallback=DEFAULT_TTL_MULTICAST),
+        }
+
+        # --- Interface / Processamento ---
+        self.render_fps = config.getint('UI', 'RENDER_FPS', fallback=DEFAULT_RENDER_FPS)
+        self.linhas_tabela = max(1, config.getint('UI', 'LINHAS_TABELA', fallback=DEFAULT_LINHAS_TABELA))
+        self.tamanho_fila_processamento = config.getint(
+            'Processamento', 'TAMANHO_FILA', fallback=DEFAULT_TAMANHO_FILA_PROCESSAMENTO
+        )
+        self.limite_min = config.getfloat('Alertas', 'LIMITE_MIN', fallback=DEFAULT_TEMP_MIN)
+        self.limite_max = config.getfloat('Alertas', 'LIMITE_MAX', fallback=DEFAULT_TEMP_MAX)
+        # Variação máxima (unidades/min) na janela mais curta; 0 = sem alerta de declive
+        self.limite_declive = config.getfloat('Alertas', 'LIMITE_DECLIVE', fallback=0.0)
+        self.histerese = config.getfloat('Alertas', 'HISTERESE', fallback=DEFAULT_HISTERESE)
+        if self.histerese < 0:
+            print(f"Aviso: [Alertas] HISTERESE negativa ({self.histerese}); a usar 0.")
+            self.histerese = 0.0
+        self.atraso_alerta = config.getfloat('Alertas', 'ATRASO_S', fallback=DEFAULT_ATRASO)
+        # Ficheiro do log de eventos de alerta; vazio = não grava
+        self.ficheiro_eventos = config.get('Alertas', 'FICHEIRO_EVENTOS', fallback=ALERTAS_FILENAME).strip()
+
+        # --- Estatísticas móveis ---
+        self.janelas_estatisticas = parse_janelas(
+            config.get('Estatisticas', 'JANELAS_SEGUNDOS', fallback='')
+        ) or DEFAULT_JANELAS
+
+        # --- Histórico ---
+        self.historico_segundos = config.getfloat(
+            'Historico', 'JANELA_SEGUNDOS', fallback=DEFAULT_HISTORICO_SEGUNDOS
+        )
+        self.taxa_maxima_hz = config.getfloat('Historico', 'TAXA_MAXIMA_HZ', fallback=DEFAULT_TAXA_MAXIMA_HZ)
+        # Amostras brutas só nos últimos BRUTO_SEGUNDOS; antes disso, níveis agregados
+        self.bruto_segundos = config.getfloat('Historico', 'BRUTO_SEGUNDOS', fallback=DEFAULT_BRUTO_SEGUNDOS)
+        # Níveis agregados e orçamento de memória (argumentos do SensorRegistry)
+        self.config_historico = {
+            'janela_segundos': self.historico_segundos,
+            'larguras': parse_larguras(
+                config.get('Historico', 'NIVEIS_SEGUNDOS', fallback='')
+            ) or DEFAULT_LARGURAS,
+            'memoria_maxima': int(
+                config.getfloat('Historico', 'MEMORIA_MB', fallback=DEFAULT_MEMORIA_MB) * 1024 * 1024
+            ),
+        }
+
+        # --- Log contínuo (argumentos do LogWriter) ---
+        self.config_log = {
+            'tamanho_fila': config.getint('Log', 'TAMANHO_FILA', fallback=DEFAULT_TAMANHO_FILA),
+            'linhas_por_flush': config.getint('Log', 'LINHAS_POR_FLUSH', fallback=DEFAULT_LINHAS_POR_FLUSH),
+            'intervalo_flush': config.getfloat('Log', 'INTERVALO_FLUSH_S', fallback=DEFAULT_INTERVALO_FLUSH),
+            'formato': config.get('Log', 'FORMATO', fallback=FORMATO_CSV).strip().lower(),
+            'rotacao_bytes': int(config.getfloat('Log', 'ROTACAO_MB', fallback=0) * 1024 * 1024),
+            'rotacao_segundos': config.getfloat('Log', 'ROTACAO_HORAS', fallback=0) * 3600,
+        }
+        self.log_filename = ARCHIVE_FILENAME if self.config_log['formato'] == FORMATO_BINARIO else LOG_FILENAME
+
+        # --- Métricas de desempenho ---
+        self.metricas_painel = config.getboolean('Metricas', 'PAINEL', fallback=False)
+        self.metricas_ficheiro = config.get('Metricas', 'FICHEIRO', fallback='').strip()
+        self.metricas_intervalo = config.getfloat(
+            'Metricas', 'INTERVALO_FICHEIRO_S', fallback=DEFAULT_INTERVALO_FICHEIRO
+        )
+        self.metricas_http_ip = config.get('Metricas', 'HTTP_IP', fallback=DEFAULT_HTTP_IP).strip()
+        self.metricas_http_porta = config.getint('Metricas', 'HTTP_PORTA', fallback=0)
+
+        # --- Serviço local de consultas (src/consultas.py) ---
+        self.consultas_ip = config.get('Consultas', 'HTTP_IP', fallback=DEFAULT_CONSULTAS_IP).strip()
+        self.consultas_porta = config.getint('Consultas', 'HTTP_PORTA', fallback=0)
+        self.consultas_maximo_pontos = config.getint(
+            'Consultas', 'MAXIMO_PONTOS', fallback=DEFAULT_MAXIMO_PONTOS
+        )
+
+        # --- Modo headless ---
+        self.intervalo_status = config.getfloat(
+            'Headless', 'INTERVALO_STATUS_S', fallback=DEFAULT_INTERVALO_STATUS
+        )
+
+    def exportar_metricas(self):
+        """!
+        @brief Indica se as métricas devem ser exportadas (ficheiro e/ou HTTP).
+        @return (bool): True se FICHEIRO ou HTTP_PORTA estiverem definidos.
+        """
+        return bool(self.metricas_ficheiro) or self.metricas_http_porta > 0
+
+    def capacidade_historico(self, minimo=1):
+        """!
+        @brief Número de amostras brutas guardadas por sensor (min(janela, bruto) x taxa máxima).
+        @param minimo (int): Capacidade mínima (ex: o número de linhas da tabela).
+        @return (int): A capacidade do ring buffer de amostras brutas de cada sensor.
+        """
+        segundos = min(self.historico_segundos, self.bruto_segundos)
+        return max(minimo, int(segundos * self.taxa_maxima_hz))
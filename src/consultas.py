@@ -0,0 +1,251 @@
+"""!
+@file consultas.py
+@brief Serviço local de consultas (HTTP) aos buffers dos sensores em memória.
+@details Permite a outros processos da mesma máquina (ex: a ponte para o MES,
+         scripts) ler os dados já recebidos sem escutarem a porta UDP nem
+         seguirem o CSV. Pedidos GET, respostas em JSON:
+
+         - /sensores: todos os sensores, com o último valor e o estado de alerta;
+         - /ultimo?group=G&sensor_id=S: o último valor de um sensor;
+         - /intervalo?group=G&sensor_id=S&desde=T[&maximo=N]: as amostras com
+           'ts' > T (ver abaixo), por ordem; com `truncado` True há mais, e o
+           pedido seguinte pode continuar a partir do último 'ts' devolvido;
+         - /agregados?group=G&sensor_id=S[&desde=T]: as estatísticas móveis
+           (src/estatisticas.py) e, com `desde`, contagem/mín./máx./média desde T.
+
+         T é um timestamp ISO 8601 ou segundos desde a epoch; um número negativo
+         é relativo à última amostra do sensor (ex: desde=-60 = o último minuto).
+         Antes das amostras brutas, os dados vêm dos níveis agregados (um ponto
+         com a média de cada intervalo, ver src/historico_niveis.py).
+
+         Cada consulta copia o que precisa com o `registry.lock` (uma vista
+         coerente num instante) e só depois converte para JSON, fora do lock;
+         os pedidos são atendidos um a um na thread ServidorConsultas, por isso
+         o processamento e a interface nunca esperam por um cliente.
+"""
+
+import math
+from urllib.parse import urlsplit, parse_qs
+from PyQt6.QtCore import QThread
+
+from src.servidor_http import HandlerLocal, abrir_servidor
+from src.timestamps import ConversorTimestamp
+
+DEFAULT_CONSULTAS_IP = '127.0.0.1'
+# Máximo de amostras devolvidas por /intervalo (o cliente pode pedir menos com 'maximo')
+DEFAULT_MAXIMO_PONTOS = 100000
+
+
+class ErroConsulta(Exception):
+    """!
+    @brief Pedido inválido; `estado` é o código HTTP a devolver.
+    """
+
+    def __init__(self, estado, mensagem):
+        super().__init__(mensagem)
+        self.estado = estado
+
+
+class ConsultasSensores:
+    """!
+    @brief As consultas em si, sobre o SensorRegistry (sem nada de HTTP).
+    @details Todos os métodos devolvem estruturas prontas para json.dumps e
+             podem ser chamados de qualquer thread.
+    """
+
+    def __init__(self, registry, maximo_pontos=DEFAULT_MAXIMO_PONTOS):
+        """!
+        @brief Construtor do ConsultasSensores.
+        @param registry (SensorRegistry): O registo dos sensores.
+        @param maximo_pontos (int): Máximo de amostras devolvidas por intervalo().
+        """
+        self.registry = registry
+        self.maximo_pontos = max(1, int(maximo_pontos))
+        self.conversor = ConversorTimestamp()
+
+    def _estado(self, buffer):
+        # Último estado de um sensor (lido com o lock)
+        return {
+            'group': buffer.group,
+            'sensor_id': buffer.sensor_id,
+            'unit': buffer.unidade,
+            'ts_epoch': buffer.ultimo_tempo,
+            'value': buffer.ultimo_valor,
+            'em_alerta': buffer.em_alerta,
+            'total_amostras': buffer.total_amostras,
+        }
+
+    def _com_iso(self, estado):
+        if estado['ts_epoch'] is not None:
+            estado['ts'] = self.conversor.para_iso(estado['ts_epoch'])
+        return estado
+
+    def _buffer(self, chave):
+        # Chamado com o lock
+        buffer = self.registry.get(chave)
+        if buffer is None or buffer.ultimo_tempo is None:
+            raise ErroConsulta(404, f"Sensor desconhecido: {chave[0]} / {chave[1]}")
+        return buffer
+
+    def _tempo(self, texto, ultimo_tempo):
+        try:
+            tempo = float(texto)
+        except ValueError:
+            tempo = self.conversor.para_epoch(texto)
+            if tempo is None:
+                raise ErroConsulta(400, f"Timestamp inválido: {texto}")
+        if not math.isfinite(tempo):
+            raise ErroConsulta(400, f"Timestamp inválido: {texto}")
+        return ultimo_tempo + tempo if tempo < 0 else tempo
+
+    def sensores(self):
+        """!
+        @brief O último estado de todos os sensores, pela ordem de criação.
+        @return (list): Um dict por sensor.
+        """
+        with self.registry.lock:
+            estados = [self._estado(buffer) for buffer in self.registry]
+        return [self._com_iso(estado) for estado in estados]
+
+    def ultimo(self, chave):
+        """!
+        @brief O último estado de um sensor.
+        @param chave (tuple): O par (group, sensor_id).
+        @return (dict): O estado.
+        @exception ErroConsulta Se o sensor não existir.
+        """
+        with self.registry.lock:
+            estado = self._estado(self._buffer(chave))
+        return self._com_iso(estado)
+
+    def intervalo(self, chave, desde, maximo=None):
+        """!
+        @brief As amostras de um sensor com 'ts' posterior a `desde`.
+        @param chave (tuple): O par (group, sensor_id).
+        @param desde (str): O timestamp (exclusivo), ISO 8601 ou número (negativo = relativo).
+        @param maximo (int): Máximo de amostras (None = maximo_pontos); devolve as mais antigas.
+        @return (dict): 'ts_epoch' e 'value' (listas alinhadas), 'unit' e 'truncado'.
+        @exception ErroConsulta Se o sensor não existir ou `desde` for inválido.
+        """
+        maximo = self.maximo_pontos if maximo is None else max(1, min(maximo, self.maximo_pontos))
+        with self.registry.lock:
+            buffer = self._buffer(chave)
+            t_inicio = self._tempo(desde, buffer.ultimo_tempo)
+            # 'desde' é exclusivo: um cliente pode continuar a partir do último 'ts' recebido.
+            # Só a fatia devolvida é copiada com o lock
+            tempos, valores, truncado = buffer.historico.depois_de(t_inicio, maximo)
+            unidade = buffer.unidade
+        return {'group': chave[0], 'sensor_id': chave[1], 'unit': unidade,
+                'ts_epoch': tempos.tolist(), 'value': valores.tolist(), 'truncado': truncado}
+
+    def agregados(self, chave, desde=None):
+        """!
+        @brief As estatísticas móveis de um sensor e, opcionalmente, os agregados desde `desde`.
+        @param chave (tuple): O par (group, sensor_id).
+        @param desde (str): O timestamp inicial (None = só as estatísticas móveis).
+        @return (dict): 'janelas' (uma por janela móvel) e, com `desde`, 'desde'.
+        @exception ErroConsulta Se o sensor não existir ou `desde` for inválido.
+        """
+        with self.registry.lock:
+            buffer = self._buffer(chave)
+            resumos = buffer.estatisticas
+            unidade = buffer.unidade
+            if desde is not None:
+                t_inicio = self._tempo(desde, buffer.ultimo_tempo)
+                contagem, minimo, maximo, media = buffer.historico.agregar(t_inicio)
+        resposta = {
+            'group': chave[0], 'sensor_id': chave[1], 'unit': unidade,
+            'janelas': [{
+                'segundos': resumo.segundos, 'n': resumo.n, 'minimo': resumo.minimo,
+                'maximo': resumo.maximo, 'media': resumo.media, 'desvio': resumo.desvio,
+                # Em unidades/min, como o limite de declive
+                'declive': None if resumo.declive is None else resumo.declive * 60.0,
+            } for resumo in resumos],
+        }
+        if desde is not None:
+            resposta['desde'] = {'ts_epoch': t_inicio, 'n': contagem, 'minimo': minimo,
+                                 'maximo': maximo, 'media': media}
+        return resposta
+
+
+class _ConsultasHandler(HandlerLocal):
+    """!
+    @brief Encaminha cada GET para o método de ConsultasSensores correspondente.
+    """
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+        consultas = self.server.consultas
+        try:
+            if url.path == '/sensores':
+                resposta = consultas.sensores()
+            elif url.path in ('/ultimo', '/intervalo', '/agregados'):
+                if 'group' not in parametros or 'sensor_id' not in parametros:
+                    raise ErroConsulta(400, "Faltam os parâmetros 'group' e 'sensor_id'")
+                chave = (parametros['group'], parametros['sensor_id'])
+                if url.path == '/ultimo':
+                    resposta = consultas.ultimo(chave)
+                elif url.path == '/agregados':
+                    resposta = consultas.agregados(chave, parametros.get('desde'))
+                else:
+                    if 'desde' not in parametros:
+                        raise ErroConsulta(400, "Falta o parâmetro 'desde'")
+                    try:
+                        maximo = int(parametros['maximo']) if 'maximo' in parametros else None
+                    except ValueError:
+                        raise ErroConsulta(400, f"'maximo' inválido: {parametros['maximo']}")
+                    resposta = consultas.intervalo(chave, parametros['desde'], maximo)
+            else:
+                raise ErroConsulta(404, f"Consulta desconhecida: {url.path}")
+            estado = 200
+        except ErroConsulta as e:
+            estado = e.estado
+            resposta = {'erro': str(e)}
+        self.responder_json(estado, resposta)
+
+
+class ServidorConsultas(QThread):
+    """!
+    @brief Thread que atende as consultas HTTP locais.
+    """
+
+    def __init__(self, registry, http_ip=DEFAULT_CONSULTAS_IP, http_porta=0,
+                 maximo_pontos=DEFAULT_MAXIMO_PONTOS, parent=None):
+        """!
+        @brief Construtor do ServidorConsultas.
+        @param registry (SensorRegistry): O registo dos sensores.
+        @param http_ip (str): IP do servidor (use 127.0.0.1 para ficar só local).
+        @param http_porta (int): Porta do servidor.
+        @param maximo_pontos (int): Máximo de amostras devolvidas por /intervalo.
+        @param parent (QObject): O objeto pai do Qt (opcional).
+        """
+        super().__init__(parent)
+        self.consultas = ConsultasSensores(registry, maximo_pontos)
+        self.http_ip = http_ip
+        self.http_porta = http_porta
+        self.running = True
+
+    def run(self):
+        """!
+        @brief O "coração" da thread, executado quando .start() é chamado.
+        @details Atende os pedidos HTTP (com timeout, para verificar 'running').
+        """
+        servidor = abrir_servidor(self.http_ip, self.http_porta, _ConsultasHandler,
+                                  "o serviço de consultas", "Consultas", "/sensores",
+                                  consultas=self.consultas)
+        if servidor is None:
+            return
+        try:
+            while self.running:
+                servidor.handle_request()
+        finally:
+            servidor.server_close()
+        print("Thread de consultas terminada.")
+
+    def stop(self):
+        """!
+        @brief Pára a thread (no máximo INTERVALO_ESPERA segundos depois, ou
+               TEMPO_MAXIMO_CLIENTE se estiver a atender um pedido; ver src/servidor_http.py).
+        """
+        self.running = False
@@ -0,0 +1,103 @@
+"""!
+@file decimation.py
+@brief Decimação min/max por coluna de pixel para o gráfico histórico.
+@details Com janelas longas (horas/dias) o número de amostras é muito maior
+         do que o número de pixels do gráfico. O DecimadorMinMax reduz a série
+         a dois pontos (mínimo e máximo) por coluna de pixel, preservando os
+         picos, e guarda em cache as colunas já fechadas: a cada frame só as
+         amostras novas são processadas, independentemente do tamanho da janela.
+"""
+
+import numpy as np
+
+
+class DecimadorMinMax:
+    """!
+    @brief Decimação incremental min/max de uma série temporal (uma por curva).
+    @details As colunas ("bins") têm largura fixa em segundos (janela / número de
+             colunas) e estão alinhadas à epoch, por isso uma coluna fechada nunca
+             muda e pode ficar em cache. Assume timestamps não decrescentes; uma
+             amostra atrasada é contada na coluna ainda aberta.
+    """
+
+    def __init__(self, janela_segundos):
+        """!
+        @brief Construtor do DecimadorMinMax.
+        @param janela_segundos (float): Duração da janela visível do gráfico.
+        """
+        self.janela = float(janela_segundos)
+        self.n_colunas = 0
+        self.largura = 0.0
+        self.limpar()
+
+    def limpar(self):
+        """!
+        @brief Descarta a cache (ex: quando a largura do gráfico muda).
+        """
+        self._bins = np.empty(0, dtype=np.int64)
+        self._mins = np.empty(0, dtype=np.float64)
+        self._maxs = np.empty(0, dtype=np.float64)
+        # Timestamp da primeira amostra da coluna aberta (a reprocessar)
+        self._inicio_aberto = -np.inf
+
+    def memoria(self):
+        """!
+        @brief Memória ocupada pela cache das colunas fechadas.
+        @return (int): Bytes alocados.
+        """
+        return self._bins.nbytes + self._mins.nbytes + self._maxs.nbytes
+
+    def decimar(self, tempos, valores, n_colunas):
+        """!
+        @brief Reduz a série a no máximo 2 pontos por coluna de pixel.
+        @details Se a série já couber em 2 * n_colunas pontos, é devolvida
+                 sem alterações (as mesmas views, sem cópia).
+        @param tempos (numpy.ndarray): Timestamps da janela, em ordem crescente.
+        @param valores (numpy.ndarray): Valores alinhados com `tempos`.
+        @param n_colunas (int): Largura do gráfico, em pixels.
+        @return (tuple): O par (x, y) de arrays a desenhar.
+        """
+        n_colunas = max(1, int(n_colunas))
+        if len(valores) <= 2 * n_colunas:
+            return tempos, valores
+        if n_colunas != self.n_colunas:
+            self.n_colunas = n_colunas
+            self.largura = self.janela / n_colunas
+            self.limpar()
+
+        # --- 1. Só as amostras da coluna aberta em diante são (re)processadas ---
+        inicio = np.searchsorted(tempos, self._inicio_aberto, side='left')
+        t = tempos[inicio:]
+        v = valores[inicio:]
+        if len(v) > 0:
+            ids = np.floor(t / self.largura).astype(np.int64)
+            np.maximum.accumulate(ids, out=ids)
+            cortes = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+            bins = ids[cortes]
+            mins = np.minimum.reduceat(v, cortes)
+            maxs = np.maximum.reduceat(v, cortes)
+
+            # --- 2. Todas as colunas menos a última estão fechadas: vão para a cache ---
+            self._bins = np.concatenate((self._bins, bins[:-1]))
+            self._mins = np.concatenate((self._mins, mins[:-1]))
+            self._maxs = np.concatenate((self._maxs, maxs[:-1]))
+            self._inicio_aberto = t[cortes[-1]]
+            aberto = (bins[-1:], mins[-1:], maxs[-1:])
+        else:
+            aberto = (self._bins[:0], self._mins[:0], self._maxs[:0])
+
+        # --- 3. Descarta as colunas que saíram da janela ---
+        primeiro_bin = np.floor((tempos[-1] - self.janela) / self.largura)
+        descartar = np.searchsorted(self._bins, primeiro_bin, side='left')
+        if descartar:
+            self._bins = self._bins[descartar:]
+            self._mins = self._mins[descartar:]
+            self._maxs = self._maxs[descartar:]
+
+        # --- 4. Dois pontos (mín., máx.) no centro de cada coluna ---
+        bins = np.concatenate((self._bins, aberto[0]))
+        x = np.repeat((bins + 0.5) * self.largura, 2)
+        y = np.empty(len(x), dtype=np.float64)
+        y[0::2] = np.concatenate((self._mins, aberto[1]))
+        y[1::2] = np.concatenate((self._maxs, aberto[2]))
+        return x, y
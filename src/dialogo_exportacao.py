@@ -0,0 +1,125 @@
+"""!
+@file dialogo_exportacao.py
+@brief Diálogo que escolhe o que exportar: origem, sensores e intervalo de tempo.
+@details A escrita em si é feita pela ExportThread (src/exportacao.py).
+"""
+
+from PyQt6.QtWidgets import (
+    QDialog, QFormLayout, QComboBox, QListWidget, QListWidgetItem,
+    QDateTimeEdit, QDialogButtonBox, QLabel
+)
+from PyQt6.QtCore import Qt, QDateTime, QTimeZone
+
+ORIGEM_MEMORIA = 'memoria'
+ORIGEM_LOG = 'log'
+FORMATO_DATA_HORA = "yyyy-MM-dd HH:mm:ss"
+NOTA_MEMORIA = ("Antes das amostras recentes em bruto, cada linha é a média de um intervalo "
+                "agregado; a coluna 'agregado_s' tem a largura do intervalo (vazia nas amostras brutas).")
+
+
+def _para_qdatetime(tempo):
+    return QDateTime.fromMSecsSinceEpoch(int(tempo * 1000), QTimeZone.utc())
+
+
+class DialogoExportacao(QDialog):
+    """!
+    @brief Pede a origem (histórico em memória ou log contínuo), os sensores e o intervalo.
+    """
+
+    def __init__(self, sensores, selecionado, intervalo_memoria, intervalo_log, descricao_memoria, parent=None):
+        """!
+        @brief Construtor do DialogoExportacao.
+        @param sensores (list): Pares (nome, chave) de todos os sensores conhecidos.
+        @param selecionado (tuple): A chave do sensor marcado por omissão (ou None).
+        @param intervalo_memoria (tuple): (t_inicio, t_fim) do histórico em memória.
+        @param intervalo_log (tuple): (t_inicio, t_fim) do log contínuo, ou None se não houver log.
+        @param descricao_memoria (str): Texto da origem "memória" (ex: "Histórico em memória (60s)").
+        @param parent (QWidget): A janela pai.
+        """
+        super().__init__(parent)
+        self.setWindowTitle("Exportar CSV")
+        self.intervalos = {ORIGEM_MEMORIA: intervalo_memoria, ORIGEM_LOG: intervalo_log}
+        layout = QFormLayout(self)
+
+        self.combo_origem = QComboBox()
+        self.combo_origem.addItem(descricao_memoria, ORIGEM_MEMORIA)
+        if intervalo_log is not None:
+            self.combo_origem.addItem("Log contínuo (ficheiros gravados)", ORIGEM_LOG)
+        self.combo_origem.currentIndexChanged.connect(self.on_origem_mudou)
+        layout.addRow("Origem:", self.combo_origem)
+
+        self.lista_sensores = QListWidget()
+        # Só no log: sem filtro, incluindo os sensores que já não estão em memória
+        # (a lista deles sai do próprio log, lido pela ExportThread)
+        self.item_todos = None
+        if intervalo_log is not None:
+            self.item_todos = QListWidgetItem("Todos os sensores gravados no log")
+            self.item_todos.setCheckState(Qt.CheckState.Unchecked)
+            self.lista_sensores.addItem(self.item_todos)
+        for nome, chave in sensores:
+            item = QListWidgetItem(nome)
+            item.setData(Qt.ItemDataRole.UserRole, chave)
+            item.setCheckState(Qt.CheckState.Checked if chave == selecionado else Qt.CheckState.Unchecked)
+            self.lista_sensores.addItem(item)
+        layout.addRow("Sensores:", self.lista_sensores)
+
+        # Datas em UTC, como os timestamps 'ts'
+        self.edit_inicio = QDateTimeEdit()
+        self.edit_fim = QDateTimeEdit()
+        for edit in (self.edit_inicio, self.edit_fim):
+            edit.setTimeZone(QTimeZone.utc())
+            edit.setDisplayFormat(FORMATO_DATA_HORA)
+            edit.setCalendarPopup(True)
+        layout.addRow("Início (UTC):", self.edit_inicio)
+        layout.addRow("Fim (UTC):", self.edit_fim)
+
+        self.label_nota = QLabel()
+        self.label_nota.setWordWrap(True)
+        layout.addRow(self.label_nota)
+
+        botoes = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        botoes.accepted.connect(self.accept)
+        botoes.rejected.connect(self.reject)
+        layout.addRow(botoes)
+        self.on_origem_mudou()
+
+    def on_origem_mudou(self, indice=None):
+        """!
+        @brief Slot: Repõe o intervalo completo (e a nota) da origem escolhida.
+        @param indice (int): O índice escolhido no combo (ignorado).
+        """
+        if self.item_todos is not None:
+            self.item_todos.setHidden(self.origem() != ORIGEM_LOG)
+        self.label_nota.setText(NOTA_MEMORIA if self.origem() == ORIGEM_MEMORIA else "")
+        t_inicio, t_fim = self.intervalos[self.origem()]
+        self.edit_inicio.setDateTime(_para_qdatetime(t_inicio))
+        # O fim é arredondado para cima (o editor não mostra frações de segundo)
+        self.edit_fim.setDateTime(_para_qdatetime(int(t_fim) + 1))
+
+    def origem(self):
+        """!
+        @return (str): ORIGEM_MEMORIA ou ORIGEM_LOG.
+        """
+        return self.combo_origem.currentData()
+
+    def intervalo(self):
+        """!
+        @return (tuple): (t_inicio, t_fim) escolhidos, em segundos desde a epoch.
+        """
+        return (self.edit_inicio.dateTime().toMSecsSinceEpoch() / 1000.0,
+                self.edit_fim.dateTime().toMSecsSinceEpoch() / 1000.0)
+
+    def chaves(self):
+        """!
+        @return (list | None): As chaves (group, sensor_id) dos sensores marcados, ou
+                None para todos os sensores do log ("Todos os sensores gravados no log").
+        """
+        if self.origem() == ORIGEM_LOG and self.item_todos.checkState() == Qt.CheckState.Checked:
+            return None
+        return [
+            item.data(Qt.ItemDataRole.UserRole)
+            for item in map(self.lista_sensores.item, range(self.lista_sensores.count()))
+            if item is not self.item_todos and item.checkState() == Qt.CheckState.Checked
+        ]
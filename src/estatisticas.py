@@ -0,0 +1,402 @@
+"""!
+@file estatisticas.py
+@brief Estatísticas móveis por sensor (mín., máx., média, desvio padrão e declive).
+@details Cada JanelaMovel cobre os últimos N segundos de timestamp ('ts'),
+         terminando na amostra mais recente do sensor (como o gráfico). Tudo é
+         atualizado de forma incremental, sem voltar a percorrer a janela:
+         - média, variância e declive (regressão linear valor ~ tempo) por
+           acumuladores de Welford (momentos centrados), somados e subtraídos
+           lote a lote com as fórmulas de combinação de Chan;
+         - mínimo e máximo por filas monótonas (deques) de índices de amostras.
+         As amostras são guardadas uma só vez por sensor, em arrays numpy do
+         tamanho da janela mais longa (AmostrasSensor); cada janela guarda só o
+         índice da sua primeira amostra, os acumuladores e as duas filas
+         monótonas. O custo amortizado é O(1) por amostra e por janela, e cada
+         resumo é O(1). As amostras de um sensor devem chegar por ordem de 'ts';
+         uma amostra atrasada é contada, mas pode expirar um pouco antes ou
+         depois do devido.
+
+         Este módulo só depende da biblioteca padrão e do numpy (é usado
+         também pelo modo headless).
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+
+# Janelas (s) calculadas para cada sensor: 1 min, 15 min e 1 h
+DEFAULT_JANELAS = (60.0, 900.0, 3600.0)
+# Lotes (por sensor) menores do que isto são somados/subtraídos amostra a amostra, sem numpy
+LOTE_MINIMO_NUMPY = 16
+# Capacidade inicial dos arrays do AmostrasSensor e folga ao realocar (vivas x FOLGA_AMOSTRAS)
+CAPACIDADE_INICIAL = 256
+FOLGA_AMOSTRAS = 1.5
+# Memória (bytes) de cada índice numa fila monótona (int do Python + ponteiro no deque)
+BYTES_POR_INDICE = 36
+# Subtrações (em amostras) acima das quais os acumuladores são recalculados
+# de raiz, para o erro de arredondamento não se acumular
+RECALCULO_MINIMO = 100000
+
+
+def parse_janelas(texto):
+    """!
+    @brief Lê uma lista de janelas em segundos (ex: "60, 900, 3600").
+    @param texto (str): As durações separadas por vírgulas.
+    @return (tuple): As durações (float), sem repetições, por ordem crescente.
+    @exception ValueError Se alguma duração não for um número positivo.
+    """
+    janelas = sorted({float(parte) for parte in texto.split(',') if parte.strip()})
+    if any(janela <= 0 for janela in janelas):
+        raise ValueError(f"Janelas de estatística inválidas: {texto}")
+    return tuple(janelas)
+
+
+def _momentos(tempos, valores):
+    # (n, média t, média v, M2 t, M2 v, C tv) de um lote
+    n = len(valores)
+    media_t = tempos.mean()
+    media_v = valores.mean()
+    dt = tempos - media_t
+    dv = valores - media_v
+    return n, media_t, media_v, float(dt @ dt), float(dv @ dv), float(dt @ dv)
+
+
+def _candidatos(valores, inicio):
+    # Índices (absolutos) das amostras do lote que podem entrar nas filas
+    # monótonas: as menores (maiores) do que todas as seguintes do lote
+    ultimo = len(valores) - 1
+    resultado = []
+    for acumular, comparar in ((np.minimum, np.less), (np.maximum, np.greater)):
+        seguintes = acumular.accumulate(valores[::-1])[::-1]
+        mascara = np.empty(len(valores), dtype=bool)
+        comparar(valores[:-1], seguintes[1:], out=mascara[:-1])
+        mascara[ultimo] = True
+        resultado.append((np.flatnonzero(mascara) + inicio).tolist())
+    return resultado
+
+
+def _candidatos_lista(valores, inicio):
+    # O mesmo que _candidatos, em Python puro, para lotes pequenos
+    minimos, maximos = [], []
+    menor = maior = None
+    for i in range(len(valores) - 1, -1, -1):
+        valor = valores[i]
+        if menor is None or valor < menor:
+            minimos.append(inicio + i)
+            menor = valor
+        if maior is None or valor > maior:
+            maximos.append(inicio + i)
+            maior = valor
+    minimos.reverse()
+    maximos.reverse()
+    return minimos, maximos
+
+
+def _momentos_lista(tempos, valores):
+    # O mesmo que _momentos, em Python puro (Welford), para lotes pequenos
+    n = 0
+    media_t = media_v = m2_t = m2_v = c_tv = 0.0
+    for tempo, valor in zip(tempos, valores):
+        n += 1
+        dt = tempo - media_t
+        dv = valor - media_v
+        media_t += dt / n
+        media_v += dv / n
+        m2_t += dt * (tempo - media_t)
+        m2_v += dv * (valor - media_v)
+        c_tv += dt * (valor - media_v)
+    return n, media_t, media_v, m2_t, m2_v, c_tv
+
+
+class ResumoJanela:
+    """!
+    @brief Estatísticas de uma janela num instante (imutável, copiado para a interface).
+    """
+    __slots__ = ('segundos', 'n', 'minimo', 'maximo', 'media', 'desvio', 'declive')
+
+    def __init__(self, segundos, n, minimo, maximo, media, desvio, declive):
+        """!
+        @brief Construtor do ResumoJanela.
+        @param segundos (float): A duração da janela.
+        @param n (int): O número de amostras na janela.
+        @param minimo (float): O menor valor (None se vazia).
+        @param maximo (float): O maior valor (None se vazia).
+        @param media (float): A média (None se vazia).
+        @param desvio (float): O desvio padrão amostral (0 com menos de 2 amostras).
+        @param declive (float): Taxa de variação em unidades por segundo (None se indefinida).
+        """
+        self.segundos = segundos
+        self.n = n
+        self.minimo = minimo
+        self.maximo = maximo
+        self.media = media
+        self.desvio = desvio
+        self.declive = declive
+
+
+class AmostrasSensor:
+    """!
+    @brief As amostras de um sensor na janela mais longa, partilhadas por todas as janelas.
+    @details Dois arrays float64 (tempos relativos e valores) que crescem e
+             encolhem com as amostras vivas: quando enchem, as amostras que já
+             saíram da janela mais longa são descartadas e o resto é copiado
+             para o início (ou para arrays realocados com FOLGA_AMOSTRAS de
+             folga), em O(1) amortizado por amostra. As amostras são
+             identificadas por um índice absoluto (a posição no array mais
+             `base`), que não muda ao compactar.
+    """
+
+    def __init__(self):
+        """!
+        @brief Construtor do AmostrasSensor.
+        """
+        self.base = 0   # Índice absoluto da posição 0
+        self.fim = 0    # Posições ocupadas
+        self.tempos = np.empty(CAPACIDADE_INICIAL, dtype=np.float64)
+        self.valores = np.empty(CAPACIDADE_INICIAL, dtype=np.float64)
+
+    @property
+    def indice_fim(self):
+        """!
+        @return (int): O índice absoluto da próxima amostra.
+        """
+        return self.base + self.fim
+
+    def _compactar(self, manter_desde, n):
+        # Descarta as amostras antes de `manter_desde` e garante espaço para mais `n`
+        inicio = min(max(0, manter_desde - self.base), self.fim)
+        vivas = self.fim - inicio
+        capacidade = max(CAPACIDADE_INICIAL, int((vivas + n) * FOLGA_AMOSTRAS))
+        tempos, valores = self.tempos, self.valores
+        if capacidade != len(tempos):
+            self.tempos = np.empty(capacidade, dtype=np.float64)
+            self.valores = np.empty(capacidade, dtype=np.float64)
+        self.tempos[:vivas] = tempos[inicio:self.fim]
+        self.valores[:vivas] = valores[inicio:self.fim]
+        self.base += inicio
+        self.fim = vivas
+
+    def acrescentar(self, tempos, valores, manter_desde):
+        """!
+        @brief Acrescenta amostras no fim.
+        @param tempos (list | numpy.ndarray): Tempos relativos, por ordem crescente.
+        @param valores (list | numpy.ndarray): Valores alinhados com `tempos`.
+        @param manter_desde (int): Índice absoluto da amostra mais antiga ainda
+                                   usada (o início da janela mais longa).
+        """
+        n = len(valores)
+        if self.fim + n > len(self.tempos):
+            self._compactar(manter_desde, n)
+        p = self.fim
+        self.tempos[p:p + n] = tempos
+        self.valores[p:p + n] = valores
+        self.fim = p + n
+
+    def valor(self, indice):
+        """!
+        @brief O valor da amostra com o índice absoluto `indice`.
+        @param indice (int): O índice absoluto (ainda guardado).
+        @return (float): O valor.
+        """
+        return float(self.valores[indice - self.base])
+
+    def memoria(self):
+        """!
+        @brief Memória ocupada pelos arrays.
+        @return (int): Bytes alocados.
+        """
+        return self.tempos.nbytes + self.valores.nbytes
+
+
+class JanelaMovel:
+    """!
+    @brief Estatísticas incrementais dos últimos `segundos` de um sensor.
+    @details A janela não guarda amostras: só o índice (absoluto) da primeira
+             amostra dentro dela no AmostrasSensor partilhado, os acumuladores
+             e duas filas monótonas de índices. Na fila dos mínimos os valores
+             são estritamente crescentes (cada amostra nova retira do fim as que
+             não são menores do que ela) e a frente é o mínimo da janela; a dos
+             máximos é simétrica. Cada índice entra e sai de cada fila uma vez.
+    """
+
+    def __init__(self, segundos, amostras):
+        """!
+        @brief Construtor da JanelaMovel.
+        @param segundos (float): A duração da janela, em segundos de 'ts'.
+        @param amostras (AmostrasSensor): As amostras do sensor.
+        """
+        self.segundos = float(segundos)
+        self.amostras = amostras
+        self.inicio = amostras.indice_fim
+        self._minimos = deque()
+        self._maximos = deque()
+        self._zerar()
+
+    def _zerar(self):
+        self.n = 0
+        self._media_t = self._media_v = 0.0
+        self._m2_t = self._m2_v = self._c_tv = 0.0
+        self._subtraidas = 0
+
+    def _somar(self, n_b, media_tb, media_vb, m2_tb, m2_vb, c_b):
+        n_a = self.n
+        n = n_a + n_b
+        dt = media_tb - self._media_t
+        dv = media_vb - self._media_v
+        fator = n_a * n_b / n
+        self._media_t += dt * n_b / n
+        self._media_v += dv * n_b / n
+        self._m2_t += m2_tb + dt * dt * fator
+        self._m2_v += m2_vb + dv * dv * fator
+        self._c_tv += c_b + dt * dv * fator
+        self.n = n
+
+    def _subtrair(self, n_b, media_tb, media_vb, m2_tb, m2_vb, c_b):
+        n = self.n
+        n_a = n - n_b
+        if n_a <= 0:
+            self._zerar()
+            return
+        media_ta = (n * self._media_t - n_b * media_tb) / n_a
+        media_va = (n * self._media_v - n_b * media_vb) / n_a
+        dt = media_tb - media_ta
+        dv = media_vb - media_va
+        fator = n_a * n_b / n
+        self._m2_t = max(0.0, self._m2_t - m2_tb - dt * dt * fator)
+        self._m2_v = max(0.0, self._m2_v - m2_vb - dv * dv * fator)
+        self._c_tv -= c_b + dt * dv * fator
+        self._media_t, self._media_v, self.n = media_ta, media_va, n_a
+        self._subtraidas += n_b
+
+    def acrescentar(self, momentos, minimo, maximo, candidatos, ultimo_tempo):
+        """!
+        @brief Junta um lote (já guardado no AmostrasSensor) e descarta o que saiu da janela.
+        @param momentos (tuple): Os momentos do lote (ver _momentos()).
+        @param minimo (float): O menor valor do lote.
+        @param maximo (float): O maior valor do lote.
+        @param candidatos (tuple): As listas de índices do lote que entram nas filas
+                                   dos mínimos e dos máximos (ver _candidatos()).
+        @param ultimo_tempo (float): O tempo relativo mais recente do sensor.
+        """
+        self._somar(*momentos)
+        # As amostras do lote dominam as da fila que não são melhores do que o seu extremo
+        valores, base = self.amostras.valores, self.amostras.base
+        fila = self._minimos
+        while fila and valores[fila[-1] - base] >= minimo:
+            fila.pop()
+        fila.extend(candidatos[0])
+        fila = self._maximos
+        while fila and valores[fila[-1] - base] <= maximo:
+            fila.pop()
+        fila.extend(candidatos[1])
+        self._expirar(ultimo_tempo - self.segundos)
+
+    def _expirar(self, limite):
+        amostras = self.amostras
+        tempos = amostras.tempos
+        a, b = self.inicio - amostras.base, amostras.fim
+        # Caso comum (poucas amostras saem): sem searchsorted
+        k = 0
+        while k < LOTE_MINIMO_NUMPY and a + k < b and tempos[a + k] < limite:
+            k += 1
+        if k == LOTE_MINIMO_NUMPY:
+            k += int(np.searchsorted(tempos[a + k:b], limite, side='left'))
+        if k:
+            if k < LOTE_MINIMO_NUMPY:
+                for tempo, valor in zip(tempos[a:a + k].tolist(), amostras.valores[a:a + k].tolist()):
+                    self._subtrair(1, tempo, valor, 0.0, 0.0, 0.0)
+            else:
+                self._subtrair(*_momentos(tempos[a:a + k], amostras.valores[a:a + k]))
+            self.inicio += k
+            for fila in (self._minimos, self._maximos):
+                while fila and fila[0] < self.inicio:
+                    fila.popleft()
+        if self._subtraidas > max(RECALCULO_MINIMO, 4 * self.n):
+            # Recalcula de raiz, sobre as amostras da janela
+            self._zerar()
+            a = self.inicio - amostras.base
+            if a < b:
+                self._somar(*_momentos(amostras.tempos[a:b], amostras.valores[a:b]))
+
+    def resumo(self):
+        """!
+        @brief As estatísticas atuais da janela.
+        @return (ResumoJanela): O resumo (campos None se a janela estiver vazia).
+        """
+        if self.n == 0:
+            return ResumoJanela(self.segundos, 0, None, None, None, 0.0, None)
+        desvio = math.sqrt(self._m2_v / (self.n - 1)) if self.n > 1 else 0.0
+        declive = self._c_tv / self._m2_t if self._m2_t > 0 else None
+        return ResumoJanela(self.segundos, self.n, self.amostras.valor(self._minimos[0]),
+                            self.amostras.valor(self._maximos[0]), self._media_v, desvio, declive)
+
+    def memoria(self):
+        """!
+        @brief Memória (estimada) ocupada pelas filas monótonas.
+        @return (int): Bytes.
+        """
+        return (len(self._minimos) + len(self._maximos)) * BYTES_POR_INDICE
+
+
+class EstatisticasSensor:
+    """!
+    @brief As janelas móveis de um sensor (ex: 1 min, 15 min e 1 h).
+    """
+
+    def __init__(self, janelas=DEFAULT_JANELAS):
+        """!
+        @brief Construtor do EstatisticasSensor.
+        @param janelas (tuple): As durações das janelas, em segundos.
+        """
+        self.amostras = AmostrasSensor()
+        self.janelas = [JanelaMovel(segundos, self.amostras) for segundos in janelas]
+        self.ultimo_tempo = None
+        # Os tempos são guardados relativos à primeira amostra (precisão do float64)
+        self._origem = None
+
+    def acrescentar(self, tempos, valores):
+        """!
+        @brief Acrescenta um lote de amostras a todas as janelas.
+        @param tempos (list | numpy.ndarray): Timestamps, por ordem crescente.
+        @param valores (list | numpy.ndarray): Valores alinhados com `tempos`.
+        """
+        if len(valores) == 0:
+            return
+        if self._origem is None:
+            self._origem = float(tempos[0])
+        if len(valores) < LOTE_MINIMO_NUMPY:
+            # Sensores lentos: sem criar arrays temporários
+            tempos = [float(tempo) - self._origem for tempo in tempos]
+            valores = [float(valor) for valor in valores]
+            momentos = _momentos_lista(tempos, valores)
+            candidatos = _candidatos_lista(valores, self.amostras.indice_fim)
+            ultimo = max(tempos)
+            minimo, maximo = min(valores), max(valores)
+        else:
+            tempos = np.asarray(tempos, dtype=np.float64) - self._origem
+            valores = np.asarray(valores, dtype=np.float64)
+            momentos = _momentos(tempos, valores)
+            candidatos = _candidatos(valores, self.amostras.indice_fim)
+            ultimo = float(tempos.max())
+            minimo, maximo = float(valores.min()), float(valores.max())
+        if self.ultimo_tempo is None or ultimo > self.ultimo_tempo:
+            self.ultimo_tempo = ultimo
+
+        self.amostras.acrescentar(tempos, valores, min(janela.inicio for janela in self.janelas))
+        for janela in self.janelas:
+            janela.acrescentar(momentos, minimo, maximo, candidatos, self.ultimo_tempo)
+
+    def resumos(self):
+        """!
+        @brief As estatísticas atuais de cada janela.
+        @return (tuple): Um ResumoJanela por janela, pela ordem das janelas.
+        """
+        return tuple(janela.resumo() for janela in self.janelas)
+
+    def memoria(self):
+        """!
+        @brief Memória ocupada pelas amostras e pelas filas monótonas das janelas.
+        @return (int): Bytes alocados (as filas por estimativa).
+        """
+        return self.amostras.memoria() + sum(janela.memoria() for janela in self.janelas)
@@ -0,0 +1,197 @@
+"""!
+@file exportacao.py
+@brief Exportação para CSV em segundo plano (intervalo de tempo e sensores à escolha).
+@details A ExportThread cria e consome um gerador de blocos de linhas e
+         escreve-os em CSV com um buffer grande, fora da thread da interface,
+         com progresso e cancelamento. O gerador é criado já dentro da thread,
+         por isso a cópia do histórico e a indexação do log também não
+         bloqueiam a interface. As linhas têm o mesmo formato do log
+         contínuo (ts ISO 8601, group, sensor_id, value, unit), mais uma
+         coluna nas exportações da memória (ver abaixo).
+
+         Há duas origens de blocos:
+         - blocos_memoria(): cópias do histórico em memória (a janela do gráfico);
+           antes das amostras brutas cada linha é a média de um intervalo
+           agregado, com a largura do intervalo na coluna extra COLUNA_AGREGADO;
+         - blocos_log(): o log contínuo gravado (CSV ou .slog, com as versões
+           rodadas), lido a partir do instante pedido com o índice do replay.
+
+         O ficheiro é escrito em "<caminho>.part" e só renomeado no fim: uma
+         exportação cancelada ou falhada não deixa um CSV incompleto.
+"""
+
+import csv
+import os
+from PyQt6.QtCore import QThread, pyqtSignal
+import numpy as np
+
+from src.timestamps import ConversorTimestamp
+
+# Linhas por bloco entregue ao csv.writer
+LINHAS_POR_BLOCO = 65536
+# Buffer do ficheiro de saída (bytes)
+TAMANHO_BUFFER_EXPORTACAO = 1024 * 1024
+SUFIXO_PARCIAL = '.part'
+# Coluna acrescentada às exportações da memória: largura (s) do intervalo agregado
+# de que a linha é a média, vazia nas amostras brutas
+COLUNA_AGREGADO = 'agregado_s'
+
+
+def blocos_memoria(series, t_inicio=None, t_fim=None):
+    """!
+    @brief Junta as séries de vários sensores por ordem de 'ts', em blocos.
+    @param series (dict): (group, sensor_id) -> (tempos, valores, larguras, unidade), com
+                          arrays já copiados (ver SampleProcessor.janelas_dos_sensores).
+    @param t_inicio (float): Início do intervalo (None = sem limite).
+    @param t_fim (float): Fim do intervalo (None = sem limite).
+    @return (generator): Tuplos (linhas, fração concluída), com linhas
+             [ts_epoch, group, sensor_id, value, unit, agregado_s].
+    """
+    chaves = list(series)
+    partes_t, partes_v, partes_l, partes_i = [], [], [], []
+    for i, chave in enumerate(chaves):
+        tempos, valores, larguras, _ = series[chave]
+        mascara = np.ones(len(tempos), dtype=bool)
+        if t_inicio is not None:
+            mascara &= tempos >= t_inicio
+        if t_fim is not None:
+            mascara &= tempos <= t_fim
+        partes_t.append(tempos[mascara])
+        partes_v.append(valores[mascara])
+        partes_l.append(larguras[mascara])
+        partes_i.append(np.full(int(mascara.sum()), i, dtype=np.int32))
+    if not chaves:
+        return
+    tempos = np.concatenate(partes_t)
+    ordem = np.argsort(tempos, kind='stable')
+    tempos = tempos[ordem]
+    valores = np.concatenate(partes_v)[ordem]
+    larguras = np.concatenate(partes_l)[ordem]
+    indices = np.concatenate(partes_i)[ordem]
+    colunas = [(chave[0], chave[1], series[chave][3]) for chave in chaves]
+
+    total = len(tempos)
+    for inicio in range(0, total, LINHAS_POR_BLOCO):
+        fim = min(inicio + LINHAS_POR_BLOCO, total)
+        yield [
+            [t, group, sensor_id, v, unidade, largura or '']
+            for t, v, largura, (group, sensor_id, unidade) in zip(
+                tempos[inicio:fim].tolist(), valores[inicio:fim].tolist(),
+                larguras[inicio:fim].tolist(), map(colunas.__getitem__, indices[inicio:fim].tolist())
+            )
+        ], fim / total
+
+
+def blocos_log(fonte, t_inicio=None, t_fim=None, chaves=None):
+    """!
+    @brief Lê o log contínuo gravado no intervalo pedido, em blocos.
+    @param fonte (FonteReplay): O log (já indexado).
+    @param t_inicio (float): Início do intervalo (None = início do log).
+    @param t_fim (float): Fim do intervalo (None = fim do log).
+    @param chaves (set): Os pares (group, sensor_id) a exportar (None = todos).
+    @return (generator): Tuplos (linhas, fração concluída).
+    """
+    inicio = fonte.t_inicio if t_inicio is None else max(t_inicio, fonte.t_inicio)
+    fim = fonte.t_fim if t_fim is None else min(t_fim, fonte.t_fim)
+    duracao = max(fim - inicio, 1e-9)
+    linhas = []
+    for pacotes in fonte.ler(t_inicio):
+        for pacote in pacotes:
+            tempo = pacote['ts_epoch']
+            if t_fim is not None and tempo > t_fim:
+                if linhas:
+                    yield linhas, 1.0
+                return
+            if chaves is not None and (pacote['group'], pacote['sensor_id']) not in chaves:
+                continue
+            linhas.append([tempo, pacote['group'], pacote['sensor_id'], pacote['value'], pacote['unit']])
+        if len(linhas) >= LINHAS_POR_BLOCO:
+            yield linhas, min(1.0, (linhas[-1][0] - inicio) / duracao)
+            linhas = []
+    if linhas:
+        yield linhas, 1.0
+
+
+class ExportThread(QThread):
+    """!
+    @brief Thread que escreve os blocos de um gerador num CSV.
+    """
+
+    progresso = pyqtSignal(int)
+    """!
+    @brief Sinal emitido com a percentagem concluída (0-100), só quando muda.
+    """
+
+    terminado = pyqtSignal(str, int)
+    """!
+    @brief Sinal emitido no fim com o caminho do ficheiro e o número de linhas escritas.
+    """
+
+    cancelado = pyqtSignal()
+    """!
+    @brief Sinal emitido se a exportação foi cancelada com stop().
+    """
+
+    erro = pyqtSignal(str)
+    """!
+    @brief Sinal emitido com a descrição do erro se a exportação falhou.
+    """
+
+    def __init__(self, caminho, criar_blocos, header, parent=None):
+        """!
+        @brief Construtor da ExportThread.
+        @param caminho (str): O ficheiro CSV a criar (substituído se existir).
+        @param criar_blocos (callable): Sem argumentos; devolve o gerador de tuplos
+                                        (linhas, fração concluída), ex: blocos_memoria().
+                                        É chamado em run(), na thread da exportação.
+        @param header (list): O cabeçalho do CSV.
+        @param parent (QObject): O objeto pai do Qt (opcional).
+        """
+        super().__init__(parent)
+        self.caminho = caminho
+        self.criar_blocos = criar_blocos
+        self.header = header
+        self.running = True
+        self.linhas_escritas = 0
+
+    def run(self):
+        """!
+        @brief O "coração" da thread, executado quando .start() é chamado.
+        """
+        parcial = self.caminho + SUFIXO_PARCIAL
+        conversor = ConversorTimestamp()
+        percentagem = -1
+        try:
+            with open(parcial, 'w', newline='', encoding='utf-8',
+                      buffering=TAMANHO_BUFFER_EXPORTACAO) as f:
+                writer = csv.writer(f)
+                writer.writerow(self.header)
+                para_iso = conversor.para_iso
+                for linhas, fracao in self.criar_blocos():
+                    if not self.running:
+                        break
+                    writer.writerows([para_iso(linha[0]), *linha[1:]] for linha in linhas)
+                    self.linhas_escritas += len(linhas)
+                    if int(fracao * 100) != percentagem:
+                        percentagem = int(fracao * 100)
+                        self.progresso.emit(percentagem)
+            if not self.running:
+                os.remove(parcial)
+                self.cancelado.emit()
+                return
+            os.replace(parcial, self.caminho)
+        except Exception as e:
+            try:
+                os.remove(parcial)
+            except OSError:
+                pass
+            self.erro.emit(f"Não foi possível exportar para {self.caminho}: {e}")
+            return
+        self.progresso.emit(100)
+        self.terminado.emit(self.caminho, self.linhas_escritas)
+
+    def stop(self):
+        """!
+        @brief Cancela a exportação (o ficheiro parcial é apagado).
+        """
+        self.running = False
@@ -0,0 +1,213 @@
+"""!
+@file headless.py
+@brief Modo coletor sem interface gráfica (`python main.py --headless`).
+@details Corre o mesmo pipeline da interface (UDPListener -> SampleProcessor ->
+         LogWriter) com uma QCoreApplication, sem importar QtWidgets nem
+         pyqtgraph: arranca mais depressa, usa menos memória e não precisa de
+         display. O log contínuo fica sempre ativo; as transições de alerta e
+         uma linha de estado periódica vão para o terminal.
+"""
+
+import signal
+import time
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer, Qt
+
+from src.configuracao import Configuracao, CONFIG_FILENAME, CSV_HEADER, ALERTAS_HEADER
+from src.udp_listener import UDPListener
+from src.relay import RelayUDP
+from src.log_writer import LogWriter
+from src.timestamps import para_iso
+from src.sensor_registry import SensorRegistry
+from src.processor import SampleProcessor
+from src.metrics import RegistoMetricas, MetricsExporter, registar_pipeline
+from src.consultas import ServidorConsultas
+
+# O coletor não tem tabela (o processador nunca prepara uma vista)
+TAMANHO_TABELA = 1
+# Intervalo (ms) com que os resultados do processamento são recolhidos
+INTERVALO_RECOLHA_MS = 500
+
+
+class HeadlessCollector(QObject):
+    """!
+    @brief Liga o listener, o processamento e o log contínuo, sem interface.
+    """
+
+    def __init__(self, config, parent=None):
+        """!
+        @brief Construtor do HeadlessCollector (cria as threads, sem as iniciar).
+        @param config (Configuracao): A configuração lida do config.ini.
+        @param parent (QObject): O objeto pai do Qt (opcional).
+        """
+        super().__init__(parent)
+        self.config = config
+        self.registry = SensorRegistry(config.capacidade_historico(), **config.config_historico)
+        # Estado de alerta de cada sensor, atualizado pelos eventos do processamento
+        self.estado_alerta = {}
+        self.codigo_saida = 0
+
+        self.log_writer = LogWriter(config.log_filename, CSV_HEADER, **config.config_log)
+        self.log_writer.erro.connect(self.on_log_writer_erro)
+
+        self.processor = SampleProcessor(
+            self.registry, config.historico_segundos, TAMANHO_TABELA,
+            config.limite_min, config.limite_max,
+            tamanho_fila=config.tamanho_fila_processamento,
+            janelas_estatisticas=config.janelas_estatisticas, limite_declive=config.limite_declive,
+            histerese=config.histerese, atraso_alerta=config.atraso_alerta
+        )
+        self.processor.log_writer = self.log_writer
+
+        # Log dos eventos de alerta (opcional; uma falha não pára o coletor)
+        self.log_eventos = None
+        if config.ficheiro_eventos:
+            self.log_eventos = LogWriter(config.ficheiro_eventos, ALERTAS_HEADER)
+            self.log_eventos.erro.connect(self.on_log_eventos_erro)
+            self.processor.log_eventos = self.log_eventos
+
+        # Reenvio dos pacotes para outros monitores (opcional)
+        relay = None
+        if config.relay_destinos:
+            relay = RelayUDP(config.relay_destinos, sensores_binarios=config.sensores_binarios,
+                             **config.config_relay)
+        self.listener = UDPListener(config.udp_ip, config.udp_port, rcvbuf=config.udp_rcvbuf,
+                                    maximo_lote=config.udp_maximo_lote,
+                                    endpoints=config.udp_endpoints or None,
+                                    sensores_binarios=config.sensores_binarios,
+                                    relay=relay, grupos_multicast=config.udp_grupos_multicast)
+        # Os lotes vão da thread do listener direto para a fila do processamento
+        self.listener.batch_received.connect(
+            self.processor.enfileirar, Qt.ConnectionType.DirectConnection
+        )
+
+        self.metricas = RegistoMetricas()
+        registar_pipeline(self.metricas, self.listener, self.processor, lambda: self.log_writer)
+        self.metrics_exporter = None
+        if config.exportar_metricas():
+            self.metrics_exporter = MetricsExporter(
+                self.metricas, config.metricas_ficheiro, config.metricas_intervalo,
+                config.metricas_http_ip, config.metricas_http_porta
+            )
+        self.servidor_consultas = None
+        if config.consultas_porta > 0:
+            self.servidor_consultas = ServidorConsultas(
+                self.registry, config.consultas_ip, config.consultas_porta, config.consultas_maximo_pontos
+            )
+
+        self.timer_recolha = QTimer(self)
+        self.timer_recolha.setInterval(INTERVALO_RECOLHA_MS)
+        self.timer_recolha.timeout.connect(self.recolher)
+        self.ultimo_status = time.monotonic()
+
+    def iniciar(self):
+        """!
+        @brief Inicia as threads (log, processamento, listener, métricas e consultas, por esta ordem).
+        """
+        self.log_writer.start()
+        if self.log_eventos is not None:
+            self.log_eventos.start()
+        self.processor.start()
+        self.listener.start()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.start()
+        if self.servidor_consultas is not None:
+            self.servidor_consultas.start()
+        self.timer_recolha.start()
+        print(f"Modo headless: log contínuo em {self.config.log_filename}, "
+              f"limites de alerta {self.config.limite_min}-{self.config.limite_max}")
+
+    def recolher(self):
+        """!
+        @brief Slot do `timer_recolha`: imprime as transições de alerta e o estado periódico.
+        """
+        novos, _, _ = self.processor.retirar_snapshot()
+        for sensor in novos:
+            print(f"Novo sensor: {sensor.nome}")
+        for evento in self.processor.retirar_eventos():
+            estado = "ALERTA" if evento.inicio else "Normal"
+            print(f"[{estado}] {evento.nome}: {evento.valor:.2f} {evento.unidade} "
+                  f"({evento.motivo}, {para_iso(evento.tempo)})")
+            self.estado_alerta[evento.chave] = evento.inicio
+
+        agora = time.monotonic()
+        if self.config.intervalo_status > 0 and agora - self.ultimo_status >= self.config.intervalo_status:
+            self.ultimo_status = agora
+            self.imprimir_status()
+
+    def imprimir_status(self):
+        """!
+        @brief Imprime os contadores da rede, do processamento e do log.
+        """
+        em_alerta = sum(1 for alerta in self.estado_alerta.values() if alerta)
+        print(
+            f"Estado: {len(self.registry)} sensores ({em_alerta} em alerta) | "
+            f"Rede: {self.listener.pacotes_recebidos} recebidos, "
+            f"{self.listener.pacotes_malformados} malformados, "
+            f"{self.listener.pacotes_descartados_kernel} perdidos (kernel), "
+            f"{self.processor.amostras_invalidas} inválidas | "
+            f"Log: {self.log_writer.linhas_escritas} escritas, "
+            f"{self.log_writer.linhas_pendentes} na fila, "
+            f"{self.log_writer.linhas_descartadas} descartadas"
+        )
+
+    def on_log_writer_erro(self, mensagem):
+        """!
+        @brief Slot: o log contínuo falhou; sem log, o coletor não tem utilidade e termina.
+        @param mensagem (str): A descrição do erro.
+        """
+        print(mensagem)
+        self.codigo_saida = 1
+        QCoreApplication.quit()
+
+    def on_log_eventos_erro(self, mensagem):
+        """!
+        @brief Slot: o log de eventos de alerta falhou; o coletor continua sem ele.
+        @param mensagem (str): A descrição do erro.
+        """
+        print(mensagem)
+        self.processor.log_eventos = None
+
+    def parar(self):
+        """!
+        @brief Pára as threads de forma limpa (o log escreve o que ainda estiver na fila).
+        """
+        self.timer_recolha.stop()
+        self.listener.stop()
+        self.listener.wait()
+        self.processor.stop()
+        self.processor.wait()
+        self.log_writer.stop()
+        self.log_writer.wait()
+        if self.log_eventos is not None:
+            self.log_eventos.stop()
+            self.log_eventos.wait()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+            self.metrics_exporter.wait()
+        if self.servidor_consultas is not None:
+            self.servidor_consultas.stop()
+            self.servidor_consultas.wait()
+        self.imprimir_status()
+
+
+def executar(argv, config_filename=CONFIG_FILENAME):
+    """!
+    @brief Corre o coletor headless até receber SIGINT/SIGTERM.
+    @param argv (list): Argumentos passados à QCoreApplication.
+    @param config_filename (str): O caminho do ficheiro de configuração.
+    @return (int): O código de saída do processo.
+    """
+    app = QCoreApplication(argv)
+    config = Configuracao(config_filename)
+    coletor = HeadlessCollector(config)
+
+    # Ctrl+C / kill terminam o loop do Qt; o timer de recolha devolve o
+    # controlo ao Python periodicamente para que o sinal seja tratado.
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+
+    coletor.iniciar()
+    app.exec()
+    print("A terminar o coletor...")
+    coletor.parar()
+    return coletor.codigo_saida
@@ -0,0 +1,102 @@
+"""!
+@file historico_model.py
+@brief Modelo (Qt model/view) da tabela de leituras do sensor selecionado.
+@details Substitui o QTableWidget com itens pré-criados. As leituras ficam
+         num RingBuffer próprio da thread da interface; o QTableView só pede
+         (em data()) as linhas visíveis, e cada atualização anuncia apenas as
+         linhas inseridas no topo e as removidas no fundo. O custo por amostra
+         é O(1), qualquer que seja o tamanho da tabela.
+
+         As leituras chegam pelo VistaSnapshot do processamento, limitadas ao
+         que ainda está no histórico do sensor: acima de TAXA_MAXIMA_HZ podem
+         faltar leituras entre dois frames.
+"""
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from src.configuracao import DEFAULT_LINHAS_TABELA
+from src.ring_buffer import RingBuffer
+from src.timestamps import formatar_hora
+
+
+class HistoricoTableModel(QAbstractTableModel):
+    """!
+    @brief Leituras de um sensor, da mais recente (linha 0) para a mais antiga.
+    """
+
+    CABECALHOS = ("Timestamp", "Valor")
+
+    def __init__(self, capacidade=DEFAULT_LINHAS_TABELA, parent=None):
+        """!
+        @brief Construtor do HistoricoTableModel.
+        @param capacidade (int): Número máximo de linhas (as mais antigas são descartadas).
+        @param parent (QObject): O objeto pai do Qt (opcional).
+        """
+        super().__init__(parent)
+        self.buffer = RingBuffer(capacidade)
+        self.unidade = ''
+
+    # --- Interface do QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.buffer)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.CABECALHOS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        # Linha 0 = amostra mais recente; formatada só quando a linha é desenhada
+        tempo, valor = self.buffer.amostra(-1 - index.row())
+        if index.column() == 0:
+            return formatar_hora(tempo)
+        return f"{valor:.2f} {self.unidade}"
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.CABECALHOS[section]
+        return None
+
+    # --- Atualização (chamada pela thread da interface) ---
+
+    def reiniciar(self, tempos, valores, unidade):
+        """!
+        @brief Substitui todas as leituras (ex: quando outro sensor é selecionado).
+        @param tempos (numpy.ndarray): Timestamps, da mais antiga para a mais recente.
+        @param valores (numpy.ndarray): Valores alinhados com `tempos`.
+        @param unidade (str): A unidade do sensor.
+        """
+        self.beginResetModel()
+        self.buffer.limpar()
+        self.buffer.extend(tempos, valores)
+        self.unidade = unidade
+        self.endResetModel()
+
+    def acrescentar(self, tempos, valores, unidade):
+        """!
+        @brief Acrescenta leituras novas no topo, descartando as mais antigas se cheio.
+        @details Só são anunciadas as linhas removidas (fundo) e inseridas (topo);
+                 as restantes não são relidas pela vista.
+        @param tempos (numpy.ndarray): Timestamps, da mais antiga para a mais recente.
+        @param valores (numpy.ndarray): Valores alinhados com `tempos`.
+        @param unidade (str): A unidade do sensor.
+        """
+        if unidade != self.unidade:
+            self.unidade = unidade
+            if len(self.buffer):
+                self.dataChanged.emit(self.index(0, 1), self.index(len(self.buffer) - 1, 1))
+
+        n = min(len(valores), self.buffer.capacidade)
+        if n == 0:
+            return
+        excesso = len(self.buffer) + n - self.buffer.capacidade
+        if excesso > 0:
+            tamanho = len(self.buffer)
+            self.beginRemoveRows(QModelIndex(), tamanho - excesso, tamanho - 1)
+            self.buffer.descartar_antigas(excesso)
+            self.endRemoveRows()
+
+        self.beginInsertRows(QModelIndex(), 0, n - 1)
+        self.buffer.extend(tempos[len(tempos) - n:], valores[len(valores) - n:])
+        self.endInsertRows()
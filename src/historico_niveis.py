@@ -0,0 +1,483 @@
+"""!
+@file historico_niveis.py
+@brief Histórico de um sensor em vários níveis de resolução, com memória limitada.
+@details As amostras recentes ficam em bruto num RingBuffer (os últimos
+         `BRUTO_SEGUNDOS`); ao mesmo tempo cada amostra é agregada em níveis de
+         intervalos fixos (ex: 1 s e 60 s, alinhados à epoch) com contagem,
+         mínimo, máximo e média. Cada nível cobre a janela inteira do histórico,
+         por isso uma consulta usa a resolução mais fina disponível para cada
+         troço: bruto para os minutos recentes, depois o nível de 1 s, depois o
+         de 60 s.
+
+         Toda a memória é pré-alocada; a capacidade de cada nível só muda com
+         limitar() (chamado pelo SensorRegistry para respeitar o orçamento
+         global): o bruto e os níveis finos encolhem primeiro, e o nível mais
+         grosso (que garante a cobertura da janela) só encolhe quando os outros
+         já estão no mínimo, até MINIMO_INTERVALOS intervalos (o gráfico deixa
+         então de cobrir o início da janela). Assim a memória não cresce com o
+         tempo de funcionamento.
+"""
+
+import math
+
+import numpy as np
+
+from src.ring_buffer import RingBuffer, BYTES_POR_AMOSTRA
+
+# Amostras brutas guardadas por sensor (s); o resto da janela fica nos níveis
+DEFAULT_BRUTO_SEGUNDOS = 600.0
+# Largura (s) dos intervalos de cada nível agregado, do mais fino para o mais grosso
+DEFAULT_LARGURAS = (1.0, 60.0)
+# Memória máxima (MB) de todos os históricos; 0 = sem limite
+DEFAULT_MEMORIA_MB = 256
+# Intervalos que o nível mais grosso mantém mesmo sem memória (mínimo por sensor,
+# com as `capacidade_minima` amostras brutas)
+MINIMO_INTERVALOS = 60
+# Lotes menores do que isto são agregados amostra a amostra, sem numpy
+LOTE_MINIMO_NUMPY = 16
+
+# Colunas de um nível agregado
+INICIO, CONTAGEM, MINIMO, MAXIMO, MEDIA = range(5)
+N_COLUNAS = 5
+# Bytes de cada intervalo de um nível (N_COLUNAS float64, escritas duas vezes)
+BYTES_POR_INTERVALO = N_COLUNAS * 2 * 8
+
+
+def parse_larguras(texto):
+    """!
+    @brief Lê as larguras dos níveis agregados (ex: "1, 60").
+    @param texto (str): As larguras em segundos, separadas por vírgulas.
+    @return (tuple): As larguras (float), sem repetições, por ordem crescente.
+    @exception ValueError Se alguma largura não for um número positivo.
+    """
+    larguras = sorted({float(parte) for parte in texto.split(',') if parte.strip()})
+    if any(largura <= 0 for largura in larguras):
+        raise ValueError(f"Larguras de nível inválidas: {texto}")
+    return tuple(larguras)
+
+
+class NivelAgregado:
+    """!
+    @brief Buffer circular de intervalos fechados (contagem, mín., máx., média) e do intervalo aberto.
+    @details Usa o mesmo armazenamento espelhado do RingBuffer (cada linha escrita
+             em i e i + capacidade), por isso as linhas válidas são sempre uma
+             fatia contígua de cada coluna.
+    """
+
+    def __init__(self, largura, capacidade):
+        """!
+        @brief Construtor do NivelAgregado.
+        @param largura (float): A duração de cada intervalo, em segundos.
+        @param capacidade (int): Número máximo de intervalos fechados guardados.
+        """
+        self.largura = float(largura)
+        self.capacidade = max(1, int(capacidade))
+        self._dados = np.zeros((N_COLUNAS, 2 * self.capacidade), dtype=np.float64)
+        self._pos = 0
+        self._tamanho = 0
+        self._limpar_aberto()
+
+    def _limpar_aberto(self):
+        # Intervalo ainda aberto (recebe amostras): id, contagem, mín., máx., soma
+        self._aberto = None
+        self._n = 0
+        self._minimo = self._maximo = self._soma = 0.0
+
+    def __len__(self):
+        return self._tamanho
+
+    def memoria(self):
+        """!
+        @brief Memória ocupada pelo nível (o array espelhado).
+        @return (int): Bytes alocados.
+        """
+        return self._dados.nbytes
+
+    def _escrever(self, linhas):
+        # linhas: array (N_COLUNAS, n) de intervalos fechados, por ordem
+        n = linhas.shape[1]
+        if n > self.capacidade:
+            linhas = linhas[:, -self.capacidade:]
+            self._pos = (self._pos + n - self.capacidade) % self.capacidade
+            n = self.capacidade
+        primeiro = min(n, self.capacidade - self._pos)
+        for inicio, origem in ((self._pos, slice(0, primeiro)), (0, slice(primeiro, n))):
+            tamanho = origem.stop - origem.start
+            if tamanho == 0:
+                continue
+            fim = inicio + tamanho
+            self._dados[:, inicio:fim] = linhas[:, origem]
+            self._dados[:, inicio + self.capacidade:fim + self.capacidade] = linhas[:, origem]
+        self._pos = (self._pos + n) % self.capacidade
+        self._tamanho = min(self._tamanho + n, self.capacidade)
+
+    def _fechados(self):
+        inicio = (self._pos - self._tamanho) % self.capacidade
+        return self._dados[:, inicio:inicio + self._tamanho]
+
+    def _linha_aberta(self):
+        return np.array([[self._aberto * self.largura], [self._n], [self._minimo],
+                         [self._maximo], [self._soma / self._n]])
+
+    def _fechar_aberto(self):
+        if self._aberto is not None:
+            self._escrever(self._linha_aberta())
+
+    def acrescentar_um(self, tempo, valor):
+        """!
+        @brief Agrega uma amostra (caminho sem numpy, para sensores lentos).
+        @param tempo (float): O timestamp (segundos desde a epoch).
+        @param valor (float): O valor.
+        """
+        indice = math.floor(tempo / self.largura)
+        if self._aberto is not None and indice <= self._aberto:
+            # Mesmo intervalo (ou amostra atrasada: conta no intervalo aberto)
+            self._n += 1
+            self._soma += valor
+            if valor < self._minimo:
+                self._minimo = valor
+            elif valor > self._maximo:
+                self._maximo = valor
+            return
+        self._fechar_aberto()
+        self._aberto = indice
+        self._n = 1
+        self._minimo = self._maximo = self._soma = valor
+
+    def acrescentar(self, tempos, valores):
+        """!
+        @brief Agrega um lote de amostras.
+        @details Uma amostra atrasada é contada no intervalo aberto (como no DecimadorMinMax).
+        @param tempos (numpy.ndarray): Timestamps (float64), por ordem de chegada.
+        @param valores (numpy.ndarray): Valores (float64) alinhados com `tempos`.
+        """
+        if len(valores) < LOTE_MINIMO_NUMPY:
+            for tempo, valor in zip(tempos.tolist(), valores.tolist()):
+                self.acrescentar_um(tempo, valor)
+            return
+        ids = np.floor(tempos / self.largura)
+        np.maximum.accumulate(ids, out=ids)
+        if self._aberto is not None:
+            np.maximum(ids, self._aberto, out=ids)
+        cortes = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+        contagens = np.diff(np.append(cortes, len(ids)))
+        minimos = np.minimum.reduceat(valores, cortes)
+        maximos = np.maximum.reduceat(valores, cortes)
+        somas = np.add.reduceat(valores, cortes)
+
+        if self._aberto is not None and ids[0] == self._aberto:
+            # O primeiro grupo continua o intervalo aberto
+            contagens[0] += self._n
+            minimos[0] = min(minimos[0], self._minimo)
+            maximos[0] = max(maximos[0], self._maximo)
+            somas[0] += self._soma
+        else:
+            self._fechar_aberto()
+        if len(cortes) > 1:
+            fechados = slice(0, len(cortes) - 1)
+            self._escrever(np.array([ids[cortes[fechados]] * self.largura, contagens[fechados],
+                                     minimos[fechados], maximos[fechados],
+                                     somas[fechados] / contagens[fechados]]))
+        self._aberto = float(ids[cortes[-1]])
+        self._n = int(contagens[-1])
+        self._minimo = float(minimos[-1])
+        self._maximo = float(maximos[-1])
+        self._soma = float(somas[-1])
+
+    def intervalos(self, t_inicio, t_fim):
+        """!
+        @brief Os intervalos (fechados e o aberto) entre `t_inicio` e `t_fim`.
+        @details Um intervalo conta se o seu centro não for anterior a `t_inicio`
+                 e se terminar até `t_fim` (para não sobrepor a resolução mais fina).
+        @param t_inicio (float): Início da consulta.
+        @param t_fim (float): Fim da consulta (ex: início dos dados mais finos).
+        @return (numpy.ndarray): Array (N_COLUNAS, n) com os intervalos, por ordem
+                 (view sem cópia se o intervalo aberto não estiver incluído).
+        """
+        fechados = self._fechados()
+        inicios = fechados[INICIO]
+        primeiro = np.searchsorted(inicios, t_inicio - self.largura / 2, side='left')
+        ultimo = np.searchsorted(inicios, t_fim - self.largura, side='right')
+        linhas = fechados[:, primeiro:max(primeiro, ultimo)]
+        if self._aberto is not None:
+            inicio_aberto = self._aberto * self.largura
+            if t_inicio - self.largura / 2 <= inicio_aberto <= t_fim - self.largura:
+                linhas = np.concatenate((linhas, self._linha_aberta()), axis=1)
+        return linhas
+
+    def redimensionar(self, capacidade):
+        """!
+        @brief Realoca o nível com outra capacidade, mantendo os intervalos mais recentes.
+        @param capacidade (int): A nova capacidade (mínimo 1).
+        """
+        capacidade = max(1, int(capacidade))
+        if capacidade == self.capacidade:
+            return
+        fechados = self._fechados().copy()
+        self.capacidade = capacidade
+        self._dados = np.zeros((N_COLUNAS, 2 * capacidade), dtype=np.float64)
+        self._pos = 0
+        self._tamanho = 0
+        self._escrever(fechados)
+
+    def limpar(self):
+        """!
+        @brief Descarta todos os intervalos (sem realocar).
+        """
+        self._pos = 0
+        self._tamanho = 0
+        self._limpar_aberto()
+
+
+class HistoricoNiveis:
+    """!
+    @brief Amostras brutas recentes mais níveis agregados que cobrem a janela inteira.
+    @details `bruto` é o RingBuffer das amostras recentes (usado pela tabela);
+             janela() junta o bruto com os níveis para o gráfico e a exportação.
+    """
+
+    def __init__(self, janela_segundos, capacidade_bruto, larguras=(), memoria_maxima=0,
+                 capacidade_minima=1):
+        """!
+        @brief Construtor do HistoricoNiveis.
+        @param janela_segundos (float): A duração da janela do histórico.
+        @param capacidade_bruto (int): Número de amostras brutas guardadas (sem limite de memória).
+        @param larguras (tuple): As larguras (s) dos níveis; só as menores do que a janela são usadas.
+        @param memoria_maxima (int): Bytes disponíveis para este histórico (0 = sem limite).
+        @param capacidade_minima (int): Amostras brutas mantidas mesmo sem memória (ex: linhas da tabela).
+        """
+        self.janela_segundos = float(janela_segundos)
+        self.capacidade_bruto = max(1, int(capacidade_bruto))
+        self.capacidade_minima = max(1, min(int(capacidade_minima), self.capacidade_bruto))
+        self.larguras = tuple(largura for largura in larguras if largura < self.janela_segundos)
+        capacidades = self._capacidades(memoria_maxima)
+        self.bruto = RingBuffer(capacidades[0])
+        self.niveis = [NivelAgregado(largura, capacidade)
+                       for largura, capacidade in zip(self.larguras, capacidades[1:])]
+
+    def _capacidades(self, memoria_maxima):
+        # [bruto, nível 1, nível 2, ...] a partir das capacidades nominais, encolhendo
+        # o bruto (até capacidade_minima) e os níveis finos pelo mesmo fator. O nível
+        # mais grosso, que garante a cobertura da janela inteira, só encolhe (até
+        # MINIMO_INTERVALOS) quando nem com os outros no mínimo a memória chega.
+        bytes_amostra = BYTES_POR_AMOSTRA
+        bytes_intervalo = BYTES_POR_INTERVALO
+        nominais = [self.capacidade_bruto] + [math.ceil(self.janela_segundos / largura) + 1
+                                              for largura in self.larguras]
+        total = nominais[0] * bytes_amostra + sum(nominais[1:]) * bytes_intervalo
+        if memoria_maxima <= 0 or total <= memoria_maxima:
+            return nominais
+        fixo = self.capacidade_minima * bytes_amostra
+        if len(nominais) > 1:
+            fixo += nominais[-1] * bytes_intervalo
+            if memoria_maxima < fixo + (len(nominais) - 2) * bytes_intervalo:
+                # Bruto e níveis finos no mínimo; o nível mais grosso fica com o resto
+                resto = memoria_maxima - self.capacidade_minima * bytes_amostra
+                resto -= (len(nominais) - 2) * bytes_intervalo
+                grosso = max(min(MINIMO_INTERVALOS, nominais[-1]), int(resto // bytes_intervalo))
+                return [self.capacidade_minima] + [1] * (len(nominais) - 2) + [grosso]
+        fator = max(0.0, memoria_maxima - fixo) / (total - fixo)
+        capacidades = [self.capacidade_minima + int((nominais[0] - self.capacidade_minima) * fator)]
+        capacidades += [max(1, int(capacidade * fator)) for capacidade in nominais[1:-1]]
+        if len(nominais) > 1:
+            capacidades.append(nominais[-1])
+        return capacidades
+
+    def limitar(self, memoria_maxima):
+        """!
+        @brief Ajusta as capacidades para caber em `memoria_maxima` (mantendo os dados mais recentes).
+        @details Abaixo do mínimo (capacidade_minima amostras brutas, um intervalo
+                 por nível fino e MINIMO_INTERVALOS no nível mais grosso) o
+                 histórico não encolhe mais; ver minimo().
+        @param memoria_maxima (int): Bytes disponíveis (0 = capacidades nominais).
+        """
+        capacidades = self._capacidades(memoria_maxima)
+        self.bruto.redimensionar(capacidades[0])
+        for nivel, capacidade in zip(self.niveis, capacidades[1:]):
+            nivel.redimensionar(capacidade)
+
+    def minimo(self):
+        """!
+        @brief A memória mínima do histórico (abaixo disto, limitar() não encolhe mais).
+        @return (int): Bytes.
+        """
+        capacidades = self._capacidades(1)
+        return capacidades[0] * BYTES_POR_AMOSTRA + sum(capacidades[1:]) * BYTES_POR_INTERVALO
+
+    def memoria(self):
+        """!
+        @brief Memória ocupada pelo bruto e por todos os níveis.
+        @return (int): Bytes alocados.
+        """
+        return self.bruto.memoria() + sum(nivel.memoria() for nivel in self.niveis)
+
+    def __len__(self):
+        return len(self.bruto)
+
+    def extend(self, tempos, valores):
+        """!
+        @brief Acrescenta amostras ao bruto e a todos os níveis.
+        @param tempos (array-like): Timestamps das amostras, em ordem de chegada.
+        @param valores (array-like): Valores alinhados com `tempos`.
+        """
+        tempos = np.asarray(tempos, dtype=np.float64)
+        valores = np.asarray(valores, dtype=np.float64)
+        self.bruto.extend(tempos, valores)
+        for nivel in self.niveis:
+            nivel.acrescentar(tempos, valores)
+
+    def tempos(self):
+        """!
+        @brief Timestamps das amostras brutas (ver RingBuffer.tempos).
+        @return (numpy.ndarray): View contígua, sem cópia.
+        """
+        return self.bruto.tempos()
+
+    def valores(self):
+        """!
+        @brief Valores das amostras brutas (ver RingBuffer.valores).
+        @return (numpy.ndarray): View contígua, sem cópia.
+        """
+        return self.bruto.valores()
+
+    def _trocos(self, t_inicio):
+        # Os troços agregados desde t_inicio, (largura, linhas) do mais antigo para o
+        # mais recente, e as views do bruto; cada nível só cobre o que os mais finos não têm
+        tempos, valores = self.bruto.desde(t_inicio)
+        limite = float(tempos[0]) if len(tempos) else math.inf
+        partes = []
+        for nivel in self.niveis:
+            linhas = nivel.intervalos(t_inicio, limite)
+            if linhas.shape[1] == 0:
+                continue
+            partes.append((nivel.largura, linhas))
+            limite = float(linhas[INICIO, 0])
+        partes.reverse()
+        return partes, tempos, valores
+
+    def janela(self, t_inicio, media=False):
+        """!
+        @brief As amostras desde `t_inicio`, na melhor resolução disponível em cada troço.
+        @details Antes das amostras brutas, cada intervalo agregado dá dois pontos
+                 (mínimo e máximo, no centro do intervalo), o que preserva os picos
+                 no gráfico, ou um ponto com a média se `media` for True (exportação).
+                 Sem dados agregados a usar, devolve as views do bruto, sem cópia.
+        @param t_inicio (float): Início da janela (segundos desde a epoch).
+        @param media (bool): True para um ponto (média) por intervalo agregado.
+        @return (tuple): O par (tempos, valores), por ordem crescente de tempo.
+        """
+        partes, tempos, valores = self._trocos(t_inicio)
+        if not partes:
+            return tempos, valores
+
+        partes_t, partes_v = [], []
+        for largura, linhas in partes:
+            centros = linhas[INICIO] + largura / 2
+            if media:
+                partes_t.append(centros)
+                partes_v.append(linhas[MEDIA])
+            else:
+                partes_t.append(np.repeat(centros, 2))
+                pontos = np.empty(2 * linhas.shape[1], dtype=np.float64)
+                pontos[0::2] = linhas[MINIMO]
+                pontos[1::2] = linhas[MAXIMO]
+                partes_v.append(pontos)
+        partes_t.append(tempos)
+        partes_v.append(valores)
+        return np.concatenate(partes_t), np.concatenate(partes_v)
+
+    def janela_media(self, t_inicio):
+        """!
+        @brief Cópia de janela(t_inicio, media=True), com a largura do intervalo de cada ponto.
+        @details Para a exportação: `larguras` é 0 nas amostras brutas e a largura (s)
+                 do intervalo agregado nos pontos que são médias.
+        @param t_inicio (float): Início da janela (segundos desde a epoch).
+        @return (tuple): (tempos, valores, larguras), arrays novos por ordem crescente de tempo.
+        """
+        partes, tempos, valores = self._trocos(t_inicio)
+        partes_t = [linhas[INICIO] + largura / 2 for largura, linhas in partes] + [tempos]
+        partes_v = [linhas[MEDIA] for _, linhas in partes] + [valores]
+        partes_l = [np.full(linhas.shape[1], largura) for largura, linhas in partes]
+        partes_l.append(np.zeros(len(tempos)))
+        return np.concatenate(partes_t), np.concatenate(partes_v), np.concatenate(partes_l)
+
+    def depois_de(self, t_inicio, maximo):
+        """!
+        @brief Cópia das primeiras `maximo` amostras de janela(t_inicio, media=True) com tempo > `t_inicio`.
+        @details Os limites de cada troço são encontrados por busca binária e só a
+                 fatia devolvida é copiada, por isso o custo (com o lock do registo)
+                 depende de `maximo` e não do tamanho do histórico.
+        @param t_inicio (float): Início, exclusivo (segundos desde a epoch).
+        @param maximo (int): Máximo de amostras devolvidas (as mais antigas).
+        @return (tuple): (tempos, valores, truncado); `truncado` é True se ficaram amostras de fora.
+        """
+        partes, tempos, valores = self._trocos(t_inicio)
+        # (inícios, deslocamento até ao ponto, valores) de cada troço; no bruto o ponto é a amostra
+        trocos = [(linhas[INICIO], largura / 2, linhas[MEDIA]) for largura, linhas in partes]
+        trocos.append((tempos, 0.0, valores))
+        partes_t, partes_v = [], []
+        restantes = maximo
+        truncado = False
+        for inicios, meio, pontos in trocos:
+            primeiro = int(np.searchsorted(inicios, t_inicio - meio, side='right'))
+            # Acerta o arredondamento de (t_inicio - meio): o critério é inicio + meio > t_inicio
+            while primeiro < len(inicios) and inicios[primeiro] + meio <= t_inicio:
+                primeiro += 1
+            while primeiro > 0 and inicios[primeiro - 1] + meio > t_inicio:
+                primeiro -= 1
+            n = len(inicios) - primeiro
+            if n > restantes:
+                truncado = True
+                n = restantes
+            if n:
+                # A soma já cria uma cópia (as views mudam com as próximas escritas)
+                partes_t.append(inicios[primeiro:primeiro + n] + meio)
+                partes_v.append(pontos[primeiro:primeiro + n].copy())
+                restantes -= n
+            if truncado:
+                break
+        if not partes_t:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64), truncado
+        return np.concatenate(partes_t), np.concatenate(partes_v), truncado
+
+    def inicio_janela(self, t_inicio):
+        """!
+        @brief O primeiro timestamp que janela(t_inicio, media=True) devolveria, sem a construir.
+        @param t_inicio (float): Início da janela (segundos desde a epoch).
+        @return (float | None): O timestamp, ou None se a janela estiver vazia.
+        """
+        partes, tempos, _ = self._trocos(t_inicio)
+        if partes:
+            largura, linhas = partes[0]
+            return float(linhas[INICIO, 0]) + largura / 2
+        return float(tempos[0]) if len(tempos) else None
+
+    def agregar(self, t_inicio):
+        """!
+        @brief Contagem, mínimo, máximo e média desde `t_inicio`, com os mesmos troços de janela().
+        @details Exato sobre as amostras brutas; nos troços agregados usa a contagem,
+                 os extremos e a média de cada intervalo (o início conta ao intervalo).
+        @param t_inicio (float): Início (segundos desde a epoch).
+        @return (tuple): (contagem, mínimo, máximo, média); os três últimos None se não houver amostras.
+        """
+        trocos, tempos, valores = self._trocos(t_inicio)
+        partes = []
+        if len(valores):
+            partes.append((len(valores), float(valores.min()), float(valores.max()), float(valores.sum())))
+        for _, linhas in trocos:
+            contagens = linhas[CONTAGEM]
+            partes.append((int(contagens.sum()), float(linhas[MINIMO].min()), float(linhas[MAXIMO].max()),
+                           float(contagens @ linhas[MEDIA])))
+        if not partes:
+            return 0, None, None, None
+        contagem = sum(parte[0] for parte in partes)
+        return (contagem, min(parte[1] for parte in partes), max(parte[2] for parte in partes),
+                sum(parte[3] for parte in partes) / contagem)
+
+    def limpar(self):
+        """!
+        @brief Descarta todas as amostras e intervalos (sem realocar).
+        """
+        self.bruto.limpar()
+        for nivel in self.niveis:
+            nivel.limpar()
@@ -0,0 +1,309 @@
+"""!
+@file log_archive.py
+@brief Formato binário compacto (colunar, comprimido) para o log contínuo.
+@details Alternativa ao CSV para logs longos com muitos sensores. O ficheiro é
+         uma sequência de blocos independentes; cada bloco guarda N linhas em
+         colunas separadas, comprimidas com zlib:
+         - timestamps em milissegundos desde a epoch, codificados em delta (int64);
+         - índice do sensor (uint16) numa tabela de nomes do próprio bloco;
+         - valores (float64).
+         O cabeçalho de cada bloco (não comprimido) tem o número de linhas e o
+         intervalo [t_min, t_max], o que permite ao ArchiveReader saltar blocos
+         fora do intervalo pedido sem os descomprimir.
+
+         Layout:
+         - ficheiro: MAGIC_FICHEIRO (4 bytes) + versão (uint8)
+         - bloco: MAGIC_BLOCO (4 bytes) + struct FORMATO_CABECALHO_BLOCO + payload zlib
+"""
+
+import glob
+import math
+import os
+import re
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from src.timestamps import para_epoch
+
+MAGIC_FICHEIRO = b'SLOG'
+VERSAO = 1
+MAGIC_BLOCO = b'BLK1'
+# n_linhas (uint32), t_min, t_max (float64, segundos), tamanho do payload (uint32)
+FORMATO_CABECALHO_BLOCO = '<IddI'
+TAMANHO_CABECALHO_BLOCO = len(MAGIC_BLOCO) + struct.calcsize(FORMATO_CABECALHO_BLOCO)
+# Separador entre group, sensor_id e unit na tabela de nomes
+SEPARADOR_NOME = '\x1f'
+
+DEFAULT_LINHAS_POR_BLOCO = 4096
+DEFAULT_IDADE_MAXIMA_BLOCO = 60.0   # segundos
+# Bytes lidos do fim do ficheiro para encontrar o último bloco (ver ArchiveReader.intervalo)
+PROCURA_ULTIMO_BLOCO = 1024 * 1024
+# Sufixo dos ficheiros rodados, entre a base e a extensão (ver LogWriter.nome_rotacionado)
+PADRAO_ROTACAO = re.compile(r'\.[0-9]{8}-[0-9]{6}-[0-9]{3}Z')
+
+
+def arquivos_rotacionados(filename):
+    """!
+    @brief Lista o ficheiro de log e as suas versões rodadas, da mais antiga para a atual.
+    @details As versões rodadas têm o nome "<base>.<AAAAmmdd-HHMMSS-mmm>Z<ext>",
+             com a data/hora em UTC (ver LogWriter); outros ficheiros com a mesma
+             base (ex: "<base>.backup<ext>") são ignorados.
+    @param filename (str): O caminho do ficheiro de log atual.
+    @return (list): Os caminhos existentes, em ordem cronológica.
+    """
+    base, ext = os.path.splitext(filename)
+    caminhos = sorted(
+        caminho for caminho in glob.glob(f"{glob.escape(base)}.*{ext}")
+        if PADRAO_ROTACAO.fullmatch(caminho[len(base):len(caminho) - len(ext)])
+    )
+    if os.path.exists(filename):
+        caminhos.append(filename)
+    return caminhos
+
+
+class ArchiveWriter:
+    """!
+    @brief Escreve linhas do log no formato binário colunar.
+    @details Mesma interface usada pelo LogWriter para o CSV (writerows,
+             flush, close, tamanho). As linhas acumulam em memória e são
+             gravadas como um bloco quando há `linhas_por_bloco` linhas ou
+             quando o bloco aberto fica mais velho que `idade_maxima_bloco`
+             (por isso, numa falha, perdem-se no máximo esses segundos de dados).
+             Linhas sem timestamp válido não são gravadas (não há como as
+             posicionar no tempo) e são contadas em `linhas_sem_tempo`.
+    """
+
+    def __init__(self, filename, linhas_por_bloco=DEFAULT_LINHAS_POR_BLOCO,
+                 idade_maxima_bloco=DEFAULT_IDADE_MAXIMA_BLOCO):
+        """!
+        @brief Construtor do ArchiveWriter (abre o ficheiro em modo 'append').
+        @param filename (str): O caminho do ficheiro.
+        @param linhas_por_bloco (int): Número de linhas por bloco comprimido.
+        @param idade_maxima_bloco (float): Tempo máximo (s) antes de gravar um bloco incompleto.
+        """
+        self.filename = filename
+        self.linhas_por_bloco = linhas_por_bloco
+        self.idade_maxima_bloco = idade_maxima_bloco
+        self.linhas_sem_tempo = 0
+        self.f = open(filename, 'ab')
+        if self.f.tell() == 0:
+            self.f.write(MAGIC_FICHEIRO + struct.pack('<B', VERSAO))
+        self._limpar_bloco()
+
+    def _limpar_bloco(self):
+        self._tempos = []
+        self._indices = []
+        self._valores = []
+        self._nomes = {}
+        self._inicio_bloco = None
+
+    def writerows(self, rows):
+        """!
+        @brief Acrescenta linhas ao bloco aberto (gravando os blocos que encherem).
+        @param rows (list): Linhas no formato de CSV_HEADER: [ts, group, sensor_id, value, unit],
+                            com 'ts' em segundos desde a epoch (ou string ISO).
+        @return (int): O número de linhas aceites (as sem timestamp válido são descartadas).
+        """
+        if self._inicio_bloco is None and rows:
+            self._inicio_bloco = time.monotonic()
+        aceites = 0
+        for ts, group, sensor_id, value, unit in rows:
+            tempo = para_epoch(ts)
+            if tempo is None or not math.isfinite(tempo):
+                self.linhas_sem_tempo += 1
+                continue
+            nome = SEPARADOR_NOME.join(
+                str(campo).replace('\n', ' ') for campo in (group, sensor_id, unit)
+            )
+            indice = self._nomes.get(nome)
+            if indice is None:
+                indice = self._nomes[nome] = len(self._nomes)
+            self._tempos.append(tempo)
+            self._indices.append(indice)
+            self._valores.append(float(value))
+            aceites += 1
+            if len(self._valores) >= self.linhas_por_bloco:
+                self._gravar_bloco()
+                self._inicio_bloco = time.monotonic()
+        return aceites
+
+    def _gravar_bloco(self):
+        if not self._valores:
+            return
+        tempos = np.asarray(self._tempos, dtype=np.float64)
+        # Milissegundos em delta: timestamps regulares viram quase só zeros/constantes
+        ms = np.round(tempos * 1000.0).astype(np.int64)
+        deltas = np.diff(ms, prepend=np.int64(0))
+
+        # Tabela de nomes: cada nome (group, sensor_id, unit) numa linha
+        nomes = '\n'.join(self._nomes).encode('utf-8')
+        payload = b''.join((
+            struct.pack('<II', len(self._nomes), len(nomes)),
+            nomes,
+            deltas.tobytes(),
+            np.asarray(self._indices, dtype=np.uint16).tobytes(),
+            np.asarray(self._valores, dtype=np.float64).tobytes(),
+        ))
+        comprimido = zlib.compress(payload, 6)
+        self.f.write(MAGIC_BLOCO + struct.pack(
+            FORMATO_CABECALHO_BLOCO, len(self._valores),
+            float(tempos.min()), float(tempos.max()), len(comprimido)
+        ))
+        self.f.write(comprimido)
+        self._limpar_bloco()
+
+    def flush(self):
+        """!
+        @brief Grava o bloco aberto se estiver mais velho que `idade_maxima_bloco`.
+        """
+        if self._inicio_bloco is not None and \
+                time.monotonic() - self._inicio_bloco >= self.idade_maxima_bloco:
+            self._gravar_bloco()
+        self.f.flush()
+
+    def tamanho(self):
+        """!
+        @brief Tamanho atual do ficheiro em disco (bytes), usado na rotação.
+        """
+        return self.f.tell()
+
+    def close(self):
+        """!
+        @brief Grava o bloco aberto (mesmo incompleto) e fecha o ficheiro.
+        """
+        self._gravar_bloco()
+        self.f.close()
+
+
+class ArchiveReader:
+    """!
+    @brief Lê ficheiros no formato binário colunar.
+    """
+
+    def __init__(self, filename):
+        """!
+        @brief Construtor do ArchiveReader.
+        @param filename (str): O caminho do ficheiro.
+        @exception ValueError Se o ficheiro não estiver no formato esperado.
+        """
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            cabecalho = f.read(len(MAGIC_FICHEIRO) + 1)
+        if cabecalho[:len(MAGIC_FICHEIRO)] != MAGIC_FICHEIRO:
+            raise ValueError(f"{filename} não é um arquivo de log binário")
+
+    def blocos(self):
+        """!
+        @brief Percorre só os cabeçalhos dos blocos (sem descomprimir).
+        @return (generator): Tuplos (offset_payload, n_linhas, t_min, t_max, tamanho_payload).
+        """
+        with open(self.filename, 'rb') as f:
+            f.seek(len(MAGIC_FICHEIRO) + 1)
+            while True:
+                cabecalho = f.read(TAMANHO_CABECALHO_BLOCO)
+                if len(cabecalho) < TAMANHO_CABECALHO_BLOCO or \
+                        cabecalho[:len(MAGIC_BLOCO)] != MAGIC_BLOCO:
+                    return  # Fim do ficheiro (ou bloco truncado por uma falha)
+                n, t_min, t_max, tamanho = struct.unpack(
+                    FORMATO_CABECALHO_BLOCO, cabecalho[len(MAGIC_BLOCO):]
+                )
+                offset = f.tell()
+                yield offset, n, t_min, t_max, tamanho
+                f.seek(offset + tamanho)
+
+    def intervalo(self):
+        """!
+        @brief O 't_min' do primeiro bloco e o 't_max' do último, sem percorrer o ficheiro.
+        @details O último bloco é procurado de trás para a frente (até
+                 PROCURA_ULTIMO_BLOCO bytes): um MAGIC_BLOCO só é aceite se o seu
+                 payload acabar no fim do ficheiro ou no início de outro bloco
+                 (o payload comprimido pode conter esses bytes por acaso). Se não
+                 for encontrado (ex: bloco final truncado), percorre os cabeçalhos.
+        @return (tuple | None): O par (t_inicio, t_fim), ou None se não houver blocos.
+        """
+        with open(self.filename, 'rb') as f:
+            f.seek(len(MAGIC_FICHEIRO) + 1)
+            cabecalho = f.read(TAMANHO_CABECALHO_BLOCO)
+            if len(cabecalho) < TAMANHO_CABECALHO_BLOCO or \
+                    cabecalho[:len(MAGIC_BLOCO)] != MAGIC_BLOCO:
+                return None
+            t_inicio = struct.unpack(FORMATO_CABECALHO_BLOCO, cabecalho[len(MAGIC_BLOCO):])[1]
+
+            tamanho_ficheiro = os.fstat(f.fileno()).st_size
+            inicio = max(len(MAGIC_FICHEIRO) + 1, tamanho_ficheiro - PROCURA_ULTIMO_BLOCO)
+            f.seek(inicio)
+            cauda = f.read()
+        fins = {len(cauda)}  # Posições (na cauda) onde um bloco pode acabar
+        pos = cauda.rfind(MAGIC_BLOCO)
+        while pos >= 0:
+            if pos + TAMANHO_CABECALHO_BLOCO <= len(cauda):
+                _, _, t_max, tamanho = struct.unpack(
+                    FORMATO_CABECALHO_BLOCO, cauda[pos + len(MAGIC_BLOCO):pos + TAMANHO_CABECALHO_BLOCO]
+                )
+                if pos + TAMANHO_CABECALHO_BLOCO + tamanho in fins:
+                    return t_inicio, t_max
+            fins.add(pos)
+            pos = cauda.rfind(MAGIC_BLOCO, 0, pos)
+
+        ultimo = None
+        for ultimo in self.blocos():
+            pass
+        return t_inicio, ultimo[3]
+
+    def ler(self, t_inicio=None, t_fim=None):
+        """!
+        @brief Lê os blocos que intersectam [t_inicio, t_fim].
+        @param t_inicio (float): Início do intervalo (segundos desde a epoch) ou None.
+        @param t_fim (float): Fim do intervalo ou None.
+        @return (generator): Por bloco, um tuplo (tempos, chaves, indices, valores):
+                 `tempos` e `valores` em float64, `indices` em uint16 e `chaves`
+                 a lista de (group, sensor_id, unit) para que os índices apontam.
+        """
+        with open(self.filename, 'rb') as f:
+            for offset, n, t_min, t_max, tamanho in self.blocos():
+                if (t_inicio is not None and t_max < t_inicio) or \
+                        (t_fim is not None and t_min > t_fim):
+                    continue
+                f.seek(offset)
+                payload = zlib.decompress(f.read(tamanho))
+                n_nomes, tamanho_nomes = struct.unpack_from('<II', payload, 0)
+                pos = 8
+                nomes = payload[pos:pos + tamanho_nomes].decode('utf-8').split('\n') if n_nomes else []
+                pos += tamanho_nomes
+                ms = np.cumsum(np.frombuffer(payload, dtype=np.int64, count=n, offset=pos))
+                pos += 8 * n
+                indices = np.frombuffer(payload, dtype=np.uint16, count=n, offset=pos)
+                pos += 2 * n
+                valores = np.frombuffer(payload, dtype=np.float64, count=n, offset=pos)
+                tempos = ms / 1000.0
+
+                if t_inicio is not None or t_fim is not None:
+                    mascara = np.ones(n, dtype=bool)
+                    if t_inicio is not None:
+                        mascara &= tempos >= t_inicio
+                    if t_fim is not None:
+                        mascara &= tempos <= t_fim
+                    tempos, indices, valores = tempos[mascara], indices[mascara], valores[mascara]
+
+                chaves = [tuple(nome.split(SEPARADOR_NOME)) for nome in nomes]
+                yield tempos, chaves, indices, valores
+
+    def carregar(self, t_inicio=None, t_fim=None):
+        """!
+        @brief Carrega o intervalo pedido de uma só vez.
+        @param t_inicio (float): Início do intervalo (segundos desde a epoch) ou None.
+        @param t_fim (float): Fim do intervalo ou None.
+        @return (dict): (group, sensor_id, unit) -> (tempos, valores), em arrays float64.
+        """
+        partes = {}
+        for tempos, chaves, indices, valores in self.ler(t_inicio, t_fim):
+            for i, chave in enumerate(chaves):
+                mascara = indices == i
+                partes.setdefault(chave, []).append((tempos[mascara], valores[mascara]))
+        return {
+            chave: (np.concatenate([t for t, _ in p]), np.concatenate([v for _, v in p]))
+            for chave, p in partes.items()
+        }
@@ -0,0 +1,270 @@
+"""!
+@file log_writer.py
+@brief Implementa a thread de escrita do log automático (log contínuo).
+@details Este módulo contém a classe LogWriter, que herda de QThread.
+         A UI apenas coloca linhas numa fila limitada; a thread mantém o
+         ficheiro aberto e escreve as linhas em lote, fazendo flush quando
+         acumula linhas suficientes ou passa tempo suficiente, para que
+         discos lentos (ex: unidades de rede) não bloqueiem a interface.
+         O ficheiro pode ser rodado por tamanho e/ou por tempo e gravado em
+         CSV ou no formato binário colunar de log_archive.py.
+"""
+
+import csv
+import os
+import queue
+import time
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.log_archive import ArchiveWriter
+from src.timestamps import ConversorTimestamp
+from src.metrics import Histograma, LIMITES_MILISSEGUNDOS, LIMITES_SEGUNDOS
+
+# --- Valores padrão (podem ser alterados na secção [Log] do config.ini) ---
+DEFAULT_TAMANHO_FILA = 10000
+DEFAULT_LINHAS_POR_FLUSH = 500
+DEFAULT_INTERVALO_FLUSH = 1.0   # segundos
+# Rotação: 0 desativa o critério correspondente
+DEFAULT_ROTACAO_BYTES = 0
+DEFAULT_ROTACAO_SEGUNDOS = 0
+FORMATO_CSV = 'csv'
+FORMATO_BINARIO = 'binario'
+# Buffer do ficheiro aberto (bytes)
+TAMANHO_BUFFER_FICHEIRO = 1024 * 1024
+
+
+class CsvSink:
+    """!
+    @brief Destino CSV do LogWriter (ficheiro de texto aberto em modo 'append').
+    """
+
+    def __init__(self, filename, header):
+        """!
+        @brief Abre o ficheiro e escreve o cabeçalho se ele for novo (ou vazio).
+        @param filename (str): O caminho do ficheiro CSV.
+        @param header (list): O cabeçalho do CSV.
+        """
+        novo = not os.path.exists(filename) or os.path.getsize(filename) == 0
+        self.conversor = ConversorTimestamp()
+        self.f = open(filename, 'a', newline='', encoding='utf-8',
+                      buffering=TAMANHO_BUFFER_FICHEIRO)
+        self.writer = csv.writer(self.f)
+        if novo:
+            self.writer.writerow(header)
+
+    def writerows(self, rows):
+        """!
+        @brief Escreve as linhas, convertendo o timestamp numérico (1.ª coluna) para ISO 8601.
+        @param rows (list): Linhas [ts_epoch, group, sensor_id, value, unit].
+        @return (int): O número de linhas escritas (todas).
+        """
+        para_iso = self.conversor.para_iso
+        self.writer.writerows(
+            [para_iso(row[0]), *row[1:]] if isinstance(row[0], float) else row
+            for row in rows
+        )
+        return len(rows)
+
+    def flush(self):
+        self.f.flush()
+
+    def tamanho(self):
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+
+class LogWriter(QThread):
+    """!
+    @brief Thread que escreve as linhas do log automático em segundo plano.
+    @details As linhas entram por escrever() (não bloqueante). Se a fila estiver
+             cheia a linha é descartada e contada em `linhas_descartadas`, em vez
+             de bloquear quem chamou.
+    """
+
+    erro = pyqtSignal(str)
+    """!
+    @brief Sinal emitido (com a mensagem) quando o ficheiro não pode ser aberto/escrito.
+    @details A thread termina depois de emitir este sinal.
+    """
+
+    def __init__(self, filename, header, tamanho_fila=DEFAULT_TAMANHO_FILA,
+                 linhas_por_flush=DEFAULT_LINHAS_POR_FLUSH,
+                 intervalo_flush=DEFAULT_INTERVALO_FLUSH, formato=FORMATO_CSV,
+                 rotacao_bytes=DEFAULT_ROTACAO_BYTES,
+                 rotacao_segundos=DEFAULT_ROTACAO_SEGUNDOS, parent=None):
+        """!
+        @brief Construtor da classe LogWriter.
+
+        @param filename (str): Caminho do ficheiro (aberto em modo 'append').
+        @param header (list): Cabeçalho escrito se o ficheiro CSV ainda não existir.
+        @param tamanho_fila (int): Número máximo de linhas à espera de escrita.
+        @param linhas_por_flush (int): Faz flush ao acumular este número de linhas.
+        @param intervalo_flush (float): Faz flush pelo menos a cada N segundos.
+        @param formato (str): FORMATO_CSV ou FORMATO_BINARIO.
+        @param rotacao_bytes (int): Roda o ficheiro ao atingir este tamanho (0 = nunca).
+        @param rotacao_segundos (float): Roda o ficheiro a cada N segundos (0 = nunca).
+        @param parent (QObject): O objeto pai do Qt (opcional).
+        """
+        super().__init__(parent)
+        self.filename = filename
+        self.header = header
+        self.linhas_por_flush = linhas_por_flush
+        self.intervalo_flush = intervalo_flush
+        self.formato = formato
+        self.rotacao_bytes = rotacao_bytes
+        self.rotacao_segundos = rotacao_segundos
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.running = True
+
+        # --- Contadores (lidos pela UI) ---
+        self.linhas_escritas = 0
+        self.linhas_descartadas = 0
+        # Linhas que o formato binário não grava por não terem timestamp válido
+        self.linhas_sem_tempo = 0
+
+        # --- Métricas (ver src/metrics.py) ---
+        # Tempo de cada escrita em lote (ms) e idade da última linha escrita (s)
+        self.tempo_escrita = Histograma(LIMITES_MILISSEGUNDOS)
+        self.atraso = Histograma(LIMITES_SEGUNDOS)
+
+    @property
+    def linhas_pendentes(self):
+        """!
+        @brief Número de linhas na fila, ainda por escrever.
+        """
+        return self.fila.qsize()
+
+    def escrever(self, row):
+        """!
+        @brief Coloca uma linha na fila de escrita (não bloqueia).
+        @param row (list): Os campos da linha, na ordem do cabeçalho ('ts' em
+                           segundos desde a epoch).
+        @return (bool): False se a linha foi descartada (fila cheia ou thread parada).
+        """
+        if not self.running:
+            return False
+        try:
+            self.fila.put_nowait(row)
+            return True
+        except queue.Full:
+            self.linhas_descartadas += 1
+            return False
+
+    def abrir_sink(self):
+        """!
+        @brief Abre o destino das linhas (CSV ou binário) no ficheiro atual.
+        @return (CsvSink | ArchiveWriter): O destino aberto.
+        """
+        if self.formato == FORMATO_BINARIO:
+            return ArchiveWriter(self.filename)
+        return CsvSink(self.filename, self.header)
+
+    def nome_rotacionado(self):
+        """!
+        @brief Gera o nome livre para o ficheiro rodado: "<base>.<AAAAmmdd-HHMMSS-mmm>Z<ext>".
+        @details Data/hora em UTC (o 'Z'), com largura fixa, para que a ordem
+                 alfabética seja a ordem cronológica mesmo nas mudanças de hora
+                 de verão (ver log_archive.arquivos_rotacionados).
+        @return (str): O caminho do ficheiro rodado.
+        """
+        base, ext = os.path.splitext(self.filename)
+        while True:
+            agora = time.time()
+            carimbo = time.strftime('%Y%m%d-%H%M%S', time.gmtime(agora))
+            destino = f"{base}.{carimbo}-{int(agora * 1000) % 1000:03d}Z{ext}"
+            if not os.path.exists(destino):
+                return destino
+            time.sleep(0.001)
+
+    def rodar(self, sink):
+        """!
+        @brief Fecha o ficheiro atual, renomeia-o com a data/hora e abre um novo.
+        @param sink (CsvSink | ArchiveWriter): O destino atual (é fechado).
+        @return (CsvSink | ArchiveWriter): O destino novo.
+        """
+        sink.close()
+        destino = self.nome_rotacionado()
+        os.replace(self.filename, destino)
+        print(f"Log rodado: {destino}")
+        return self.abrir_sink()
+
+    def run(self):
+        """!
+        @brief O "coração" da thread, executado quando .start() é chamado.
+        @details Abre o ficheiro uma única vez (escrevendo o cabeçalho se for novo)
+                 e entra no loop: junta as linhas disponíveis na fila, escreve-as
+                 em lote e faz flush por tamanho ou por tempo. A cada flush
+                 verifica se o ficheiro deve ser rodado. Ao parar, escreve o que
+                 ainda estiver na fila antes de fechar o ficheiro.
+        """
+        try:
+            sink = self.abrir_sink()
+        except Exception as e:
+            self.running = False
+            self.erro.emit(f"Não foi possível abrir {self.filename}: {e}")
+            return
+
+        try:
+            lote = []
+            nao_gravadas = 0
+            ultimo_flush = time.monotonic()
+            inicio_ficheiro = ultimo_flush
+            while self.running or not self.fila.empty():
+                try:
+                    # Acorda pelo menos a cada intervalo_flush para o flush por tempo
+                    row = self.fila.get(timeout=self.intervalo_flush)
+                    if row is not None:
+                        lote.append(row)
+                    # Junta tudo o que já estiver na fila, sem bloquear
+                    while len(lote) < self.linhas_por_flush:
+                        row = self.fila.get_nowait()
+                        if row is not None:
+                            lote.append(row)
+                except queue.Empty:
+                    pass
+
+                inicio = time.perf_counter()
+                escreveu = bool(lote)
+                if lote:
+                    aceites = sink.writerows(lote)
+                    nao_gravadas += aceites
+                    self.linhas_escritas += aceites
+                    self.linhas_sem_tempo += len(lote) - aceites
+                    if isinstance(lote[-1][0], float):
+                        self.atraso.observar(max(0.0, time.time() - lote[-1][0]))
+                    lote = []
+
+                agora = time.monotonic()
+                if nao_gravadas >= self.linhas_por_flush or agora - ultimo_flush >= self.intervalo_flush:
+                    sink.flush()
+                    nao_gravadas = 0
+                    ultimo_flush = agora
+
+                    if (self.rotacao_bytes and sink.tamanho() >= self.rotacao_bytes) or \
+                            (self.rotacao_segundos and agora - inicio_ficheiro >= self.rotacao_segundos):
+                        sink = self.rodar(sink)
+                        inicio_ficheiro = agora
+
+                if escreveu:
+                    self.tempo_escrita.observar((time.perf_counter() - inicio) * 1000.0)
+        except Exception as e:
+            self.running = False
+            self.erro.emit(f"Erro ao escrever no log {self.filename}: {e}")
+        finally:
+            sink.close()
+        print("Thread de log terminada.")
+
+    def stop(self):
+        """!
+        @brief Pára a thread de forma limpa.
+        @details Novas linhas deixam de ser aceites; as que já estão na fila
+                 ainda são escritas antes de o ficheiro ser fechado.
+        """
+        self.running = False
+        try:
+            # Acorda a thread imediatamente (se a fila estiver cheia, já está acordada)
+            self.fila.put_nowait(None)
+        except queue.Full:
+            pass
@@ -7,33 +7,43 @@
 """
 
 # Importando bibliotecas necessárias
-import configparser
-import csv
-import os
+import time
 from PyQt6.QtWidgets import (
     QMainWindow, QLabel, QWidget, QVBoxLayout, QHBoxLayout, 
-    QTableWidget, QTableWidgetItem, QHeaderView, 
+    QTableWidget, QTableWidgetItem, QTableView, QHeaderView, 
     QPushButton, QFileDialog, QMessageBox, QDoubleSpinBox,
-    QCheckBox, QFrame, QFormLayout
+    QCheckBox, QFrame, QFormLayout, QComboBox, QAbstractItemView, QSlider,
+    QProgressDialog, QDialog
 )
-from PyQt6.QtCore import Qt, QDateTime 
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QFont, QColor
 import pyqtgraph as pg
-from collections import deque
 
+from src.configuracao import Configuracao, CONFIG_FILENAME, CSV_HEADER, ALERTAS_HEADER
 from src.udp_listener import UDPListener
+from src.relay import RelayUDP
+from src.timestamps import normalizar_timestamp, formatar_hora, para_iso
+from src.log_writer import LogWriter
+from src.sensor_registry import SensorRegistry
+from src.ring_buffer import BYTES_POR_AMOSTRA
+from src.processor import SampleProcessor
+from src.alertas import MOTIVO_DECLIVE
+from src.historico_model import HistoricoTableModel
+from src.replay import FonteReplay, ReplayThread, VELOCIDADE_MAXIMA, limites_log
+from src.consultas import ServidorConsultas
+from src.exportacao import ExportThread, blocos_memoria, blocos_log, COLUNA_AGREGADO
+from src.dialogo_exportacao import DialogoExportacao, ORIGEM_LOG
+from src.metrics import (
+    Histograma, RegistoMetricas, ResumoMetricas, MetricsExporter,
+    registar_pipeline, LIMITES_MILISSEGUNDOS
+)
 
-# --- Constantes de Alerta (Valores Padrão) ---
-DEFAULT_TEMP_MIN = 15.0
-DEFAULT_TEMP_MAX = 30.0
-# ---------------------------------------------
-
-HISTORICO_SEGUNDOS = 60
-TAMANHO_TABELA = 10 
-
-LOG_FILENAME = "sensor_log_continuo.csv"
-# Cabeçalho do CSV
-CSV_HEADER = ['ts', 'group', 'sensor_id', 'value', 'unit']
+# Altura fixa (pixels) das linhas da tabela de leituras
+ALTURA_LINHA_TABELA = 22
+# Intervalo (ms) de atualização do painel de diagnóstico
+INTERVALO_DIAGNOSTICO_MS = 1000
+# Velocidades de reprodução oferecidas no replay (texto, fator)
+VELOCIDADES_REPLAY = (("1x", 1.0), ("10x", 10.0), ("Máx.", VELOCIDADE_MAXIMA))
 
 # --- Cores ---
 COR_FUNDO = "#1E1E1E"       
@@ -52,19 +62,22 @@ class MainWindow(QMainWindow):
     @details Herda de QMainWindow e compõe todos os widgets da UI,
              inicia o listener UDP e atualiza a interface com os dados recebidos.
     """
-    def __init__(self):
+    def __init__(self, config_filename=CONFIG_FILENAME):
         """!
         @brief Construtor da MainWindow.
         @details Inicializa a UI, lê o ficheiro de configuração, aplica estilos,
                  cria os layouts, inicializa os buffers de dados e inicia o listener UDP.
+        @param config_filename (str): O caminho do ficheiro de configuração.
         """
         super().__init__()
 
         # --- 1. Ler Configuração ---
-        config = configparser.ConfigParser()
-        config.read('config.ini')
-        udp_ip = config['Network']['UDP_IP']
-        udp_port = int(config['Network']['UDP_PORT'])
+        # (partilhada com o modo headless, ver src/configuracao.py)
+        config = Configuracao(config_filename)
+        self.historico_segundos = config.historico_segundos
+        self.linhas_tabela = config.linhas_tabela
+        self.config_log = config.config_log
+        self.log_filename = config.log_filename
 
         # --- 2. Configurações da Janela ---
         self.setWindowTitle("Monitor de Sensor (Grupo 6) - v5.3")
@@ -75,13 +88,42 @@ class MainWindow(QMainWindow):
 
         # --- 4. Buffers de Dados e Flags ---
         """!
-        @brief Buffers de dados para o gráfico/tabela e flags de controlo.
+        @brief Registo de sensores (um buffer por (group, sensor_id)) e flags de controlo.
+        @details O registo é escrito pela thread de processamento (SampleProcessor);
+                 a UI só recebe cópias prontas a desenhar.
         """
-        self.data_buffer_grafico = deque(maxlen=HISTORICO_SEGUNDOS)
-        self.data_buffer_tabela = deque(maxlen=TAMANHO_TABELA) 
+        # A tabela de leituras (HistoricoTableModel) também conta para MEMORIA_MB
+        self.registry = SensorRegistry(
+            config.capacidade_historico(), tamanho_minimo=self.linhas_tabela,
+            memoria_reservada=self.linhas_tabela * BYTES_POR_AMOSTRA, **config.config_historico
+        )
+        # Chave (group, sensor_id) do sensor mostrado no destaque/gráfico/tabela
+        self.sensor_selecionado = None
+        # Uma curva por sensor, criada quando o sensor aparece pela primeira vez
+        self.curvas = {}
         self.is_logging_auto = False 
-        self.limite_min = DEFAULT_TEMP_MIN
-        self.limite_max = DEFAULT_TEMP_MAX
+        # Thread de escrita do log automático (criada ao marcar o checkbox)
+        self.log_writer = None
+        # O último LogWriter parado, que pode ainda estar a esvaziar a fila
+        self.log_writer_anterior = None
+        self.limite_min = config.limite_min
+        self.limite_max = config.limite_max
+        self.limite_declive = config.limite_declive
+        self.janelas_estatisticas = config.janelas_estatisticas
+        # Thread de replay de um log gravado (None = dados ao vivo)
+        self.replay = None
+        # Exportação CSV em curso (None = nenhuma)
+        self.export_thread = None
+        self.progresso_exportacao = None
+        # Threads já paradas que ainda estão a terminar (ver terminar_thread)
+        self.threads_a_terminar = set()
+
+        # Estado de alerta atualmente desenhado, (em_alerta, alerta_declive) (None = ainda nada desenhado)
+        self.estado_alerta = None
+        # Tempo de cada renderizar_frame (ms) e erros durante o desenho
+        self.tempo_frame = Histograma(LIMITES_MILISSEGUNDOS)
+        self.erros_frame = 0
+        self.ultimo_erro_frame = None
 
         # --- 5. Layouts ---
         layout_principal = QHBoxLayout()
@@ -93,11 +135,76 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(layout_principal)
         self.setCentralWidget(central_widget)
 
-        # --- 6. Iniciar o Listener ---
-        self.listener = UDPListener(udp_ip, udp_port)
-        self.listener.data_received.connect(self.update_data)
+        # --- 6. Iniciar o Processamento e o Listener ---
+        self.processor = SampleProcessor(
+            self.registry, self.historico_segundos, self.linhas_tabela,
+            self.limite_min, self.limite_max, tamanho_fila=config.tamanho_fila_processamento,
+            janelas_estatisticas=self.janelas_estatisticas, limite_declive=self.limite_declive,
+            histerese=config.histerese, atraso_alerta=config.atraso_alerta
+        )
+        # Log dos eventos de alerta (início/fim), sempre ligado se configurado
+        self.log_eventos = None
+        if config.ficheiro_eventos:
+            self.log_eventos = LogWriter(config.ficheiro_eventos, ALERTAS_HEADER)
+            self.log_eventos.erro.connect(self.on_log_eventos_erro)
+            self.log_eventos.start()
+            self.processor.log_eventos = self.log_eventos
+        self.processor.start()
+
+        # Reenvio dos pacotes para outros monitores (opcional)
+        relay = None
+        if config.relay_destinos:
+            relay = RelayUDP(config.relay_destinos, sensores_binarios=config.sensores_binarios,
+                             **config.config_relay)
+        self.listener = UDPListener(config.udp_ip, config.udp_port, rcvbuf=config.udp_rcvbuf,
+                                    maximo_lote=config.udp_maximo_lote,
+                                    endpoints=config.udp_endpoints or None,
+                                    sensores_binarios=config.sensores_binarios,
+                                    relay=relay, grupos_multicast=config.udp_grupos_multicast)
+        # DirectConnection: os lotes vão da thread do listener direto para a fila
+        # do processamento, sem passar pelo loop de eventos da UI
+        self.listener.batch_received.connect(
+            self.processor.enfileirar, Qt.ConnectionType.DirectConnection
+        )
         self.listener.start()
 
+        # --- 7. Timer de Renderização ---
+        # A UI é redesenhada uma vez por frame, com os resultados já
+        # preparados pela thread de processamento.
+        self.render_timer = QTimer(self)
+        self.render_timer.setInterval(max(1, int(1000 / max(1, config.render_fps))))
+        self.render_timer.timeout.connect(self.renderizar_frame)
+        self.render_timer.start()
+
+        # --- 8. Métricas de Desempenho ---
+        self.metricas = RegistoMetricas()
+        registar_pipeline(self.metricas, self.listener, self.processor, lambda: self.log_writer)
+        self.metricas.histograma('tempo_frame_ms', "Tempo de cada frame da interface (ms)",
+                                 self.tempo_frame)
+        self.metricas.contador('erros_frame_total', "Erros ao desenhar um frame",
+                               lambda: self.erros_frame)
+        self.resumo_metricas = ResumoMetricas(self.metricas)
+        self.diagnostico_timer = QTimer(self)
+        self.diagnostico_timer.setInterval(INTERVALO_DIAGNOSTICO_MS)
+        self.diagnostico_timer.timeout.connect(self.atualizar_diagnostico)
+        self.diagnostico_checkbox.setChecked(config.metricas_painel)
+
+        self.metrics_exporter = None
+        if config.exportar_metricas():
+            self.metrics_exporter = MetricsExporter(
+                self.metricas, config.metricas_ficheiro, config.metricas_intervalo,
+                config.metricas_http_ip, config.metricas_http_porta
+            )
+            self.metrics_exporter.start()
+
+        # Serviço local de consultas aos buffers (para outros processos)
+        self.servidor_consultas = None
+        if config.consultas_porta > 0:
+            self.servidor_consultas = ServidorConsultas(
+                self.registry, config.consultas_ip, config.consultas_porta, config.consultas_maximo_pontos
+            )
+            self.servidor_consultas.start()
+
 # -- Funções de Estilo e Criação de Componentes ---
     def aplicar_estilo_escuro(self):
         """!
@@ -108,7 +215,7 @@ class MainWindow(QMainWindow):
         self.setStyleSheet(f"""
             QMainWindow {{ background-color: {COR_FUNDO}; }}
             QLabel {{ color: {COR_TEXTO}; font-size: 14px; }}
-            QTableWidget {{
+            QTableView {{
                 background-color: {COR_FUNDO_PAINEL};
                 color: {COR_TEXTO};
                 gridline-color: {COR_GRID};
@@ -186,6 +293,34 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.label_valor_atual)
         layout.addWidget(self.label_status)
         layout.addWidget(self.label_ultima_atualizacao)
+
+        # Estatísticas móveis do sensor selecionado (uma linha por janela)
+        self.label_estatisticas = QLabel("")
+        self.label_estatisticas.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.label_estatisticas.setStyleSheet(f"color: {COR_TEXTO}; font-family: monospace; font-size: 12px;")
+        layout.addWidget(self.label_estatisticas)
+
+        # Visão geral: uma linha por sensor, criada quando o sensor aparece
+        self.tabela_sensores = QTableWidget()
+        self.tabela_sensores.setColumnCount(3)
+        self.tabela_sensores.setHorizontalHeaderLabels(["Sensor", "Valor", "Estado"])
+        self.tabela_sensores.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Stretch
+        )
+        self.tabela_sensores.verticalHeader().setVisible(False)
+        self.tabela_sensores.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.tabela_sensores.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tabela_sensores.cellClicked.connect(self.on_visao_geral_clicada)
+        layout.addWidget(self.tabela_sensores)
+
+        # Painel de diagnóstico (métricas de desempenho), escondido por omissão
+        self.label_diagnostico = QLabel("")
+        self.label_diagnostico.setStyleSheet(
+            f"color: {COR_TEXTO}; font-family: monospace; font-size: 11px;"
+            f"background-color: {COR_FUNDO_PAINEL}; padding: 5px;"
+        )
+        self.label_diagnostico.setVisible(False)
+        layout.addWidget(self.label_diagnostico)
         
         return layout
 
@@ -205,36 +340,87 @@ class MainWindow(QMainWindow):
         
         self.spin_min = QDoubleSpinBox()
         self.spin_min.setRange(-100, 200)
-        self.spin_min.setValue(DEFAULT_TEMP_MIN)
+        self.spin_min.setValue(self.limite_min)
         self.spin_min.valueChanged.connect(self.limite_dinamico_mudou)
         
         self.spin_max = QDoubleSpinBox()
         self.spin_max.setRange(-100, 200)
-        self.spin_max.setValue(DEFAULT_TEMP_MAX)
+        self.spin_max.setValue(self.limite_max)
         self.spin_max.valueChanged.connect(self.limite_dinamico_mudou)
+
+        # Variação máxima (unidades/min) na janela mais curta; 0 = desligado
+        self.spin_declive = QDoubleSpinBox()
+        self.spin_declive.setRange(0, 1000)
+        self.spin_declive.setSpecialValueText("Desligado")
+        self.spin_declive.setValue(self.limite_declive)
+        self.spin_declive.valueChanged.connect(self.limite_dinamico_mudou)
         
+        self.combo_sensor = QComboBox()
+        self.combo_sensor.currentIndexChanged.connect(self.on_sensor_selecionado)
+        config_layout.addRow("Sensor:", self.combo_sensor)
+
         config_layout.addRow("Limite Mín. Alerta:", self.spin_min)
         config_layout.addRow("Limite Máx. Alerta:", self.spin_max)
+        config_layout.addRow("Limite Declive (/min):", self.spin_declive)
         
-        self.log_auto_checkbox = QCheckBox(f"Log Automático ({LOG_FILENAME})")
+        self.log_auto_checkbox = QCheckBox(f"Log Automático ({self.log_filename})")
         self.log_auto_checkbox.toggled.connect(self.on_auto_logging_toggled)
         config_layout.addRow(self.log_auto_checkbox)
+
+        self.label_log_status = QLabel("")
+        config_layout.addRow(self.label_log_status)
+
+        self.label_rede_status = QLabel("")
+        config_layout.addRow(self.label_rede_status)
+
+        self.diagnostico_checkbox = QCheckBox("Painel de Diagnóstico")
+        self.diagnostico_checkbox.toggled.connect(self.on_diagnostico_toggled)
+        config_layout.addRow(self.diagnostico_checkbox)
+
+        # --- Replay de logs gravados ---
+        self.replay_abrir_button = QPushButton("Abrir Log...")
+        self.replay_abrir_button.clicked.connect(self.on_abrir_replay)
+        self.combo_velocidade = QComboBox()
+        for texto, velocidade in VELOCIDADES_REPLAY:
+            self.combo_velocidade.addItem(texto, velocidade)
+        self.combo_velocidade.currentIndexChanged.connect(self.on_velocidade_replay)
+        self.replay_vivo_button = QPushButton("Voltar ao Vivo")
+        self.replay_vivo_button.setEnabled(False)
+        self.replay_vivo_button.clicked.connect(self.parar_replay)
+        layout_replay = QHBoxLayout()
+        layout_replay.addWidget(self.replay_abrir_button)
+        layout_replay.addWidget(self.combo_velocidade)
+        layout_replay.addWidget(self.replay_vivo_button)
+        config_layout.addRow("Replay:", layout_replay)
+
+        # Posição do replay (segundos desde a epoch); arrastar procura outro instante
+        self.slider_replay = QSlider(Qt.Orientation.Horizontal)
+        self.slider_replay.sliderReleased.connect(self.on_slider_replay)
+        self.label_replay = QLabel("")
+        self.slider_replay.setVisible(False)
+        self.label_replay.setVisible(False)
+        config_layout.addRow(self.slider_replay)
+        config_layout.addRow(self.label_replay)
         
-        self.plot_widget = pg.PlotWidget()
-        self.plot_widget.setTitle("Histórico (Últimos 60s)")
-        self.plot_curve = self.plot_widget.plot(
-            pen=pg.mkPen(COR_GRAFICO, width=2)
-        )
+        # Eixo X em tempo real (UTC, como a tabela), a partir do campo 'ts'
+        self.plot_widget = pg.PlotWidget(axisItems={'bottom': pg.DateAxisItem(utcOffset=0)})
+        self.plot_widget.setTitle(f"Histórico (Últimos {self.formatar_duracao(self.historico_segundos)})")
         
-        self.tabela_historico = QTableWidget()
-        self.tabela_historico.setRowCount(TAMANHO_TABELA)
-        self.tabela_historico.setColumnCount(2)
-        self.tabela_historico.setHorizontalHeaderLabels(["Timestamp", "Valor"])
+        # Tabela model/view: só as linhas visíveis são desenhadas, e cada
+        # frame anuncia apenas as linhas novas (ver src/historico_model.py)
+        self.modelo_historico = HistoricoTableModel(self.linhas_tabela, self)
+        self.tabela_historico = QTableView()
+        self.tabela_historico.setModel(self.modelo_historico)
         self.tabela_historico.horizontalHeader().setSectionResizeMode(
             QHeaderView.ResizeMode.Stretch
         )
+        # Linhas de altura fixa: a vista não mede o conteúdo de cada linha
+        self.tabela_historico.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.tabela_historico.verticalHeader().setDefaultSectionSize(ALTURA_LINHA_TABELA)
+        self.tabela_historico.verticalHeader().setVisible(False)
+        self.tabela_historico.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         
-        self.save_log_button = QPushButton("Salvar Histórico (60s) em CSV")
+        self.save_log_button = QPushButton("Exportar CSV (intervalo e sensores)...")
         self.save_log_button.clicked.connect(self.save_log_file_manual)
         
         layout_principal_detalhes.addWidget(config_frame)
@@ -249,178 +435,639 @@ class MainWindow(QMainWindow):
     def limite_dinamico_mudou(self):
         """!
         @brief Slot: Chamado quando o valor do QDoubleSpinBox (limites) é alterado.
-        @details Atualiza as variáveis `self.limite_min` e `self.limite_max`
-                 com os novos valores da UI.
+        @details Atualiza as variáveis `self.limite_min`, `self.limite_max` e
+                 `self.limite_declive` com os novos valores da UI.
         """
         self.limite_min = self.spin_min.value()
         self.limite_max = self.spin_max.value()
+        self.limite_declive = self.spin_declive.value()
         print(f"Novos limites de alerta: Mín={self.limite_min}, Máx={self.limite_max}")
         if self.limite_min >= self.limite_max:
             self.spin_max.setValue(self.limite_min + 1)
+        self.processor.definir_limites(self.limite_min, self.limite_max)
+        self.processor.definir_limite_declive(self.limite_declive)
+        # Força o redesenho do status (o texto inclui os limites)
+        self.estado_alerta = None
+
+    def on_sensor_selecionado(self, indice):
+        """!
+        @brief Slot: Chamado quando outro sensor é escolhido no QComboBox.
+        @details Mostra apenas a curva do sensor escolhido e pede ao
+                 processamento a vista (curva e tabela) dele.
+        @param indice (int): O índice do item escolhido no combo.
+        """
+        chave = self.combo_sensor.itemData(indice)
+        if chave is None or chave == self.sensor_selecionado:
+            return
+        if self.sensor_selecionado in self.curvas:
+            self.curvas[self.sensor_selecionado].setVisible(False)
+        self.sensor_selecionado = chave
+        self.curvas[chave].setVisible(True)
+        self.estado_alerta = None
+        self.processor.definir_vista(chave, self.plot_widget.width())
+
+    def on_visao_geral_clicada(self, linha, coluna):
+        """!
+        @brief Slot: Seleciona o sensor de uma linha da tabela de visão geral.
+        @param linha (int): A linha clicada (igual ao índice do sensor no registo).
+        @param coluna (int): A coluna clicada (ignorada).
+        """
+        self.combo_sensor.setCurrentIndex(linha)
 
     def save_log_file_manual(self):
         """!
-        @brief Slot: Chamado quando o botão "Salvar Histórico" é clicado.
-        @details Abre um diálogo 'Salvar Como...' (QFileDialog) e salva os
-                 dados atuais do buffer do gráfico (`data_buffer_grafico`)
-                 num ficheiro CSV.
+        @brief Slot: Chamado quando o botão "Exportar CSV" é clicado.
+        @details Pergunta a origem (histórico em memória ou log contínuo), os
+                 sensores e o intervalo, e depois o ficheiro de destino. A
+                 escrita é feita pela ExportThread, em segundo plano, com uma
+                 barra de progresso que permite cancelar.
         """
-        print("Iniciando salvamento manual de log...")
-        data_snapshot = list(self.data_buffer_grafico)
-        
-        if not data_snapshot:
-            QMessageBox.warning(self, "Sem Dados", "Não há dados no histórico para salvar.")
+        if self.export_thread is not None:
+            QMessageBox.information(self, "Exportar CSV", "Já há uma exportação em curso.")
+            return
+        # Os sensores conhecidos, pela ordem do combo: pares (nome, chave)
+        sensores = [(self.combo_sensor.itemText(i), self.combo_sensor.itemData(i))
+                    for i in range(self.combo_sensor.count())]
+        # Só os limites: as cópias e a indexação do log são feitas pela ExportThread
+        intervalo_memoria = self.processor.intervalo_dos_sensores([chave for _, chave in sensores])
+        if intervalo_memoria is None:
+            QMessageBox.warning(self, "Sem Dados", "Não há dados no histórico para exportar.")
+            return
+
+        # O log contínuo (se existir) permite exportar para lá da janela em memória
+        try:
+            intervalo_log = limites_log(self.log_filename)
+        except (OSError, ValueError):
+            intervalo_log = None
+
+        dialogo = DialogoExportacao(
+            sensores, self.sensor_selecionado,
+            intervalo_memoria, intervalo_log,
+            f"Histórico em memória ({self.formatar_duracao(self.historico_segundos)})", self
+        )
+        if dialogo.exec() != QDialog.DialogCode.Accepted:
+            return
+        selecionadas = dialogo.chaves()
+        if selecionadas is not None and not selecionadas:
+            QMessageBox.warning(self, "Exportar CSV", "Nenhum sensor escolhido.")
             return
+        t_inicio, t_fim = dialogo.intervalo()
 
         caminho, _ = QFileDialog.getSaveFileName(
-            self, "Salvar Log do Sensor (60s)", "log_sensor_60s.csv", "CSV Files (*.csv)"
+            self, "Exportar CSV", "exportacao_sensores.csv", "CSV Files (*.csv)"
         )
-        
-        if caminho:
-            try:
-                with open(caminho, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(['leitura_index', 'valor_temperatura'])
-                    for i, valor in enumerate(data_snapshot):
-                        writer.writerow([i, valor])
-                QMessageBox.information(self, "Sucesso", f"Log salvo com sucesso em:\n{caminho}")
-            except Exception as e:
-                QMessageBox.critical(self, "Erro", f"Não foi possível salvar o ficheiro:\n{e}")
+        if not caminho:
+            return
+        if dialogo.origem() == ORIGEM_LOG:
+            log_filename = self.log_filename
+            chaves = None if selecionadas is None else set(selecionadas)
+            criar_blocos = lambda: blocos_log(FonteReplay(log_filename), t_inicio, t_fim, chaves)
+            header = CSV_HEADER
+        else:
+            criar_blocos = lambda: blocos_memoria(self.processor.janelas_dos_sensores(selecionadas),
+                                                  t_inicio, t_fim)
+            header = CSV_HEADER + [COLUNA_AGREGADO]
+
+        self.export_thread = ExportThread(caminho, criar_blocos, header)
+        self.export_thread.progresso.connect(self.on_progresso_exportacao)
+        self.export_thread.terminado.connect(self.on_exportacao_terminada)
+        self.export_thread.cancelado.connect(self.on_exportacao_cancelada)
+        self.export_thread.erro.connect(self.on_exportacao_erro)
+        self.export_thread.finished.connect(self.on_exportacao_fim)
+        self.progresso_exportacao = QProgressDialog(f"A exportar para {caminho}...", "Cancelar", 0, 100, self)
+        self.progresso_exportacao.setWindowTitle("Exportar CSV")
+        self.progresso_exportacao.setAutoClose(False)
+        self.progresso_exportacao.setAutoReset(False)
+        self.progresso_exportacao.canceled.connect(self.export_thread.stop)
+        self.progresso_exportacao.show()
+        self.export_thread.start()
+        quantos = "todos os sensores" if selecionadas is None else f"{len(selecionadas)} sensor(es)"
+        print(f"Exportação iniciada: {caminho} ({quantos})")
+
+    def on_progresso_exportacao(self, percentagem):
+        """!
+        @brief Slot: Atualiza a barra de progresso da exportação.
+        @param percentagem (int): A percentagem concluída (0-100).
+        """
+        if self.progresso_exportacao is not None:
+            self.progresso_exportacao.setValue(percentagem)
+
+    def on_exportacao_terminada(self, caminho, linhas):
+        """!
+        @brief Slot: A exportação terminou com sucesso.
+        @param caminho (str): O ficheiro escrito.
+        @param linhas (int): O número de linhas de dados escritas.
+        """
+        QMessageBox.information(self, "Sucesso", f"{linhas} linha(s) exportada(s) para:\n{caminho}")
+
+    def on_exportacao_cancelada(self):
+        """!
+        @brief Slot: A exportação foi cancelada (o ficheiro parcial já foi apagado).
+        """
+        print("Exportação cancelada.")
+
+    def on_exportacao_erro(self, mensagem):
+        """!
+        @brief Slot: A exportação falhou.
+        @param mensagem (str): A descrição do erro.
+        """
+        print(mensagem)
+        QMessageBox.critical(self, "Erro", mensagem)
+
+    def on_exportacao_fim(self):
+        """!
+        @brief Slot: A thread de exportação terminou (por qualquer motivo).
+        """
+        if self.progresso_exportacao is not None:
+            self.progresso_exportacao.close()
+            self.progresso_exportacao = None
+        self.export_thread = None
 
     # --- Funções de Log Automático ---
     
     def on_auto_logging_toggled(self, is_checked):
         """!
         @brief Slot: Chamado quando o checkbox "Log Automático" é (des)marcado.
+        @details Inicia ou pára a thread LogWriter; a escrita em si (cabeçalho,
+                 linhas, flush) é toda feita por ela, fora da thread da UI. Um
+                 writer parado termina sozinho (ver terminar_thread); se ainda
+                 estiver a esvaziar a fila, o novo só arranca quando ele acabar
+                 (para não escreverem os dois no mesmo ficheiro) e, até lá, as
+                 amostras esperam na fila do novo.
         @param is_checked (bool): O novo estado do checkbox (True se marcado).
         """
         self.is_logging_auto = is_checked
         if self.is_logging_auto:
-            print(f"Log automático iniciado: {LOG_FILENAME}")
-            self.check_and_write_header()
+            self.log_writer = LogWriter(self.log_filename, CSV_HEADER, **self.config_log)
+            self.log_writer.erro.connect(self.on_log_writer_erro)
+            anterior = self.log_writer_anterior
+            if anterior is not None and anterior in self.threads_a_terminar:
+                anterior.finished.connect(self.log_writer.start)
+                if anterior.isFinished():
+                    self.log_writer.start()
+            else:
+                self.log_writer.start()
+            # A partir daqui, o processamento envia cada amostra para o log
+            # (as do replay já estão gravadas: só ao voltar ao vivo)
+            if self.replay is None:
+                self.processor.log_writer = self.log_writer
+            print(f"Log automático iniciado: {self.log_filename}")
         else:
+            self.processor.log_writer = None
+            if self.log_writer is not None:
+                self.terminar_thread(self.log_writer)
+                self.log_writer_anterior = self.log_writer
+                self.log_writer = None
             print("Log automático parado.")
 
-    def check_and_write_header(self):
+    def on_log_writer_erro(self, mensagem):
         """!
-        @brief Verifica se o ficheiro de log automático (`LOG_FILENAME`) existe.
-        @details Se o ficheiro não existir, cria-o e escreve a linha de
-                 cabeçalho (CSV_HEADER).
+        @brief Slot: Chamado quando o LogWriter não consegue abrir/escrever o ficheiro.
+        @param mensagem (str): A descrição do erro.
         """
-        if not os.path.exists(LOG_FILENAME):
-            try:
-                with open(LOG_FILENAME, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(CSV_HEADER)
-            except Exception as e:
-                print(f"Erro ao criar cabeçalho do log: {e}")
-                self.log_auto_checkbox.setChecked(False) 
+        print(mensagem)
+        if self.sender() is self.log_writer:
+            self.log_auto_checkbox.setChecked(False)
+
+    # --- Funções de Replay ---
 
-    def append_log_data_auto(self, data_dict):
+    def on_abrir_replay(self):
         """!
-        @brief Anexa uma linha de dados ao ficheiro de log automático.
-        @param data_dict (dict): O dicionário de dados JSON recebido do sensor.
+        @brief Slot: Escolhe um log gravado (CSV ou .slog) e começa a reproduzi-lo.
+        @details As versões rodadas do mesmo log são incluídas (ver src/replay.py).
         """
-        try:
-            # [MUDANÇA] Usa as novas chaves 'ts' e 'group'
-            row = [
-                data_dict.get('ts', ''), # Pega a string ISO
-                data_dict.get('group', 'N/A'),
-                data_dict.get('sensor_id', 'N/A'),
-                data_dict.get('value', 0.0),
-                data_dict.get('unit', '')
-            ]
-            with open(LOG_FILENAME, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(row)
-        except Exception as e:
-            print(f"Erro ao salvar linha no log automático: {e}")
-            self.log_auto_checkbox.setChecked(False)
+        caminho, _ = QFileDialog.getOpenFileName(
+            self, "Abrir Log para Replay", self.log_filename, "Logs (*.csv *.slog);;Todos (*)"
+        )
+        if not caminho:
+            return
+        self.iniciar_replay(caminho)
+
+    def iniciar_replay(self, caminho, t_inicio=None):
+        """!
+        @brief Desliga os dados ao vivo e reproduz o log `caminho` pelo mesmo processamento.
+        @details O listener continua a receber (e a contar) pacotes, mas eles não
+                 chegam ao processamento; as amostras reproduzidas não vão para o
+                 log automático nem os seus alertas para o log de eventos. O log é
+                 indexado pela ReplayThread (o slider aparece no sinal `aberto`).
+        @param caminho (str): O log a reproduzir (CSV ou .slog).
+        @param t_inicio (float): Instante inicial (None = início do log).
+        """
+        if self.replay is not None:
+            self.parar_replay()
+        self.listener.batch_received.disconnect(self.processor.enfileirar)
+        self.processor.log_writer = None
+        self.processor.log_eventos = None
+
+        self.replay = ReplayThread(caminho, self.processor, self.combo_velocidade.currentData(), t_inicio)
+        self.replay.aberto.connect(self.on_replay_aberto)
+        self.replay.erro.connect(self.on_replay_erro)
+        self.replay.progresso.connect(self.on_progresso_replay)
+        self.replay.terminado.connect(self.on_replay_terminado)
+        self.label_replay.setVisible(True)
+        self.label_replay.setText(f"Replay: a indexar {caminho}...")
+        self.replay_vivo_button.setEnabled(True)
+        self.replay.start()
+
+    def on_replay_aberto(self, t_inicio, t_fim, ficheiros):
+        """!
+        @brief Slot: O log do replay foi indexado (sinal `aberto` do ReplayThread).
+        @param t_inicio (float): O primeiro timestamp do log.
+        @param t_fim (float): O último timestamp do log.
+        @param ficheiros (int): O número de ficheiros (com as versões rodadas).
+        """
+        if self.sender() is not self.replay:
+            return
+        self.slider_replay.setRange(int(t_inicio), int(t_fim) + 1)
+        self.slider_replay.setValue(int(self.replay.posicao))
+        self.slider_replay.setVisible(True)
+        self.label_replay.setText(f"Replay: {self.replay.filename}")
+        print(f"Replay iniciado: {self.replay.filename} ({ficheiros} ficheiro(s))")
+
+    def on_replay_erro(self, mensagem):
+        """!
+        @brief Slot: O log do replay não pôde ser aberto; volta aos dados ao vivo.
+        @param mensagem (str): A descrição do erro.
+        """
+        if self.sender() is not self.replay:
+            return
+        self.parar_replay()
+        QMessageBox.warning(self, "Replay", mensagem)
+
+    def parar_replay(self):
+        """!
+        @brief Pára o replay e volta aos dados ao vivo (com o histórico limpo).
+        """
+        if self.replay is None:
+            return
+        self.terminar_thread(self.replay)
+        self.replay = None
+        self.processor.limpar()
+        self.listener.batch_received.connect(self.processor.enfileirar, Qt.ConnectionType.DirectConnection)
+        if self.is_logging_auto:
+            self.processor.log_writer = self.log_writer
+        self.processor.log_eventos = self.log_eventos
+        self.slider_replay.setVisible(False)
+        self.label_replay.setVisible(False)
+        self.replay_vivo_button.setEnabled(False)
+        print("Replay parado; de volta aos dados ao vivo.")
+
+    def terminar_thread(self, thread):
+        """!
+        @brief Pede a uma thread que pare, sem esperar por ela na thread da interface.
+        @details A referência fica em `threads_a_terminar` até ao sinal `finished`
+                 (uma QThread não pode ser destruída a correr); closeEvent espera
+                 pelas que ainda faltarem.
+        @param thread (QThread): A thread (com um método stop()).
+        """
+        thread.stop()
+        self.threads_a_terminar.add(thread)
+        thread.finished.connect(lambda: self.on_thread_terminada(thread))
+        if thread.isFinished():
+            self.on_thread_terminada(thread)
+
+    def on_thread_terminada(self, thread):
+        """!
+        @brief Slot: Uma thread parada com terminar_thread() acabou; liberta-a.
+        @param thread (QThread): A thread.
+        """
+        if thread not in self.threads_a_terminar:
+            return
+        thread.wait()   # Já emitiu `finished`: volta logo
+        self.threads_a_terminar.discard(thread)
+        thread.deleteLater()
+
+    def on_velocidade_replay(self, indice):
+        """!
+        @brief Slot: Muda a velocidade do replay em curso.
+        @param indice (int): O índice escolhido no combo de velocidades.
+        """
+        if self.replay is not None:
+            self.replay.definir_velocidade(self.combo_velocidade.itemData(indice))
+
+    def on_slider_replay(self):
+        """!
+        @brief Slot: Procura o instante escolhido no slider (ao largá-lo).
+        """
+        if self.replay is not None:
+            self.replay.procurar(float(self.slider_replay.value()))
+
+    def on_progresso_replay(self, tempo):
+        """!
+        @brief Slot: Mostra a posição do replay (sinal `progresso` do ReplayThread).
+        @param tempo (float): Timestamp da última amostra reproduzida.
+        """
+        if self.replay is None:
+            return
+        if not self.slider_replay.isSliderDown():
+            self.slider_replay.setValue(int(tempo))
+        self.label_replay.setText(f"Replay: {para_iso(tempo)}")
+
+    def on_replay_terminado(self):
+        """!
+        @brief Slot: O replay chegou ao fim do log (pode-se procurar outro instante).
+        """
+        if self.replay is not None:
+            self.label_replay.setText(f"Replay: fim do log ({para_iso(self.replay.posicao)})")
+
+    def on_log_eventos_erro(self, mensagem):
+        """!
+        @brief Slot: Chamado quando o log de eventos de alerta não consegue abrir/escrever o ficheiro.
+        @param mensagem (str): A descrição do erro.
+        """
+        print(mensagem)
+        self.processor.log_eventos = None
+        self.log_eventos = None
+
+    def atualizar_status_rede(self):
+        """!
+        @brief Mostra os contadores do UDPListener (recebidos, malformados, perdidos no kernel).
+        """
+        self.label_rede_status.setText(
+            f"Rede: {self.listener.pacotes_recebidos} recebidos, "
+            f"{self.listener.pacotes_malformados} malformados, "
+            f"{self.listener.pacotes_descartados_kernel} perdidos (kernel), "
+            f"{self.processor.amostras_invalidas} inválidas"
+        )
+
+    def atualizar_status_log(self):
+        """!
+        @brief Mostra os contadores do LogWriter (escritas, na fila, descartadas).
+        """
+        if self.log_writer is None:
+            return
+        self.label_log_status.setText(
+            f"Log: {self.log_writer.linhas_escritas} escritas, "
+            f"{self.log_writer.linhas_pendentes} na fila, "
+            f"{self.log_writer.linhas_descartadas} descartadas"
+        )
     
     # -----------------------------------
 
+    def on_diagnostico_toggled(self, is_checked):
+        """!
+        @brief Slot: Mostra/esconde o painel de diagnóstico.
+        @details As métricas só são formatadas enquanto o painel estiver visível.
+        @param is_checked (bool): O novo estado do checkbox.
+        """
+        self.label_diagnostico.setVisible(is_checked)
+        if is_checked:
+            self.atualizar_diagnostico()
+            self.diagnostico_timer.start()
+        else:
+            self.diagnostico_timer.stop()
+
+    def atualizar_diagnostico(self):
+        """!
+        @brief Slot do `diagnostico_timer`: redesenha o painel de diagnóstico.
+        @details Contadores com a taxa por segundo e histogramas com p50/p95/máx.
+                 do último intervalo, seguidos do último erro de cada thread.
+        """
+        linhas = self.resumo_metricas.linhas()
+        relay = self.listener.relay
+        for origem, erro in (("listener", self.listener.ultimo_erro),
+                             ("relay", relay.ultimo_erro if relay is not None else None),
+                             ("processamento", self.processor.ultimo_erro),
+                             ("interface", self.ultimo_erro_frame)):
+            if erro:
+                linhas.append(f"último erro ({origem}): {erro}")
+        self.label_diagnostico.setText("\n".join(linhas))
+
     def update_data(self, data_dict):
         """!
-        @brief Slot: O "coração" da UI. Chamado quando o listener UDP emite novos dados.
-        @details Processa o dicionário de dados, atualiza todos os QLabels,
-                 verifica os alertas, adiciona dados ao gráfico e à tabela,
-                 e chama o log automático (se ativo).
-        @param data_dict (dict): O dicionário de dados JSON recebido do sensor.
+        @brief Entrega um pacote avulso (fora do listener) à thread de processamento.
+        @details O listener entrega lotes diretamente a SampleProcessor.enfileirar;
+                 esta entrada serve outros emissores (ex: `benchmark.py --modo
+                 direto`) e segue o mesmo caminho, como um lote de um pacote
+                 validado em processar_lote(). Todo o trabalho de UI é feito em
+                 renderizar_frame(), uma vez por frame.
+        @param data_dict (dict): O dicionário de dados JSON do sensor.
+        """
+        # Os pacotes do listener já vêm com 'ts_epoch'; outros emissores podem não ter
+        self.processor.enfileirar([normalizar_timestamp(data_dict)])
+
+    @staticmethod
+    def formatar_duracao(segundos):
+        """!
+        @brief Formata a duração da janela do histórico para títulos (ex: "60s", "15min", "24h").
+        @param segundos (float): A duração em segundos.
+        @return (str): A duração formatada.
+        """
+        if segundos >= 3600 and segundos % 3600 == 0:
+            return f"{int(segundos // 3600)}h"
+        if segundos >= 60 and segundos % 60 == 0:
+            return f"{int(segundos // 60)}min"
+        return f"{segundos:g}s"
+
+    def renderizar_frame(self):
+        """!
+        @brief Slot do `render_timer`: aplica à UI o que o processamento preparou.
+        @details Cria os elementos dos sensores novos, atualiza só as linhas da
+                 visão geral dos sensores que receberam dados e, se houver uma
+                 vista nova do sensor selecionado, redesenha o destaque, a curva e
+                 a tabela. As folhas de estilo só são trocadas quando o estado de
+                 alerta muda.
         """
+        inicio = time.perf_counter()
         try:
-            # --- [MUDANÇA] 1. Extrai dados com as novas chaves ---
-            sensor = data_dict.get('sensor_id', 'N/A')
-            valor = data_dict.get('value', 0.0)
-            unidade = data_dict.get('unit', '')
-            # Pega a string ISO
-            timestamp_iso_str = data_dict.get('ts', '') 
-
-            # --- [MUDANÇA] 2. Converte a string ISO para QDateTime ---
-            # O Qt.DateFormat.ISODate sabe lidar com o formato "Z" (UTC)
-            qdt = QDateTime.fromString(timestamp_iso_str, Qt.DateFormat.ISODate)
-            if not qdt.isValid():
-                # Tenta de novo se tiver milissegundos
-                qdt = QDateTime.fromString(timestamp_iso_str, Qt.DateFormat.ISODateWithMs)
-
-            # Formata para 'hh:mm:ss'
-            timestamp_str = qdt.toString("hh:mm:ss")
-            # ----------------------------------------------------
-
-            # --- 2. Atualiza Painel Destaque (Esquerda) ---
-            self.label_sensor_id.setText(f"Sensor: {sensor}")
-            self.label_valor_atual.setText(f"{valor:.1f} {unidade}")
-            self.label_ultima_atualizacao.setText(f"Última Atualização: {timestamp_str}")
-
-            # --- 3. Lógica de Alerta Visual (com limites dinâmicos) ---
-            base_style = f"""
-                font-size: {TAMANHO_FONTE_VALOR}px;
-                font-weight: bold;
-            """
-            
-            if valor < self.limite_min or valor > self.limite_max:
-                self.label_valor_atual.setStyleSheet(base_style + f"color: {COR_DESTAQUE_ALERTA};")
-                self.label_status.setText(f"ALERTA: Valor fora dos limites ({self.limite_min}-{self.limite_max})")
-                self.label_status.setStyleSheet(f"color: {COR_DESTAQUE_ALERTA};")
-            else:
-                self.label_valor_atual.setStyleSheet(base_style + f"color: {COR_DESTAQUE_NORMAL};")
-                self.label_status.setText("Status: Normal")
-                self.label_status.setStyleSheet(f"color: {COR_DESTAQUE_NORMAL};")
+            # A largura do gráfico pode mudar (redimensionamento da janela)
+            if self.sensor_selecionado is not None:
+                self.processor.definir_vista(self.sensor_selecionado, self.plot_widget.width())
+
+            novos, atualizados, vista = self.processor.retirar_snapshot()
+            for sensor in novos:
+                self.adicionar_sensor(sensor)
+            for sensor in atualizados:
+                self.atualizar_linha_visao_geral(sensor)
+            # O estado de alerta só muda nos eventos (transições) do motor de alertas
+            for evento in self.processor.retirar_eventos():
+                self.aplicar_evento_alerta(evento)
+            if vista is not None and vista.sensor.chave == self.sensor_selecionado:
+                self.desenhar_vista(vista)
+            self.atualizar_status_log()
+            self.atualizar_status_rede()
 
-            # --- 4. Atualiza Painel Detalhes (Direita) ---
-            self.data_buffer_grafico.append(valor)
-            self.plot_curve.setData(list(self.data_buffer_grafico))
-            
-            self.data_buffer_tabela.appendleft((timestamp_str, f"{valor:.2f} {unidade}"))
-            
-            self.tabela_historico.clearContents() 
-            for i, (ts, val) in enumerate(self.data_buffer_tabela):
-                
-                item_ts = QTableWidgetItem(ts)
-                item_val = QTableWidgetItem(val)
-                item_ts.setForeground(QColor(COR_TEXTO))
-                item_val.setForeground(QColor(COR_TEXTO))
-                
-                self.tabela_historico.setItem(i, 0, item_ts)
-                self.tabela_historico.setItem(i, 1, item_val)
-            
-            # --- 5. Salva no Log Automático ---
-            if self.is_logging_auto:
-                # Passa o 'data_dict' original para o log
-                self.append_log_data_auto(data_dict)
-                
         except Exception as e:
+            self.erros_frame += 1
+            self.ultimo_erro_frame = str(e)
             self.label_valor_atual.setText("Erro!")
             self.label_status.setText(f"Erro: {e}")
+            self.estado_alerta = None
+        self.tempo_frame.observar((time.perf_counter() - inicio) * 1000.0)
+
+    def adicionar_sensor(self, sensor):
+        """!
+        @brief Cria os elementos de UI de um sensor novo (uma única vez por sensor).
+        @details Acrescenta uma entrada no seletor, uma linha na visão geral e
+                 uma curva (escondida) no gráfico. O primeiro sensor a aparecer
+                 fica selecionado.
+        @param sensor (SensorSnapshot): O estado do sensor recém-registado.
+        """
+        curva = self.plot_widget.plot(pen=pg.mkPen(COR_GRAFICO, width=2))
+        curva.setVisible(False)
+        self.curvas[sensor.chave] = curva
+
+        linha = self.tabela_sensores.rowCount()
+        self.tabela_sensores.insertRow(linha)
+        for coluna, texto in enumerate((sensor.nome, "---", "---")):
+            item = QTableWidgetItem(texto)
+            item.setForeground(QColor(COR_TEXTO))
+            self.tabela_sensores.setItem(linha, coluna, item)
+
+        # Adicionar ao combo dispara on_sensor_selecionado se for o primeiro
+        self.combo_sensor.addItem(sensor.nome, sensor.chave)
+
+    def atualizar_linha_visao_geral(self, sensor):
+        """!
+        @brief Atualiza a linha de um sensor na tabela de visão geral.
+        @param sensor (SensorSnapshot): O último estado do sensor.
+        """
+        item_valor = self.tabela_sensores.item(sensor.indice, 1)
+        item_estado = self.tabela_sensores.item(sensor.indice, 2)
+        item_valor.setText(f"{sensor.valor:.1f} {sensor.unidade}")
+        # Depois do primeiro valor, o estado só muda com os eventos de alerta
+        if item_estado.text() == "---":
+            self.definir_estado_linha(sensor.indice, sensor.em_alerta)
+
+    def definir_estado_linha(self, indice, em_alerta):
+        """!
+        @brief Mostra o estado de alerta na linha de um sensor da visão geral.
+        @param indice (int): A linha (índice do sensor no registo).
+        @param em_alerta (bool): True se o sensor está em alerta.
+        """
+        item_estado = self.tabela_sensores.item(indice, 2)
+        if item_estado is None:
+            return  # Sensor ainda não adicionado à interface
+        item_estado.setText("ALERTA" if em_alerta else "Normal")
+        item_estado.setForeground(QColor(COR_DESTAQUE_ALERTA if em_alerta else COR_DESTAQUE_NORMAL))
+
+    def aplicar_evento_alerta(self, evento):
+        """!
+        @brief Aplica à interface uma transição de alerta (início ou fim).
+        @details Atualiza a linha da visão geral, o painel de destaque (se for o
+                 sensor selecionado) e a barra de estado.
+        @param evento (EventoAlerta): O evento produzido pelo motor de alertas.
+        """
+        self.definir_estado_linha(evento.indice, evento.inicio)
+        if evento.chave == self.sensor_selecionado:
+            self.aplicar_estado_alerta(evento.inicio, evento.inicio and evento.motivo == MOTIVO_DECLIVE)
+        estado = "ALERTA" if evento.inicio else "Normal"
+        hora = formatar_hora(evento.tempo) if evento.tempo is not None else "--:--:--"
+        self.statusBar().showMessage(
+            f"{hora} [{estado}] {evento.nome}: {evento.valor:.2f} {evento.unidade} ({evento.motivo})"
+        )
+
+    def desenhar_vista(self, vista):
+        """!
+        @brief Redesenha o painel de destaque, a curva e a tabela com o sensor selecionado.
+        @param vista (VistaSnapshot): A vista preparada pelo processamento.
+        """
+        sensor = vista.sensor
+
+        # --- Painel Destaque (Esquerda) ---
+        self.label_sensor_id.setText(f"Sensor: {sensor.nome}")
+        self.label_valor_atual.setText(f"{sensor.valor:.1f} {sensor.unidade}")
+        self.label_ultima_atualizacao.setText(f"Última Atualização: {formatar_hora(sensor.tempo)}")
+        self.label_estatisticas.setText(self.formatar_estatisticas(sensor))
+
+        # --- Lógica de Alerta Visual ---
+        # As transições chegam como eventos (aplicar_evento_alerta); aqui só se
+        # desenha o estado inicial, depois de mudar de sensor ou de limites
+        if self.estado_alerta is None:
+            self.aplicar_estado_alerta(sensor.em_alerta, sensor.alerta_declive)
+
+        # --- Painel Detalhes (Direita) ---
+        # Janela temporal já decimada (2 pontos por pixel) pelo processamento
+        self.curvas[sensor.chave].setData(vista.x, vista.y)
+        # Tabela: da mais recente (topo) para a mais antiga, até `linhas_tabela` leituras
+        if vista.reiniciar:
+            self.modelo_historico.reiniciar(vista.tempos, vista.valores, sensor.unidade)
+        else:
+            self.modelo_historico.acrescentar(vista.tempos, vista.valores, sensor.unidade)
+
+    def formatar_estatisticas(self, sensor):
+        """!
+        @brief Formata as estatísticas móveis de um sensor (uma linha por janela).
+        @param sensor (SensorSnapshot): O estado do sensor.
+        @return (str): O texto do painel de estatísticas.
+        """
+        linhas = []
+        for resumo in sensor.estatisticas:
+            janela = self.formatar_duracao(resumo.segundos)
+            if resumo.n == 0:
+                linhas.append(f"{janela:>5}  sem amostras")
+                continue
+            declive = "---" if resumo.declive is None else f"{resumo.declive * 60.0:+.2f}"
+            linhas.append(
+                f"{janela:>5}  mín {resumo.minimo:.2f}  máx {resumo.maximo:.2f}  "
+                f"média {resumo.media:.2f}  σ {resumo.desvio:.2f}  "
+                f"Δ {declive} {sensor.unidade}/min"
+            )
+        return "\n".join(linhas)
+
+    def aplicar_estado_alerta(self, em_alerta, alerta_declive=False):
+        """!
+        @brief Troca as cores/textos do painel de destaque para o estado de alerta indicado.
+        @details Chamado apenas nos eventos de alerta (e ao mudar de sensor ou de
+                 limites), evitando que o Qt reprocesse as folhas de estilo (QSS) a cada pacote.
+        @param em_alerta (bool): True se o sensor está em alerta.
+        @param alerta_declive (bool): True se o alerta é (também) de variação rápida.
+        """
+        base_style = f"""
+            font-size: {TAMANHO_FONTE_VALOR}px;
+            font-weight: bold;
+        """
+        if em_alerta:
+            self.label_valor_atual.setStyleSheet(base_style + f"color: {COR_DESTAQUE_ALERTA};")
+            if alerta_declive:
+                self.label_status.setText(f"ALERTA: Variação rápida (> {self.limite_declive:g}/min)")
+            else:
+                self.label_status.setText(f"ALERTA: Valor fora dos limites ({self.limite_min}-{self.limite_max})")
+            self.label_status.setStyleSheet(f"color: {COR_DESTAQUE_ALERTA};")
+        else:
+            self.label_valor_atual.setStyleSheet(base_style + f"color: {COR_DESTAQUE_NORMAL};")
+            self.label_status.setText("Status: Normal")
+            self.label_status.setStyleSheet(f"color: {COR_DESTAQUE_NORMAL};")
+        self.estado_alerta = (em_alerta, alerta_declive)
 
     # --- Evento de Fecho da Janela ---
     def closeEvent(self, event):
         """!
         @brief Event Handler: Chamado quando o usuário fecha a janela (clica no 'X').
-        @details Garante que a thread do listener UDP (`self.listener`)
-                 seja parada de forma limpa antes que a aplicação feche.
+        @details Garante que as threads do listener UDP (`self.listener`), do
+                 processamento (`self.processor`), do replay (`self.replay`, e as de `self.threads_a_terminar`), da exportação (`self.export_thread`), do log automático
+                 (`self.log_writer`), do log de eventos de alerta (`self.log_eventos`), das métricas (`self.metrics_exporter`)
+                 e das consultas (`self.servidor_consultas`)
+                 sejam paradas de forma limpa antes que a aplicação feche.
         @param event (QCloseEvent): O evento de fecho da janela.
         """
         print("A fechar a aplicação...")
+        self.render_timer.stop()
+        self.diagnostico_timer.stop()
+        if self.replay is not None:
+            self.replay.stop()
+            self.replay.wait()
+        for thread in list(self.threads_a_terminar):
+            thread.wait()
+        if self.export_thread is not None:
+            # Uma exportação a meio é cancelada (não fica um CSV incompleto)
+            self.export_thread.stop()
+            self.export_thread.wait()
         self.listener.stop()
         self.listener.wait()
+        self.processor.stop()
+        self.processor.wait()
+        if self.log_writer is not None:
+            # Escreve as linhas que ainda estão na fila antes de sair
+            self.log_writer.stop()
+            self.log_writer.wait()
+        if self.log_eventos is not None:
+            self.log_eventos.stop()
+            self.log_eventos.wait()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+            self.metrics_exporter.wait()
+        if self.servidor_consultas is not None:
+            self.servidor_consultas.stop()
+            self.servidor_consultas.wait()
         event.accept()
\ No newline at end of file
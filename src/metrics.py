@@ -0,0 +1,415 @@
+"""!
+@file metrics.py
+@brief Métricas de desempenho: histogramas, registo de métricas e exportação.
+@details Os contadores já existentes nas threads (pacotes recebidos, linhas
+         descartadas, ...) não são duplicados: o RegistoMetricas guarda apenas
+         funções que os leem no momento da recolha. Os tempos (parse,
+         processamento, frame, escrita do log) são medidos com Histograma,
+         cada um escrito por uma única thread.
+
+         A exportação é feita pela thread MetricsExporter, que pode:
+         - gravar periodicamente um ficheiro (formato texto do Prometheus, ou
+           JSON se o nome terminar em .json), substituído de forma atómica;
+         - servir GET /metrics num servidor HTTP local (só 127.0.0.1 por omissão).
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from PyQt6.QtCore import QThread
+
+from src.servidor_http import INTERVALO_ESPERA, HandlerLocal, abrir_servidor
+
+PREFIXO = 'sensor_monitor_'
+# Limites dos baldes (valor <= limite), em microssegundos e milissegundos
+LIMITES_MICROSSEGUNDOS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+LIMITES_MILISSEGUNDOS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+LIMITES_SEGUNDOS = (0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 300)
+LIMITES_TAMANHO = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000)
+
+DEFAULT_INTERVALO_FICHEIRO = 10.0   # segundos
+DEFAULT_HTTP_IP = '127.0.0.1'
+
+CONTADOR = 'counter'
+MEDIDOR = 'gauge'
+HISTOGRAMA = 'histogram'
+
+
+class Histograma:
+    """!
+    @brief Histograma de baldes fixos (cumulativo desde o arranque).
+    @details observar() não usa lock: cada histograma deve ser escrito por uma
+             só thread. Leituras de outras threads podem ver um estado com uma
+             observação a meio, o que é aceitável para monitorização.
+    """
+
+    def __init__(self, limites):
+        """!
+        @brief Construtor do Histograma.
+        @param limites (tuple): Limites superiores dos baldes, por ordem crescente
+                                (um balde extra guarda os valores acima do último).
+        """
+        self.limites = tuple(limites)
+        self.contagens = [0] * (len(self.limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+        self.maximo = 0.0
+
+    def observar(self, valor):
+        """!
+        @brief Regista uma observação.
+        @param valor (float): O valor medido (na unidade dos limites).
+        """
+        self.contagens[bisect.bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def estado(self):
+        """!
+        @brief Cópia do estado atual, para calcular percentis num intervalo.
+        @return (tuple): (contagens, soma, total).
+        """
+        return list(self.contagens), self.soma, self.total
+
+    def percentil(self, p, desde=None):
+        """!
+        @brief Percentil aproximado (limite superior do balde onde cai).
+        @param p (float): O percentil (0-100).
+        @param desde (tuple): Um estado() anterior; se dado, só conta as observações seguintes.
+        @return (float | None): O limite do balde (ou `maximo` no último balde);
+                 None se não houver observações.
+        """
+        contagens = self.contagens
+        if desde is not None:
+            contagens = [a - b for a, b in zip(contagens, desde[0])]
+        total = sum(contagens)
+        if total == 0:
+            return None
+        alvo = total * p / 100.0
+        acumulado = 0
+        for i, n in enumerate(contagens):
+            acumulado += n
+            if acumulado >= alvo and n:
+                return self.limites[i] if i < len(self.limites) else self.maximo
+        return self.maximo
+
+
+class RegistoMetricas:
+    """!
+    @brief Lista das métricas exportadas e das funções que as leem.
+    """
+
+    def __init__(self, prefixo=PREFIXO):
+        """!
+        @brief Construtor do RegistoMetricas.
+        @param prefixo (str): Prefixo dos nomes exportados.
+        """
+        self.prefixo = prefixo
+        self._metricas = []
+        self._lock = threading.Lock()
+
+    def _registar(self, nome, tipo, ajuda, fonte):
+        with self._lock:
+            self._metricas.append((self.prefixo + nome, tipo, ajuda, fonte))
+
+    def contador(self, nome, ajuda, fonte):
+        """!
+        @brief Regista um contador (valor que só aumenta).
+        @param nome (str): O nome (sem prefixo), ex: 'pacotes_recebidos_total'.
+        @param ajuda (str): Descrição curta.
+        @param fonte (callable): Função sem argumentos que devolve o valor atual.
+        """
+        self._registar(nome, CONTADOR, ajuda, fonte)
+
+    def medidor(self, nome, ajuda, fonte):
+        """!
+        @brief Regista um medidor (valor que sobe e desce, ex: tamanho de uma fila).
+        @param nome (str): O nome (sem prefixo).
+        @param ajuda (str): Descrição curta.
+        @param fonte (callable): Função sem argumentos que devolve o valor atual.
+        """
+        self._registar(nome, MEDIDOR, ajuda, fonte)
+
+    def histograma(self, nome, ajuda, fonte):
+        """!
+        @brief Regista um histograma.
+        @param nome (str): O nome (sem prefixo), com a unidade, ex: 'tempo_frame_ms'.
+        @param ajuda (str): Descrição curta.
+        @param fonte (Histograma | callable): O histograma, ou uma função que o
+                     devolve (ou None, se ainda/já não existir).
+        """
+        self._registar(nome, HISTOGRAMA, ajuda, fonte)
+
+    def recolher(self):
+        """!
+        @brief Lê todas as métricas.
+        @return (list): Tuplos (nome, tipo, ajuda, valor); nos histogramas o
+                 valor é o próprio Histograma. Métricas sem valor são omitidas.
+        """
+        with self._lock:
+            metricas = list(self._metricas)
+        resultado = []
+        for nome, tipo, ajuda, fonte in metricas:
+            valor = fonte if isinstance(fonte, Histograma) else fonte()
+            if valor is not None:
+                resultado.append((nome, tipo, ajuda, valor))
+        return resultado
+
+    def texto_prometheus(self):
+        """!
+        @brief As métricas no formato de texto do Prometheus (versão 0.0.4).
+        @return (str): O texto a servir em /metrics.
+        """
+        linhas = []
+        for nome, tipo, ajuda, valor in self.recolher():
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            if tipo != HISTOGRAMA:
+                linhas.append(f"{nome} {valor}")
+                continue
+            contagens, soma, total = valor.estado()
+            acumulado = 0
+            for limite, n in zip(valor.limites, contagens):
+                acumulado += n
+                linhas.append(f'{nome}_bucket{{le="{limite:g}"}} {acumulado}')
+            linhas.append(f'{nome}_bucket{{le="+Inf"}} {total}')
+            linhas.append(f"{nome}_sum {soma}")
+            linhas.append(f"{nome}_count {total}")
+        return "\n".join(linhas) + "\n"
+
+    def para_dict(self):
+        """!
+        @brief As métricas num dicionário (para o ficheiro JSON).
+        @return (dict): nome -> valor; histogramas viram {count, sum, max, p50, p95, p99}.
+        """
+        resultado = {'timestamp': time.time()}
+        for nome, tipo, _, valor in self.recolher():
+            if tipo == HISTOGRAMA:
+                resultado[nome] = {
+                    'count': valor.total, 'sum': valor.soma, 'max': valor.maximo,
+                    'p50': valor.percentil(50), 'p95': valor.percentil(95),
+                    'p99': valor.percentil(99),
+                }
+            else:
+                resultado[nome] = valor
+        return resultado
+
+
+class ResumoMetricas:
+    """!
+    @brief Texto legível das métricas, com taxas e percentis do último intervalo.
+    @details Usado pelo painel de diagnóstico: os contadores mostram o total e a
+             taxa por segundo desde a chamada anterior; os histogramas mostram
+             p50/p95/máx. das observações desse intervalo.
+    """
+
+    def __init__(self, registo):
+        """!
+        @brief Construtor do ResumoMetricas.
+        @param registo (RegistoMetricas): As métricas a resumir.
+        """
+        self.registo = registo
+        self._anterior = {}
+        self._hora_anterior = None
+
+    def linhas(self):
+        """!
+        @brief Gera uma linha de texto por métrica.
+        @return (list): As linhas, pela ordem de registo.
+        """
+        agora = time.monotonic()
+        intervalo = agora - self._hora_anterior if self._hora_anterior else None
+        self._hora_anterior = agora
+        prefixo = len(self.registo.prefixo)
+        linhas = []
+        for nome, tipo, _, valor in self.registo.recolher():
+            anterior = self._anterior.get(nome)
+            rotulo = nome[prefixo:]
+            if tipo == CONTADOR:
+                texto = f"{rotulo}: {valor}"
+                if anterior is not None and intervalo:
+                    texto += f" ({(valor - anterior) / intervalo:.0f}/s)"
+                self._anterior[nome] = valor
+            elif tipo == MEDIDOR:
+                texto = f"{rotulo}: {valor}"
+            else:
+                estado = valor.estado()
+                # Um histograma novo (ex: outro LogWriter) recomeça do zero
+                if anterior is not None and len(anterior[0]) == len(estado[0]) and anterior[2] <= estado[2]:
+                    desde = anterior
+                else:
+                    desde = None
+                p50 = valor.percentil(50, desde)
+                if p50 is None:
+                    texto = f"{rotulo}: -"
+                else:
+                    texto = (f"{rotulo}: p50={p50:g} p95={valor.percentil(95, desde):g} "
+                             f"máx={valor.maximo:g} (n={estado[2] - (desde[2] if desde else 0)})")
+                self._anterior[nome] = estado
+            linhas.append(texto)
+        return linhas
+
+
+def registar_pipeline(registo, listener, processor, obter_log_writer):
+    """!
+    @brief Regista as métricas do listener, do processamento e do log contínuo.
+    @param registo (RegistoMetricas): Onde registar.
+    @param listener (UDPListener): O listener UDP.
+    @param processor (SampleProcessor): A thread de processamento.
+    @param obter_log_writer (callable): Devolve o LogWriter ativo (ou None).
+    """
+    def do_log(atributo, padrao=0):
+        def fonte():
+            log_writer = obter_log_writer()
+            return padrao if log_writer is None else getattr(log_writer, atributo)
+        return fonte
+
+    registo.contador('datagramas_recebidos_total', "Datagramas UDP recebidos",
+                     lambda: listener.pacotes_recebidos)
+    registo.contador('datagramas_malformados_total', "Datagramas que não puderam ser descodificados",
+                     lambda: listener.pacotes_malformados)
+    registo.contador('datagramas_descartados_kernel_total',
+                     "Datagramas descartados pelo kernel (buffer de receção cheio, só Linux)",
+                     lambda: listener.pacotes_descartados_kernel)
+    registo.contador('erros_listener_total', "Erros inesperados na thread UDP",
+                     lambda: listener.erros)
+    registo.histograma('tempo_parse_us', "Tempo médio de receção+descodificação por datagrama, por rajada (us)",
+                       listener.tempo_parse)
+    registo.histograma('datagramas_por_rajada', "Datagramas lidos em cada despertar do listener",
+                       listener.tamanho_rajada)
+    if listener.relay is not None:
+        relay = listener.relay
+        registo.contador('relay_datagramas_enviados_total', "Datagramas reenviados (somando todos os destinos)",
+                         lambda: relay.datagramas_enviados)
+        registo.contador('relay_datagramas_nao_enviados_total',
+                         "Datagramas que o relay não conseguiu enviar (buffer cheio, destino inalcançável)",
+                         lambda: relay.datagramas_nao_enviados)
+        registo.contador('relay_amostras_total', "Amostras reenviadas pelo relay",
+                         lambda: relay.amostras_reenviadas)
+
+    registo.contador('amostras_processadas_total', "Amostras guardadas nos buffers dos sensores",
+                     lambda: processor.amostras_processadas)
+    registo.contador('amostras_invalidas_total', "Amostras com valor não numérico ou não finito",
+                     lambda: processor.amostras_invalidas)
+    registo.contador('lotes_descartados_total', "Lotes descartados por a fila de processamento estar cheia",
+                     lambda: processor.lotes_descartados)
+    registo.contador('erros_processamento_total', "Erros inesperados na thread de processamento",
+                     lambda: processor.erros)
+    registo.medidor('fila_processamento_lotes', "Lotes à espera da thread de processamento",
+                    lambda: processor.fila.qsize())
+    registo.histograma('tempo_processamento_ms', "Tempo de processamento de cada ciclo de lotes (ms)",
+                       processor.tempo_processamento)
+    registo.medidor('memoria_historicos_bytes', "Memória alocada pelos históricos dos sensores (bytes)",
+                    lambda: processor.registry.memoria_historicos)
+    registo.medidor('memoria_total_bytes',
+                    "Memória contada no orçamento MEMORIA_MB: históricos, estatísticas, decimadores e reservas (bytes)",
+                    lambda: processor.registry.memoria_total)
+
+    registo.contador('log_linhas_escritas_total', "Linhas gravadas pelo log contínuo",
+                     do_log('linhas_escritas'))
+    registo.contador('log_linhas_descartadas_total', "Linhas descartadas por a fila do log estar cheia",
+                     do_log('linhas_descartadas'))
+    registo.contador('log_linhas_sem_tempo_total',
+                     "Linhas não gravadas no log binário por não terem timestamp válido",
+                     do_log('linhas_sem_tempo'))
+    registo.medidor('log_fila_linhas', "Linhas à espera de escrita no log contínuo",
+                    do_log('linhas_pendentes'))
+    registo.histograma('log_tempo_escrita_ms', "Tempo de escrita (e flush) de cada lote do log (ms)",
+                       do_log('tempo_escrita', None))
+    registo.histograma('log_atraso_s',
+                       "Idade da última linha de cada lote ao ser escrita (s, pelo 'ts' do sensor)",
+                       do_log('atraso', None))
+
+
+class _MetricasHandler(HandlerLocal):
+    """!
+    @brief Responde a GET /metrics com o texto do Prometheus.
+    """
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        corpo = self.server.registo.texto_prometheus().encode('utf-8')
+        self.responder(200, corpo, 'text/plain; version=0.0.4; charset=utf-8')
+
+
+class MetricsExporter(QThread):
+    """!
+    @brief Thread que exporta as métricas para um ficheiro e/ou por HTTP local.
+    """
+
+    def __init__(self, registo, ficheiro=None, intervalo_ficheiro=DEFAULT_INTERVALO_FICHEIRO,
+                 http_ip=DEFAULT_HTTP_IP, http_porta=0, parent=None):
+        """!
+        @brief Construtor do MetricsExporter.
+        @param registo (RegistoMetricas): As métricas a exportar.
+        @param ficheiro (str): Ficheiro gravado periodicamente (None = não grava).
+        @param intervalo_ficheiro (float): Intervalo entre gravações (segundos).
+        @param http_ip (str): IP do servidor HTTP (use 127.0.0.1 para ficar só local).
+        @param http_porta (int): Porta do servidor HTTP (0 = sem servidor).
+        @param parent (QObject): O objeto pai do Qt (opcional).
+        """
+        super().__init__(parent)
+        self.registo = registo
+        self.ficheiro = ficheiro or None
+        self.intervalo_ficheiro = intervalo_ficheiro
+        self.http_ip = http_ip
+        self.http_porta = http_porta
+        self.running = True
+        self._acordar = threading.Event()
+
+    def gravar_ficheiro(self):
+        """!
+        @brief Grava as métricas no ficheiro (num temporário renomeado, para o
+               leitor nunca ver um ficheiro a meio).
+        """
+        if self.ficheiro.endswith('.json'):
+            conteudo = json.dumps(self.registo.para_dict(), indent=1)
+        else:
+            conteudo = self.registo.texto_prometheus()
+        temporario = self.ficheiro + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+        os.replace(temporario, self.ficheiro)
+
+    def run(self):
+        """!
+        @brief O "coração" da thread, executado quando .start() é chamado.
+        @details Atende os pedidos HTTP (com timeout, para verificar 'running')
+                 e grava o ficheiro a cada `intervalo_ficheiro` segundos.
+        """
+        servidor = None
+        if self.http_porta:
+            servidor = abrir_servidor(self.http_ip, self.http_porta, _MetricasHandler,
+                                      "o endpoint de métricas", "Métricas", "/metrics",
+                                      registo=self.registo)
+        proxima_gravacao = time.monotonic()
+        try:
+            while self.running:
+                if servidor is not None:
+                    servidor.handle_request()
+                else:
+                    self._acordar.wait(INTERVALO_ESPERA)
+                if self.ficheiro and self.running and time.monotonic() >= proxima_gravacao:
+                    proxima_gravacao = time.monotonic() + self.intervalo_ficheiro
+                    try:
+                        self.gravar_ficheiro()
+                    except OSError as e:
+                        print(f"Erro ao gravar as métricas em {self.ficheiro}: {e}")
+        finally:
+            if servidor is not None:
+                servidor.server_close()
+        print("Thread de métricas terminada.")
+
+    def stop(self):
+        """!
+        @brief Pára a thread (no máximo INTERVALO_ESPERA segundos depois, ou
+               TEMPO_MAXIMO_CLIENTE se estiver a atender um pedido; ver src/servidor_http.py).
+        """
+        self.running = False
+        self._acordar.set()
@@ -0,0 +1,496 @@
+"""!
+@file processor.py
+@brief Implementa a thread de processamento entre o listener UDP e a interface.
+@details Este módulo contém a classe SampleProcessor, que herda de QThread.
+         O listener entrega-lhe os lotes de pacotes já descodificados; ela
+         valida os valores, encaminha cada amostra para o buffer do seu sensor,
+         atualiza as estatísticas móveis (src/estatisticas.py), avalia os alertas
+         (src/alertas.py), alimenta o log automático e prepara a "vista" do
+         sensor selecionado (curva decimada e amostras novas da tabela). A interface só
+         recolhe esses resultados prontos a desenhar, uma vez por frame.
+"""
+
+import math
+import queue
+import time
+from collections import deque
+from PyQt6.QtCore import QThread
+import numpy as np
+
+from src.decimation import DecimadorMinMax
+from src.estatisticas import EstatisticasSensor, DEFAULT_JANELAS
+from src.alertas import (
+    MotorAlertas, EventoAlerta, DEFAULT_HISTERESE, DEFAULT_ATRASO, MOTIVO_DECLIVE, MOTIVO_LIMPEZA
+)
+from src.metrics import Histograma, LIMITES_MILISSEGUNDOS
+
+# Lotes à espera de processamento (acima disto, os lotes novos são descartados)
+DEFAULT_TAMANHO_FILA = 10000
+# Tempo máximo (s) que a thread dorme sem lotes antes de rever a vista pendente
+INTERVALO_OCIOSO = 0.05
+# Máximo de pacotes juntados num ciclo (limita a latência sob carga contínua)
+MAXIMO_PACOTES_POR_CICLO = 20000
+# Marcador posto na fila por limpar(): descarta o que está antes dele
+PEDIDO_LIMPEZA = object()
+# Eventos de alerta guardados até serem recolhidos (os mais antigos são descartados)
+MAXIMO_EVENTOS_PENDENTES = 10000
+
+
+class SensorSnapshot:
+    """!
+    @brief Estado de um sensor num instante, copiado para a interface.
+    """
+    __slots__ = ('chave', 'nome', 'indice', 'valor', 'unidade', 'tempo',
+                 'em_alerta', 'alerta_declive', 'estatisticas', 'total_amostras')
+
+    def __init__(self, buffer):
+        """!
+        @brief Copia o último estado de um SensorBuffer.
+        @param buffer (SensorBuffer): O buffer (lido com o lock do registo).
+        """
+        self.chave = buffer.chave
+        self.nome = buffer.nome
+        self.indice = buffer.indice
+        self.valor = buffer.ultimo_valor
+        self.unidade = buffer.unidade
+        self.tempo = buffer.ultimo_tempo
+        self.em_alerta = buffer.em_alerta
+        self.alerta_declive = buffer.alerta_declive
+        # Tuplo de ResumoJanela (imutáveis): pode ser partilhado sem cópia
+        self.estatisticas = buffer.estatisticas
+        self.total_amostras = buffer.total_amostras
+
+
+class VistaSnapshot:
+    """!
+    @brief Tudo o que a interface precisa para desenhar o sensor selecionado.
+    @details Todos os arrays são cópias, por isso a interface não lê os
+             buffers partilhados. A tabela recebe só as amostras chegadas desde a
+             vista anterior (`reiniciar` False) ou, quando o sensor muda, as
+             últimas `tamanho_tabela` amostras (`reiniciar` True).
+    """
+    __slots__ = ('sensor', 'x', 'y', 'tempos', 'valores', 'reiniciar')
+
+    def __init__(self, sensor, x, y, tempos, valores, reiniciar):
+        """!
+        @brief Construtor do VistaSnapshot.
+        @param sensor (SensorSnapshot): O último estado do sensor.
+        @param x (numpy.ndarray): Timestamps da curva.
+        @param y (numpy.ndarray): Valores da curva.
+        @param tempos (numpy.ndarray): Timestamps das amostras novas da tabela (da mais antiga para a mais recente).
+        @param valores (numpy.ndarray): Valores das amostras novas da tabela.
+        @param reiniciar (bool): True se a tabela deve ser esvaziada antes de acrescentar.
+        """
+        self.sensor = sensor
+        self.x = x
+        self.y = y
+        self.tempos = tempos
+        self.valores = valores
+        self.reiniciar = reiniciar
+
+
+class SampleProcessor(QThread):
+    """!
+    @brief Thread que processa os pacotes recebidos fora da thread da interface.
+    @details Os lotes entram por enfileirar() (seguro a partir de qualquer
+             thread). Todas as escritas no SensorRegistry são feitas com o
+             `registry.lock`; a interface recolhe os resultados com
+             retirar_snapshot().
+    """
+
+    def __init__(self, registry, historico_segundos, tamanho_tabela,
+                 limite_min, limite_max, tamanho_fila=DEFAULT_TAMANHO_FILA,
+                 janelas_estatisticas=DEFAULT_JANELAS, limite_declive=0.0,
+                 histerese=DEFAULT_HISTERESE, atraso_alerta=DEFAULT_ATRASO, parent=None):
+        """!
+        @brief Construtor da classe SampleProcessor.
+
+        @param registry (SensorRegistry): O registo onde as amostras são guardadas.
+        @param historico_segundos (float): Duração da janela do gráfico.
+        @param tamanho_tabela (int): Máximo de linhas da tabela do sensor selecionado.
+        @param limite_min (float): Limite mínimo de alerta inicial.
+        @param limite_max (float): Limite máximo de alerta inicial.
+        @param tamanho_fila (int): Número máximo de lotes à espera.
+        @param janelas_estatisticas (tuple): Janelas (s) das estatísticas móveis de cada sensor.
+        @param limite_declive (float): Variação máxima (unidades/min) na primeira janela
+               antes de alertar; 0 desliga o alerta de declive.
+        @param histerese (float): Margem (unidades) dentro dos limites para um alerta terminar.
+        @param atraso_alerta (float): Duração mínima (s de 'ts') da condição antes de cada transição.
+        @param parent (QObject): O objeto pai do Qt (opcional).
+        """
+        super().__init__(parent)
+        self.registry = registry
+        self.historico_segundos = historico_segundos
+        self.tamanho_tabela = tamanho_tabela
+        self.janelas_estatisticas = tuple(janelas_estatisticas)
+        self.alertas = MotorAlertas(limite_min, limite_max, histerese, atraso_alerta, limite_declive)
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.running = True
+        # LogWriter ativo (ou None); definido pela interface
+        self.log_writer = None
+        # LogWriter do log de eventos de alerta (ou None)
+        self.log_eventos = None
+
+        # --- Estado partilhado com a interface (protegido por registry.lock) ---
+        self._novos = []            # Chaves de sensores criados desde a última recolha
+        self._atualizados = set()   # Chaves de sensores com dados novos
+        self._vista = None          # VistaSnapshot pronta, ainda não recolhida
+        self._vista_chave = None
+        self._vista_colunas = 1
+        self._vista_invalida = False
+        # total_amostras do sensor selecionado já entregue à tabela (None = reiniciar)
+        self._vista_entregues = None
+        self._decimadores = {}
+        # Transições de alerta ainda não recolhidas (ver retirar_eventos)
+        self._eventos = deque(maxlen=MAXIMO_EVENTOS_PENDENTES)
+        # Estatísticas móveis por sensor (só usadas pela thread de processamento)
+        self._estatisticas = {}
+
+        # --- Contadores (lidos pela UI) ---
+        self.amostras_processadas = 0
+        self.amostras_invalidas = 0
+        self.lotes_descartados = 0
+        self.erros = 0
+        self.ultimo_erro = None
+        # Tempo de cada ciclo (processar_lote + preparar_vista), em ms
+        self.tempo_processamento = Histograma(LIMITES_MILISSEGUNDOS)
+
+    # --- Chamados por outras threads ---
+
+    def enfileirar(self, lote):
+        """!
+        @brief Coloca um lote de pacotes na fila de processamento (não bloqueia).
+        @details Deve ser ligado ao listener com Qt.ConnectionType.DirectConnection,
+                 para correr na thread do listener e não passar pela da interface.
+        @param lote (list): Os pacotes (dicts com 'ts_epoch').
+        @return (bool): False se o lote foi descartado (fila cheia).
+        """
+        try:
+            self.fila.put_nowait(lote)
+            return True
+        except queue.Full:
+            self.lotes_descartados += 1
+            return False
+
+    def limpar(self):
+        """!
+        @brief Descarta os lotes à espera e esvazia os históricos (os sensores mantêm-se).
+        @details Usado quando os timestamps deixam de continuar os anteriores (entrar
+                 ou sair do replay, procurar outro instante). O pedido segue pela
+                 fila: o que foi enfileirado antes é descartado, o que vier depois
+                 é processado normalmente. Não bloqueia: com a fila cheia, os lotes
+                 à espera (que seriam descartados) são retirados já aqui.
+        """
+        while True:
+            try:
+                self.fila.put_nowait(PEDIDO_LIMPEZA)
+                return
+            except queue.Full:
+                pass
+            try:
+                while True:
+                    self.fila.get_nowait()
+            except queue.Empty:
+                pass
+
+    def _limpar_historicos(self):
+        with self.registry.lock:
+            for buffer in self.registry:
+                buffer.historico.limpar()
+                buffer.estatisticas = ()
+                self.registry.reajustar(buffer, 0)
+            # Os alertas em curso terminam (sem irem para o log de eventos)
+            for chave, motivo in self.alertas.limpar():
+                buffer = self.registry.get(chave)
+                if buffer is not None:
+                    self._eventos.append(EventoAlerta(buffer.ultimo_tempo, buffer, False,
+                                                      MOTIVO_LIMPEZA, buffer.ultimo_valor))
+                    buffer.em_alerta = buffer.alerta_declive = False
+            self._decimadores.clear()
+            self._estatisticas.clear()
+            self._vista = None
+            self._vista_entregues = None
+            self._vista_invalida = True
+
+    def definir_limites(self, limite_min, limite_max):
+        """!
+        @brief Atualiza os limites de alerta (aplicados a partir do próximo lote).
+        @param limite_min (float): O limite mínimo.
+        @param limite_max (float): O limite máximo.
+        """
+        self.alertas.definir_limites(limite_min, limite_max)
+
+    def definir_limite_declive(self, limite_declive):
+        """!
+        @brief Atualiza o limite do alerta de declive (aplicado a partir do próximo lote).
+        @param limite_declive (float): Variação máxima em unidades/min (0 = desligado).
+        """
+        self.alertas.limite_declive = limite_declive
+
+    def definir_vista(self, chave, n_colunas):
+        """!
+        @brief Indica qual sensor está selecionado e a largura do gráfico (pixels).
+        @details Se algo mudou, a vista é reconstruída mesmo sem dados novos.
+                 Ao mudar de sensor, a vista pendente (do sensor anterior) é
+                 descartada e a tabela recomeça.
+        @param chave (tuple): O par (group, sensor_id) selecionado.
+        @param n_colunas (int): A largura do gráfico, em pixels.
+        """
+        n_colunas = max(1, int(n_colunas))
+        if chave == self._vista_chave and n_colunas == self._vista_colunas:
+            return
+        with self.registry.lock:
+            if chave != self._vista_chave:
+                self._vista_chave = chave
+                self._vista = None
+                self._vista_entregues = None
+            self._vista_colunas = n_colunas
+            self._vista_invalida = True
+
+    def retirar_snapshot(self):
+        """!
+        @brief Recolhe (e limpa) tudo o que mudou desde a última chamada.
+        @return (tuple): (novos, atualizados, vista): lista de SensorSnapshot dos
+                 sensores novos (por ordem de criação), lista de SensorSnapshot dos
+                 sensores com dados novos, e o VistaSnapshot pronto (ou None).
+        """
+        with self.registry.lock:
+            novos = [SensorSnapshot(self.registry.get(chave)) for chave in self._novos]
+            atualizados = [SensorSnapshot(self.registry.get(chave)) for chave in self._atualizados]
+            vista = self._vista
+            self._novos = []
+            self._atualizados = set()
+            self._vista = None
+        return novos, atualizados, vista
+
+    def retirar_eventos(self):
+        """!
+        @brief Recolhe (e limpa) as transições de alerta desde a última chamada.
+        @return (list): Os EventoAlerta, por ordem.
+        """
+        with self.registry.lock:
+            eventos = list(self._eventos)
+            self._eventos.clear()
+        return eventos
+
+    def janela_do_sensor(self, chave):
+        """!
+        @brief Cópia das amostras de um sensor dentro da janela do histórico.
+        @param chave (tuple): O par (group, sensor_id).
+        @return (tuple): O par (tempos, valores), em arrays novos (vazios se o sensor não existe).
+        """
+        with self.registry.lock:
+            buffer = self.registry.get(chave)
+            if buffer is None:
+                return np.empty(0), np.empty(0)
+            tempos, valores = self._janela(buffer)
+            return tempos.copy(), valores.copy()
+
+    def janelas_dos_sensores(self, chaves):
+        """!
+        @brief Cópia das janelas de vários sensores, tiradas no mesmo instante (para exportar).
+        @param chaves (list): Os pares (group, sensor_id); os que não existem são ignorados.
+        @return (dict): (group, sensor_id) -> (tempos, valores, larguras, unidade); nos
+                troços agregados cada ponto é a média de um intervalo e `larguras`
+                tem a largura (s) desse intervalo (0 nas amostras brutas).
+        """
+        series = {}
+        with self.registry.lock:
+            for chave in chaves:
+                buffer = self.registry.get(chave)
+                if buffer is not None and buffer.ultimo_tempo is not None:
+                    series[chave] = (*buffer.historico.janela_media(
+                        buffer.ultimo_tempo - self.historico_segundos), buffer.unidade)
+        return series
+
+    def intervalo_dos_sensores(self, chaves):
+        """!
+        @brief O intervalo de tempo coberto pelas janelas de vários sensores, sem as copiar.
+        @details Só lê o primeiro e o último timestamp de cada janela (para
+                 preencher o diálogo de exportação na thread da interface).
+        @param chaves (list): Os pares (group, sensor_id); os que não existem são ignorados.
+        @return (tuple | None): O par (t_inicio, t_fim), ou None se não houver amostras.
+        """
+        inicios, fins = [], []
+        with self.registry.lock:
+            for chave in chaves:
+                buffer = self.registry.get(chave)
+                if buffer is None or buffer.ultimo_tempo is None:
+                    continue
+                inicio = buffer.historico.inicio_janela(buffer.ultimo_tempo - self.historico_segundos)
+                if inicio is not None:
+                    inicios.append(inicio)
+                    fins.append(buffer.ultimo_tempo)
+        if not inicios:
+            return None
+        return min(inicios), max(fins)
+
+    # --- Thread de processamento ---
+
+    def _janela(self, buffer, media=False):
+        # A janela termina no timestamp mais recente do próprio sensor
+        # (e não no relógio do PC), para tolerar relógios dessincronizados.
+        # Antes das amostras brutas vêm os níveis agregados (ver HistoricoNiveis.janela).
+        if buffer.ultimo_tempo is None:
+            return buffer.historico.tempos(), buffer.historico.valores()
+        return buffer.historico.janela(buffer.ultimo_tempo - self.historico_segundos, media)
+
+    def processar_lote(self, lote):
+        """!
+        @brief Valida e encaminha um lote de pacotes para os buffers dos sensores.
+        @param lote (list): Os pacotes (dicts com 'ts_epoch').
+        """
+        # --- 1. Valida e agrupa por sensor (fora do lock) ---
+        por_sensor = {}
+        log_writer = self.log_writer
+        for data_dict in lote:
+            try:
+                valor = float(data_dict.get('value', 0.0))
+                # 'ts_epoch' pode vir já no pacote (ver normalizar_timestamp): não é de confiança
+                tempo = float(data_dict['ts_epoch'])
+            except (KeyError, TypeError, ValueError):
+                self.amostras_invalidas += 1
+                continue
+            if not (math.isfinite(valor) and math.isfinite(tempo)):
+                self.amostras_invalidas += 1
+                continue
+            group = str(data_dict.get('group', 'N/A'))
+            sensor_id = str(data_dict.get('sensor_id', 'N/A'))
+            unidade = str(data_dict.get('unit', ''))
+
+            entrada = por_sensor.get((group, sensor_id))
+            if entrada is None:
+                entrada = por_sensor[(group, sensor_id)] = [[], [], unidade]
+            entrada[0].append(tempo)
+            entrada[1].append(valor)
+            entrada[2] = unidade
+
+            if log_writer is not None:
+                log_writer.escrever([tempo, group, sensor_id, valor, unidade])
+
+        # --- 2. Estatísticas móveis (fora do lock; só esta thread as usa) ---
+        resumos = {}
+        for chave, (tempos, valores, _) in por_sensor.items():
+            estatisticas = self._estatisticas.get(chave)
+            if estatisticas is None:
+                estatisticas = self._estatisticas[chave] = EstatisticasSensor(self.janelas_estatisticas)
+            estatisticas.acrescentar(tempos, valores)
+            resumos[chave] = estatisticas.resumos()
+
+        # --- 3. Atualiza os buffers e avalia os alertas (só as transições geram eventos) ---
+        log_eventos = self.log_eventos
+        with self.registry.lock:
+            for chave, (tempos, valores, unidade) in por_sensor.items():
+                buffer = self.registry.get(chave)
+                if buffer is None:
+                    buffer = self.registry.obter(chave)
+                    self._novos.append(chave)
+                buffer.historico.extend(tempos, valores)
+                buffer.unidade = unidade
+                buffer.ultimo_valor = valores[-1]
+                buffer.ultimo_tempo = tempos[-1]
+                buffer.estatisticas = resumos[chave]
+                # Declive (unidades/s) da janela mais curta
+                declive = buffer.estatisticas[0].declive if buffer.estatisticas else None
+                for evento in self.alertas.avaliar(buffer, tempos, valores, declive):
+                    self._eventos.append(evento)
+                    if log_eventos is not None:
+                        log_eventos.escrever(evento.linha_log())
+                estado = self.alertas.estado(chave)
+                buffer.em_alerta = estado.ativo
+                buffer.alerta_declive = estado.ativo and estado.motivo == MOTIVO_DECLIVE
+                buffer.total_amostras += len(valores)
+                self._reajustar_memoria(buffer)
+                self._atualizados.add(chave)
+                self.amostras_processadas += len(valores)
+            if self._vista_chave in por_sensor:
+                self._vista_invalida = True
+
+    def _reajustar_memoria(self, buffer):
+        # Chamado com o lock: conta no orçamento do sensor as estatísticas e o decimador
+        estatisticas = self._estatisticas.get(buffer.chave)
+        decimador = self._decimadores.get(buffer.chave)
+        extra = ((estatisticas.memoria() if estatisticas is not None else 0)
+                 + (decimador.memoria() if decimador is not None else 0))
+        if extra != buffer.memoria_extra:
+            self.registry.reajustar(buffer, extra)
+
+    def preparar_vista(self):
+        """!
+        @brief Constrói o VistaSnapshot do sensor selecionado, se estiver desatualizado.
+        @details Só constrói uma vista nova depois de a anterior ter sido recolhida
+                 pela interface, para não decimar mais vezes do que ela desenha.
+        """
+        with self.registry.lock:
+            if not self._vista_invalida or self._vista is not None:
+                return
+            buffer = self.registry.get(self._vista_chave)
+            if buffer is None or buffer.ultimo_valor is None:
+                return
+            decimador = self._decimadores.get(buffer.chave)
+            if decimador is None:
+                decimador = self._decimadores[buffer.chave] = DecimadorMinMax(self.historico_segundos)
+
+            # Janela temporal decimada a 2 pontos (mín./máx.) por pixel; copiada
+            # porque os buffers continuam a ser escritos enquanto a UI desenha.
+            x, y = decimador.decimar(*self._janela(buffer), self._vista_colunas)
+            self._reajustar_memoria(buffer)
+
+            # Tabela: só as amostras que ela ainda não recebeu (limitadas ao
+            # que ainda está no histórico bruto e ao tamanho da tabela)
+            reiniciar = self._vista_entregues is None
+            novas = self.tamanho_tabela if reiniciar else buffer.total_amostras - self._vista_entregues
+            bruto = buffer.historico.bruto
+            novas = min(novas, self.tamanho_tabela, len(bruto))
+            tempos = bruto.tempos()[len(bruto) - novas:]
+            valores = bruto.valores()[len(bruto) - novas:]
+            self._vista_entregues = buffer.total_amostras
+
+            self._vista = VistaSnapshot(SensorSnapshot(buffer), np.array(x), np.array(y),
+                                        tempos.copy(), valores.copy(), reiniciar)
+            self._vista_invalida = False
+
+    def run(self):
+        """!
+        @brief O "coração" da thread, executado quando .start() é chamado.
+        @details Espera por lotes; junta todos os que já estiverem na fila,
+                 processa-os de uma vez e prepara a vista do sensor selecionado.
+        """
+        while self.running:
+            lote = []
+            try:
+                item = self.fila.get(timeout=INTERVALO_OCIOSO)
+                while True:
+                    if item is PEDIDO_LIMPEZA:
+                        lote = []
+                        self._limpar_historicos()
+                    else:
+                        lote.extend(item or [])
+                    if len(lote) >= MAXIMO_PACOTES_POR_CICLO:
+                        break
+                    item = self.fila.get_nowait()
+            except queue.Empty:
+                pass
+
+            try:
+                inicio = time.perf_counter()
+                if lote:
+                    self.processar_lote(lote)
+                self.preparar_vista()
+                if lote:
+                    self.tempo_processamento.observar((time.perf_counter() - inicio) * 1000.0)
+            except Exception as e:
+                self.erros += 1
+                self.ultimo_erro = str(e)
+                print(f"Erro ao processar lote: {e}")
+        print("Thread de processamento terminada.")
+
+    def stop(self):
+        """!
+        @brief Pára a thread de forma limpa (acordando-a se estiver à espera).
+        """
+        self.running = False
+        try:
+            self.fila.put_nowait(None)
+        except queue.Full:
+            pass
@@ -0,0 +1,191 @@
+"""!
+@file relay.py
+@brief Reenvio (fan-out) dos pacotes recebidos para outros monitores.
+@details Só um processo pode fazer o 'bind' a UDP_IP:UDP_PORT; com o relay,
+         o coletor que recebe das placas STM32 reenvia os dados para uma lista
+         de destinos (outros postos de operador) ou para um grupo multicast, sem
+         mais carga nos dispositivos embebidos. Os destinos são instâncias
+         normais desta aplicação (ou qualquer recetor dos mesmos formatos).
+
+         Dois modos:
+         - bruto: cada datagrama válido é reenviado tal como chegou;
+         - lote: as amostras já descodificadas são juntadas em datagramas de até
+           `bytes_datagrama` bytes, enviados quando enchem ou, no máximo,
+           `intervalo` segundos depois da primeira amostra pendente. Sensores da
+           secção [SensoresBinarios] vão no formato binário (valor em float32,
+           timestamp em ms); os outros numa lista JSON de pacotes (ver wire_format.py).
+
+         O RelayUDP não tem thread própria: é usado pela thread do UDPListener,
+         com um socket não bloqueante (um destino lento ou ausente só perde
+         datagramas, nunca atrasa a receção).
+"""
+
+import json
+import math
+import socket
+import time
+
+from src.wire_format import (
+    codificar_binario, MAXIMO_AMOSTRAS_DATAGRAMA, TAMANHO_CABECALHO, TAMANHO_AMOSTRA
+)
+
+MODO_BRUTO = 'bruto'
+MODO_LOTE = 'lote'
+# Cabe num pacote Ethernet (MTU 1500) sem fragmentação IP
+DEFAULT_BYTES_DATAGRAMA = 1400
+# Tempo máximo (s) que uma amostra espera por um datagrama cheio
+DEFAULT_INTERVALO_RELAY = 0.02
+# TTL dos datagramas multicast (1 = só a rede local)
+DEFAULT_TTL_MULTICAST = 1
+# Maior carga útil de um datagrama UDP sobre IPv4
+TAMANHO_MAXIMO_ENVIO = 65507
+# Maior valor finito representável no campo float32 do formato binário
+MAXIMO_FLOAT32 = 3.4028234663852886e38
+
+
+class RelayUDP:
+    """!
+    @brief Reenvia datagramas (modo bruto) ou lotes de amostras (modo lote) para vários destinos.
+    """
+
+    def __init__(self, destinos, modo=MODO_LOTE, sensores_binarios=None,
+                 bytes_datagrama=DEFAULT_BYTES_DATAGRAMA, intervalo=DEFAULT_INTERVALO_RELAY,
+                 ttl_multicast=DEFAULT_TTL_MULTICAST):
+        """!
+        @brief Construtor do RelayUDP.
+        @param destinos (list): Tuplos (ip, porta); unicast ou grupos multicast.
+        @param modo (str): MODO_BRUTO ou MODO_LOTE.
+        @param sensores_binarios (dict): indice -> (group, sensor_id, unit); estes
+                                         sensores são reenviados no formato binário.
+        @param bytes_datagrama (int): Tamanho máximo de cada datagrama (modo lote).
+        @param intervalo (float): Espera máxima (s) de uma amostra antes do envio (modo lote).
+        @param ttl_multicast (int): TTL dos datagramas multicast.
+        @exception ValueError Se o modo for desconhecido.
+        @exception OSError Se algum destino não puder ser resolvido.
+        """
+        if modo not in (MODO_BRUTO, MODO_LOTE):
+            raise ValueError(f"Modo de relay desconhecido: {modo} (esperado '{MODO_BRUTO}' ou '{MODO_LOTE}')")
+        self.modo = modo
+        self.bytes_datagrama = max(TAMANHO_CABECALHO + TAMANHO_AMOSTRA,
+                                   min(int(bytes_datagrama), TAMANHO_MAXIMO_ENVIO))
+        self.intervalo = max(0.0, float(intervalo))
+        self.maximo_binario = min(MAXIMO_AMOSTRAS_DATAGRAMA,
+                                  (self.bytes_datagrama - TAMANHO_CABECALHO) // TAMANHO_AMOSTRA)
+        # (group, sensor_id) -> índice binário
+        self.indices = {(g, s): indice for indice, (g, s, _) in (sensores_binarios or {}).items()}
+
+        # Um socket por família (IPv4/IPv6), partilhado pelos destinos
+        self._sockets = {}
+        self.destinos = []
+        for ip, porta in destinos:
+            familia, _, _, _, endereco = socket.getaddrinfo(ip, porta, type=socket.SOCK_DGRAM)[0]
+            if familia not in self._sockets:
+                self._sockets[familia] = self._abrir_socket(familia, ttl_multicast)
+            self.destinos.append((self._sockets[familia], endereco))
+
+        # --- Pendentes (modo lote) ---
+        self._binario = []      # Tuplos (indice, valor, ts_epoch)
+        self._json = []         # Pacotes já serializados
+        self._bytes_json = 1    # Tamanho da lista JSON pendente ('[' ... ']')
+        self._prazo = None      # time.monotonic() em que os pendentes têm de sair
+
+        # --- Contadores (lidos pelas métricas) ---
+        self.datagramas_enviados = 0
+        self.datagramas_nao_enviados = 0
+        self.amostras_reenviadas = 0
+        self.ultimo_erro = None
+
+    def _abrir_socket(self, familia, ttl_multicast):
+        sock = socket.socket(familia, socket.SOCK_DGRAM)
+        if familia == socket.AF_INET6:
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, ttl_multicast)
+        else:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl_multicast)
+        sock.setblocking(False)
+        return sock
+
+    def _enviar(self, data):
+        # Um datagrama para todos os destinos
+        for sock, endereco in self.destinos:
+            try:
+                sock.sendto(data, endereco)
+                self.datagramas_enviados += 1
+            except OSError as e:
+                # Buffer de envio cheio ou destino inalcançável: o datagrama perde-se
+                self.datagramas_nao_enviados += 1
+                self.ultimo_erro = str(e)
+
+    def reenviar(self, data, pacotes):
+        """!
+        @brief Reenvia um datagrama já descodificado com sucesso.
+        @param data (bytes): O datagrama original (modo bruto).
+        @param pacotes (list): Os pacotes descodificados, com 'ts_epoch' (modo lote).
+        """
+        if self.modo == MODO_BRUTO:
+            self._enviar(data)
+            self.amostras_reenviadas += len(pacotes)
+            return
+        for data_dict in pacotes:
+            indice = self.indices.get((data_dict.get('group'), data_dict.get('sensor_id')))
+            if indice is not None:
+                try:
+                    valor = float(data_dict['value'])
+                    tempo = float(data_dict['ts_epoch'])
+                except (KeyError, TypeError, ValueError):
+                    valor = tempo = math.nan
+                if abs(valor) <= MAXIMO_FLOAT32 and tempo >= 0:
+                    self._binario.append((indice, valor, tempo))
+                else:
+                    indice = None # Não cabe no formato binário; segue em JSON
+            if indice is None:
+                texto = json.dumps(data_dict, ensure_ascii=False).encode('utf-8')
+                # Lista JSON: '[' + itens separados por ',' + ']'
+                if self._json and self._bytes_json + len(texto) + 1 > self.bytes_datagrama:
+                    self._enviar_json()
+                self._json.append(texto)
+                self._bytes_json += len(texto) + 1
+            elif len(self._binario) >= self.maximo_binario:
+                self._enviar_binario()
+            if self._prazo is None:
+                self._prazo = time.monotonic() + self.intervalo
+
+    def _enviar_binario(self):
+        if self._binario:
+            self._enviar(codificar_binario(self._binario))
+            self.amostras_reenviadas += len(self._binario)
+            self._binario = []
+
+    def _enviar_json(self):
+        if self._json:
+            self._enviar(b'[' + b','.join(self._json) + b']')
+            self.amostras_reenviadas += len(self._json)
+            self._json = []
+            self._bytes_json = 1
+
+    def espera(self):
+        """!
+        @brief Tempo até ao envio dos pendentes (timeout do select() do listener).
+        @return (float | None): Segundos (>= 0), ou None se não houver nada pendente.
+        """
+        if self._prazo is None:
+            return None
+        return max(0.0, self._prazo - time.monotonic())
+
+    def enviar_vencidos(self, forcar=False):
+        """!
+        @brief Envia os pendentes cujo prazo já passou (ou todos, com `forcar`).
+        @param forcar (bool): True para enviar já (ex: ao terminar).
+        """
+        if self._prazo is None or (not forcar and time.monotonic() < self._prazo):
+            return
+        self._enviar_binario()
+        self._enviar_json()
+        self._prazo = None
+
+    def fechar(self):
+        """!
+        @brief Envia o que estiver pendente e fecha os sockets.
+        """
+        self.enviar_vencidos(forcar=True)
+        for sock in self._sockets.values():
+            sock.close()
@@ -0,0 +1,423 @@
+"""!
+@file replay.py
+@brief Reprodução (replay) de logs gravados, pelo mesmo pipeline dos dados ao vivo.
+@details Abre o log contínuo (CSV ou binário .slog) e as suas versões rodadas
+         e entrega as amostras ao SampleProcessor, como se viessem do listener,
+         a 1x, 10x ou à velocidade máxima.
+
+         Para procurar um instante sem ler o ficheiro todo, cada CSV recebe um
+         índice esparso: a cada PASSO_INDICE bytes (via mmap) é lido só o 'ts'
+         da primeira linha completa. Como o log é escrito por ordem de chegada,
+         uma busca binária nesse índice dá o offset a partir do qual ler. Nos
+         ficheiros binários o índice são os próprios cabeçalhos dos blocos
+         (ver log_archive.py). A leitura é feita em blocos de
+         TAMANHO_BLOCO_LEITURA bytes, por isso logs de vários GB não são
+         carregados em memória.
+"""
+
+import bisect
+import csv
+import mmap
+import os
+import threading
+import time
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.log_archive import ArchiveReader, arquivos_rotacionados, MAGIC_FICHEIRO
+from src.timestamps import ConversorTimestamp
+
+# Distância (bytes) entre entradas do índice esparso dos CSV
+PASSO_INDICE = 1024 * 1024
+# Bytes lidos de cada vez ao percorrer um CSV
+TAMANHO_BLOCO_LEITURA = 4 * 1024 * 1024
+# Máximo de bytes lidos para encontrar o 'ts' no início de uma linha
+TAMANHO_MAXIMO_TS = 64
+
+# Velocidades de reprodução (0 = o mais depressa possível)
+VELOCIDADE_MAXIMA = 0.0
+# Máximo de amostras e de tempo (s, em tempo de reprodução) por lote enviado
+AMOSTRAS_POR_LOTE = 1000
+INTERVALO_LOTE = 0.05
+# Lotes na fila do processamento acima dos quais o replay espera (contrapressão)
+MAXIMO_LOTES_PENDENTES = 8
+# Atraso (s) acima do qual o relógio do replay é reancorado em vez de "correr atrás"
+ATRASO_MAXIMO = 1.0
+# Intervalo mínimo (s) entre emissões do sinal `progresso`
+INTERVALO_PROGRESSO = 0.1
+
+
+def _tempo_da_linha(dados, pos, conversor):
+    fim = dados.find(b',', pos, pos + TAMANHO_MAXIMO_TS)
+    if fim < 0:
+        return None
+    try:
+        return conversor.para_epoch(dados[pos:fim].decode('ascii').strip('"'))
+    except UnicodeDecodeError:
+        return None
+
+
+def _primeira_linha_dados(dados, conversor):
+    # Salta o cabeçalho (a primeira linha sem um 'ts' válido)
+    if _tempo_da_linha(dados, 0, conversor) is None:
+        return dados.find(b'\n') + 1
+    return 0
+
+
+def _tempo_ultima_linha(dados, conversor):
+    # Última linha completa (a última pode estar a meio de ser escrita)
+    ultima_quebra = dados.rfind(b'\n')
+    if ultima_quebra <= 0:
+        return None
+    return _tempo_da_linha(dados, dados.rfind(b'\n', 0, ultima_quebra) + 1, conversor)
+
+
+def _intervalo_ficheiro(caminho):
+    # Primeiro e último 'ts' de um ficheiro do log (CSV ou .slog), sem o indexar
+    with open(caminho, 'rb') as f:
+        if f.read(len(MAGIC_FICHEIRO)) == MAGIC_FICHEIRO:
+            return ArchiveReader(caminho).intervalo()
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        conversor = ConversorTimestamp()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            pos = _primeira_linha_dados(m, conversor)
+            t_inicio = _tempo_da_linha(m, pos, conversor) if pos < len(m) else None
+            if t_inicio is None:
+                return None
+            t_fim = _tempo_ultima_linha(m, conversor)
+    return t_inicio, t_inicio if t_fim is None else t_fim
+
+
+def limites_log(filename):
+    """!
+    @brief Primeiro e último 'ts' de um log e das suas versões rodadas, sem os indexar.
+    @details Lê só o início do ficheiro mais antigo e o fim do mais recente
+             (com amostras), por isso serve para preencher diálogos na thread da
+             interface; a FonteReplay, que indexa tudo, fica para quem vai ler.
+    @param filename (str): O log (CSV ou .slog).
+    @return (tuple): O par (t_inicio, t_fim), em segundos desde a epoch.
+    @exception ValueError Se não houver amostras nos ficheiros.
+    @exception OSError Se o ficheiro não existir ou não puder ser lido.
+    """
+    caminhos = arquivos_rotacionados(filename) or [filename]
+    primeiro = next((i for i in map(_intervalo_ficheiro, caminhos) if i is not None), None)
+    if primeiro is None:
+        raise ValueError(f"Sem amostras em {filename}")
+    ultimo = next(i for i in map(_intervalo_ficheiro, reversed(caminhos)) if i is not None)
+    return primeiro[0], ultimo[1]
+
+
+class IndiceCsv:
+    """!
+    @brief Índice esparso (offset -> 'ts') de um CSV do log contínuo.
+    """
+
+    def __init__(self, filename, passo=PASSO_INDICE):
+        """!
+        @brief Constrói o índice lendo só uma linha a cada `passo` bytes.
+        @param filename (str): O caminho do CSV.
+        @param passo (int): Distância (bytes) entre entradas do índice.
+        """
+        self.filename = filename
+        self.offsets = []
+        self.tempos = []
+        self.t_inicio = self.t_fim = None
+        conversor = ConversorTimestamp()
+
+        tamanho = os.path.getsize(filename)
+        if tamanho == 0:
+            return
+        with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            pos = _primeira_linha_dados(m, conversor)
+            while pos < tamanho:
+                tempo = _tempo_da_linha(m, pos, conversor)
+                if tempo is not None:
+                    self.offsets.append(pos)
+                    self.tempos.append(tempo)
+                proxima = m.find(b'\n', pos + passo)
+                if proxima < 0:
+                    break
+                pos = proxima + 1
+
+            self.t_fim = _tempo_ultima_linha(m, conversor)
+        if self.tempos:
+            self.t_inicio = self.tempos[0]
+            if self.t_fim is None:
+                self.t_fim = self.tempos[-1]
+
+    def offset_para(self, tempo):
+        """!
+        @brief Offset a partir do qual ler para encontrar as amostras com 'ts' >= `tempo`.
+        @param tempo (float | None): O instante procurado (None = início do ficheiro).
+        @return (int): O offset de uma linha com 'ts' <= `tempo` (ou a primeira linha de dados).
+        """
+        if not self.offsets:
+            return 0
+        if tempo is None:
+            return self.offsets[0]
+        i = bisect.bisect_right(self.tempos, tempo) - 1
+        return self.offsets[max(i, 0)]
+
+
+def ler_csv(filename, offset, t_inicio=None):
+    """!
+    @brief Lê um CSV do log contínuo a partir de `offset`, em blocos.
+    @param filename (str): O caminho do CSV.
+    @param offset (int): Início de uma linha (ver IndiceCsv.offset_para).
+    @param t_inicio (float): Ignora as linhas com 'ts' anterior (None = nenhuma).
+    @return (generator): Listas de pacotes (dicts com 'ts_epoch'), uma por bloco lido.
+    """
+    conversor = ConversorTimestamp()
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            tamanho = len(m)
+            pos = offset
+            while pos < tamanho:
+                fim = min(pos + TAMANHO_BLOCO_LEITURA, tamanho)
+                if fim < tamanho:
+                    # Termina o bloco no fim de uma linha
+                    quebra = m.rfind(b'\n', pos, fim)
+                    fim = quebra + 1 if quebra >= 0 else (m.find(b'\n', fim) + 1 or tamanho)
+                texto = m[pos:fim].decode('utf-8', errors='replace')
+                pos = fim
+
+                pacotes = []
+                for row in csv.reader(texto.splitlines()):
+                    if len(row) < 5:
+                        continue
+                    tempo = conversor.para_epoch(row[0])
+                    if tempo is None or (t_inicio is not None and tempo < t_inicio):
+                        continue  # Cabeçalho, linha inválida ou antes do início
+                    try:
+                        valor = float(row[3])
+                    except ValueError:
+                        continue
+                    pacotes.append({'group': row[1], 'sensor_id': row[2], 'value': valor,
+                                    'unit': row[4], 'ts_epoch': tempo})
+                if pacotes:
+                    yield pacotes
+
+
+class FonteReplay:
+    """!
+    @brief Um log (e as suas versões rodadas) pronto a reproduzir a partir de qualquer instante.
+    """
+
+    def __init__(self, filename):
+        """!
+        @brief Indexa o ficheiro e as suas versões rodadas (da mais antiga para a atual).
+        @param filename (str): O log escolhido (CSV ou .slog).
+        @exception ValueError Se não houver amostras nos ficheiros.
+        """
+        self.filename = filename
+        # (caminho, t_inicio, t_fim, IndiceCsv ou ArchiveReader)
+        self.ficheiros = []
+        for caminho in arquivos_rotacionados(filename) or [filename]:
+            with open(caminho, 'rb') as f:
+                binario = f.read(len(MAGIC_FICHEIRO)) == MAGIC_FICHEIRO
+            if binario:
+                leitor = ArchiveReader(caminho)
+                blocos = list(leitor.blocos())
+                if not blocos:
+                    continue
+                t_inicio = min(b[2] for b in blocos)
+                t_fim = max(b[3] for b in blocos)
+            else:
+                leitor = IndiceCsv(caminho)
+                if leitor.t_inicio is None:
+                    continue
+                t_inicio, t_fim = leitor.t_inicio, leitor.t_fim
+            self.ficheiros.append((caminho, t_inicio, t_fim, leitor))
+        if not self.ficheiros:
+            raise ValueError(f"Sem amostras em {filename}")
+        self.t_inicio = min(f[1] for f in self.ficheiros)
+        self.t_fim = max(f[2] for f in self.ficheiros)
+
+    def ler(self, t_inicio=None):
+        """!
+        @brief Lê as amostras a partir de `t_inicio`, ficheiro a ficheiro.
+        @param t_inicio (float): O instante inicial (None = desde o início).
+        @return (generator): Listas de pacotes (dicts com 'ts_epoch').
+        """
+        for caminho, _, t_fim, leitor in self.ficheiros:
+            if t_inicio is not None and t_fim < t_inicio:
+                continue  # Ficheiro inteiro antes do instante pedido
+            if isinstance(leitor, IndiceCsv):
+                yield from ler_csv(caminho, leitor.offset_para(t_inicio), t_inicio)
+                continue
+            for tempos, chaves, indices, valores in leitor.ler(t_inicio):
+                yield [
+                    {'group': chaves[i][0], 'sensor_id': chaves[i][1], 'value': v,
+                     'unit': chaves[i][2], 'ts_epoch': t}
+                    for t, i, v in zip(tempos.tolist(), indices.tolist(), valores.tolist())
+                ]
+
+
+class ReplayThread(QThread):
+    """!
+    @brief Thread que indexa um log (FonteReplay) e entrega as amostras ao SampleProcessor.
+    @details O índice é construído já na thread (num log grande pode demorar);
+             `aberto` ou `erro` avisam a interface quando termina.
+             A cadência segue os timestamps gravados, dividida pela velocidade.
+             procurar() salta para outro instante (o histórico dos sensores é
+             limpo); à velocidade máxima, o replay espera quando a fila do
+             processamento tem mais de MAXIMO_LOTES_PENDENTES lotes.
+    """
+
+    progresso = pyqtSignal(float)
+    """!
+    @brief Sinal emitido com o timestamp (segundos desde a epoch) da última amostra entregue.
+    """
+
+    terminado = pyqtSignal()
+    """!
+    @brief Sinal emitido quando chega ao fim do log (a thread continua, à espera de procurar()).
+    """
+
+    aberto = pyqtSignal(float, float, int)
+    """!
+    @brief Sinal emitido quando o log está indexado, com t_inicio, t_fim e o número de ficheiros.
+    """
+
+    erro = pyqtSignal(str)
+    """!
+    @brief Sinal emitido com a descrição do erro se o log não puder ser aberto (a thread termina).
+    """
+
+    def __init__(self, filename, processor, velocidade=1.0, t_inicio=None, parent=None):
+        """!
+        @brief Construtor do ReplayThread.
+        @param filename (str): O log a reproduzir (CSV ou .slog; as versões rodadas são incluídas).
+        @param processor (SampleProcessor): O processamento que recebe as amostras.
+        @param velocidade (float): Fator de velocidade (1 = tempo real, 0 = máximo).
+        @param t_inicio (float): Instante inicial (None = início do log).
+        @param parent (QObject): O objeto pai do Qt (opcional).
+        """
+        super().__init__(parent)
+        self.filename = filename
+        self.fonte = None       # A FonteReplay, criada em run()
+        self.processor = processor
+        self.velocidade = velocidade
+        self.running = True
+        self.posicao = t_inicio
+        self._procura = t_inicio
+        self._acordar = threading.Event()
+        # Impede que um lote entre na fila do processamento depois de stop()
+        self._lock_entrega = threading.Lock()
+
+    def definir_velocidade(self, velocidade):
+        """!
+        @brief Muda a velocidade (aplicada a partir do próximo lote).
+        @param velocidade (float): Fator de velocidade (0 = máximo).
+        """
+        self.velocidade = velocidade
+        self._acordar.set()
+
+    def procurar(self, tempo):
+        """!
+        @brief Salta para outro instante do log.
+        @param tempo (float): O instante (segundos desde a epoch).
+        """
+        self._procura = tempo
+        self._acordar.set()
+
+    def _esperar(self, segundos):
+        self._acordar.wait(segundos)
+        self._acordar.clear()
+
+    def _entregar(self, lote):
+        # Contrapressão: não deixa a fila do processamento crescer sem limite
+        while self.running and self._procura is None and \
+                self.processor.fila.qsize() > MAXIMO_LOTES_PENDENTES:
+            self._esperar(0.005)
+        with self._lock_entrega:
+            if self.running:
+                self.processor.enfileirar(lote)
+        self.posicao = lote[-1]['ts_epoch']
+
+    def reproduzir(self, t_inicio):
+        """!
+        @brief Reproduz desde `t_inicio` até ao fim, a um stop() ou a um procurar().
+        @param t_inicio (float): O instante inicial.
+        @return (bool): True se chegou ao fim do log.
+        """
+        # Antes das amostras novas: descarta o que estava na fila e limpa os históricos
+        with self._lock_entrega:
+            if not self.running:
+                return False
+            self.processor.limpar()
+        ancora = None   # (hora do relógio, timestamp gravado, velocidade)
+        ultimo_progresso = 0.0
+        lote = []
+        for bloco in self.fonte.ler(t_inicio):
+            for pacote in bloco:
+                if not self.running or self._procura is not None:
+                    return False
+                velocidade = self.velocidade
+                tempo = pacote['ts_epoch']
+                if lote and (len(lote) >= AMOSTRAS_POR_LOTE or
+                             (velocidade > 0 and tempo - lote[0]['ts_epoch'] > INTERVALO_LOTE * velocidade)):
+                    self._entregar(lote)
+                    lote = []
+                    agora = time.monotonic()
+                    if agora - ultimo_progresso >= INTERVALO_PROGRESSO:
+                        ultimo_progresso = agora
+                        self.progresso.emit(self.posicao)
+
+                if not lote and velocidade > 0:
+                    # Espera até à hora (relógio) correspondente a este timestamp
+                    if ancora is None or ancora[2] != velocidade:
+                        ancora = (time.monotonic(), tempo, velocidade)
+                    espera = ancora[0] + (tempo - ancora[1]) / velocidade - time.monotonic()
+                    if espera < -ATRASO_MAXIMO:
+                        ancora = (time.monotonic(), tempo, velocidade)
+                    while espera > 0 and self.running and self._procura is None \
+                            and self.velocidade == velocidade:
+                        self._esperar(min(espera, INTERVALO_PROGRESSO))
+                        espera = ancora[0] + (tempo - ancora[1]) / velocidade - time.monotonic()
+                lote.append(pacote)
+        if lote and self.running and self._procura is None:
+            self._entregar(lote)
+        self.progresso.emit(self.posicao)
+        return True
+
+    def run(self):
+        """!
+        @brief O "coração" da thread, executado quando .start() é chamado.
+        @details Indexa o log e reproduz a partir do instante pedido; ao chegar
+                 ao fim emite `terminado` e fica à espera de um procurar() ou de stop().
+        """
+        try:
+            self.fonte = FonteReplay(self.filename)
+        except (OSError, ValueError) as e:
+            self.erro.emit(f"Não foi possível abrir o log:\n{e}")
+            print("Thread de replay terminada.")
+            return
+        if self._procura is None:
+            self._procura = self.fonte.t_inicio
+        self.posicao = self._procura
+        self.aberto.emit(self.fonte.t_inicio, self.fonte.t_fim, len(self.fonte.ficheiros))
+        while self.running:
+            t_inicio, self._procura = self._procura, None
+            if t_inicio is None:
+                self._esperar(INTERVALO_PROGRESSO)
+                continue
+            try:
+                if self.reproduzir(t_inicio):
+                    self.terminado.emit()
+            except Exception as e:
+                print(f"Erro no replay de {self.filename}: {e}")
+                self.terminado.emit()
+        print("Thread de replay terminada.")
+
+    def stop(self):
+        """!
+        @brief Pára a thread de forma limpa.
+        @details Não bloqueia: depois de stop() a thread já não entrega lotes ao
+                 processamento, mas pode ainda estar a indexar o log.
+        """
+        with self._lock_entrega:
+            self.running = False
+        self._acordar.set()
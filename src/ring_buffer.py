@@ -0,0 +1,175 @@
+"""!
+@file ring_buffer.py
+@brief Buffer circular pré-alocado (NumPy) de amostras (timestamp, valor).
+@details Substitui o par deque + list() usado para o gráfico. Os dados são
+         guardados em dois arrays float64 alocados uma única vez. Cada amostra
+         é escrita duas vezes (na posição i e i + capacidade), de modo que as
+         últimas N amostras estão sempre contíguas em memória e podem ser
+         entregues ao pyqtgraph como uma view, sem cópia nem alocação.
+"""
+
+import numpy as np
+
+# Bytes de cada amostra guardada (tempo e valor float64, escritos duas vezes)
+BYTES_POR_AMOSTRA = 2 * 2 * 8
+
+
+class RingBuffer:
+    """!
+    @brief Buffer circular de capacidade fixa com views contíguas e sem cópia.
+    @details As views devolvidas por tempos()/valores() são só de leitura e
+             refletem o conteúdo no momento da chamada; ficam inválidas (apontam
+             para dados sobrescritos) depois da próxima escrita.
+    """
+
+    def __init__(self, capacidade):
+        """!
+        @brief Construtor do RingBuffer.
+        @param capacidade (int): Número máximo de amostras guardadas.
+        """
+        self.capacidade = int(capacidade)
+        # Armazenamento espelhado: 2x a capacidade
+        self._tempos = np.zeros(2 * self.capacidade, dtype=np.float64)
+        self._valores = np.zeros(2 * self.capacidade, dtype=np.float64)
+        self._pos = 0       # Próxima posição de escrita, em [0, capacidade)
+        self._tamanho = 0   # Número de amostras válidas
+
+    def __len__(self):
+        return self._tamanho
+
+    def append(self, tempo, valor):
+        """!
+        @brief Acrescenta uma amostra, descartando a mais antiga se estiver cheio.
+        @param tempo (float): Timestamp da amostra (segundos desde a epoch).
+        @param valor (float): O valor lido.
+        """
+        i = self._pos
+        self._tempos[i] = self._tempos[i + self.capacidade] = tempo
+        self._valores[i] = self._valores[i + self.capacidade] = valor
+        self._pos = (i + 1) % self.capacidade
+        if self._tamanho < self.capacidade:
+            self._tamanho += 1
+
+    def extend(self, tempos, valores):
+        """!
+        @brief Acrescenta várias amostras de uma vez (escrita vetorizada).
+        @param tempos (array-like): Timestamps das amostras, em ordem de chegada.
+        @param valores (array-like): Valores das amostras, alinhados com `tempos`.
+        """
+        tempos = np.asarray(tempos, dtype=np.float64)
+        valores = np.asarray(valores, dtype=np.float64)
+        n = len(valores)
+        if n == 0:
+            return
+        if n > self.capacidade:
+            # Só as últimas `capacidade` amostras sobrevivem
+            tempos = tempos[-self.capacidade:]
+            valores = valores[-self.capacidade:]
+            self._pos = (self._pos + n - self.capacidade) % self.capacidade
+            n = self.capacidade
+
+        # Escreve em até dois troços contíguos (antes e depois da volta)
+        primeiro = min(n, self.capacidade - self._pos)
+        for inicio, origem in ((self._pos, slice(0, primeiro)), (0, slice(primeiro, n))):
+            tamanho = origem.stop - origem.start
+            if tamanho == 0:
+                continue
+            fim = inicio + tamanho
+            self._tempos[inicio:fim] = self._tempos[inicio + self.capacidade:fim + self.capacidade] = tempos[origem]
+            self._valores[inicio:fim] = self._valores[inicio + self.capacidade:fim + self.capacidade] = valores[origem]
+
+        self._pos = (self._pos + n) % self.capacidade
+        self._tamanho = min(self._tamanho + n, self.capacidade)
+
+    def _view(self, dados):
+        inicio = (self._pos - self._tamanho) % self.capacidade
+        view = dados[inicio:inicio + self._tamanho]
+        view.flags.writeable = False
+        return view
+
+    def tempos(self):
+        """!
+        @brief Timestamps das amostras válidas, da mais antiga para a mais recente.
+        @return (numpy.ndarray): View contígua (sem cópia) do armazenamento interno.
+        """
+        return self._view(self._tempos)
+
+    def valores(self):
+        """!
+        @brief Valores das amostras válidas, da mais antiga para a mais recente.
+        @return (numpy.ndarray): View contígua (sem cópia) do armazenamento interno.
+        """
+        return self._view(self._valores)
+
+    def desde(self, tempo_inicio):
+        """!
+        @brief Amostras com timestamp >= `tempo_inicio` (janela temporal).
+        @details Usa busca binária sobre os timestamps, que se assumem em ordem
+                 não decrescente. Devolve views, sem cópia.
+        @param tempo_inicio (float): Início da janela (segundos desde a epoch).
+        @return (tuple): O par (tempos, valores) de views contíguas.
+        """
+        tempos = self.tempos()
+        inicio = np.searchsorted(tempos, tempo_inicio, side='left')
+        return tempos[inicio:], self.valores()[inicio:]
+
+    def ultimo(self):
+        """!
+        @brief A amostra mais recente.
+        @return (tuple | None): O par (tempo, valor), ou None se estiver vazio.
+        """
+        if self._tamanho == 0:
+            return None
+        i = (self._pos - 1) % self.capacidade
+        return (float(self._tempos[i]), float(self._valores[i]))
+
+    def amostra(self, indice):
+        """!
+        @brief Acesso direto (O(1)) a uma amostra, sem criar views.
+        @param indice (int): Posição a partir da mais antiga (0) ou, se negativo,
+                             a partir da mais recente (-1).
+        @return (tuple): O par (tempo, valor).
+        @exception IndexError Se o índice estiver fora do intervalo.
+        """
+        if indice < 0:
+            indice += self._tamanho
+        if not 0 <= indice < self._tamanho:
+            raise IndexError("índice fora do ring buffer")
+        i = (self._pos - self._tamanho + indice) % self.capacidade
+        return (float(self._tempos[i]), float(self._valores[i]))
+
+    def descartar_antigas(self, n):
+        """!
+        @brief Descarta as `n` amostras mais antigas (sem mover dados).
+        @param n (int): Número de amostras a descartar.
+        """
+        self._tamanho -= max(0, min(n, self._tamanho))
+
+    def limpar(self):
+        """!
+        @brief Descarta todas as amostras (sem realocar).
+        """
+        self._pos = 0
+        self._tamanho = 0
+
+    def redimensionar(self, capacidade):
+        """!
+        @brief Realoca o buffer com outra capacidade, mantendo as amostras mais recentes.
+        @details As views devolvidas antes da chamada continuam a apontar para os
+                 arrays antigos.
+        @param capacidade (int): A nova capacidade (mínimo 1).
+        """
+        capacidade = max(1, int(capacidade))
+        if capacidade == self.capacidade:
+            return
+        tempos = self.tempos().copy()
+        valores = self.valores().copy()
+        self.__init__(capacidade)
+        self.extend(tempos, valores)
+
+    def memoria(self):
+        """!
+        @brief Memória ocupada pelo buffer (os dois arrays espelhados).
+        @return (int): Bytes alocados.
+        """
+        return self._tempos.nbytes + self._valores.nbytes
@@ -0,0 +1,187 @@
+"""!
+@file sensor_registry.py
+@brief Registo dos sensores conhecidos e dos seus buffers de dados.
+@details Cada placa (STM32) é identificada pelo par (group, sensor_id).
+         O SensorRegistry encaminha cada pacote para o SensorBuffer
+         correspondente, criando-o apenas na primeira vez que o sensor aparece,
+         para que o gráfico e a tabela de um sensor nunca misturem dados de outro.
+
+         O registo também aplica o orçamento de memória (`[Historico] MEMORIA_MB`):
+         tirada a memória reservada (ex: a tabela de leituras da interface), o
+         orçamento é dividido pelos sensores. A parte de cada sensor cobre o seu
+         histórico e a memória extra que o processamento lhe dedica (amostras
+         das estatísticas móveis, cache do decimador, ver reajustar()); quando
+         aparece um sensor novo ou a memória extra cresce, os históricos acima
+         da sua parte são encolhidos (ver HistoricoNiveis.limitar()). Abaixo do
+         mínimo de cada histórico (HistoricoNiveis.minimo()) o orçamento não
+         pode ser cumprido: é mostrado um aviso e a memória fica acima dele.
+"""
+
+import threading
+
+from src.historico_niveis import HistoricoNiveis
+
+# Ao exceder a sua parte do orçamento, um histórico encolhe para esta fração dela
+# (folga para não realocar todos os históricos a cada sensor novo)
+FOLGA_ORCAMENTO = 0.75
+
+
+class SensorBuffer:
+    """!
+    @brief Buffers de tamanho fixo e último estado conhecido de um único sensor.
+    """
+
+    def __init__(self, group, sensor_id, indice, historico):
+        """!
+        @brief Construtor do SensorBuffer.
+        @param group (str): O grupo do sensor (campo 'group' do pacote).
+        @param sensor_id (str): O identificador do sensor (campo 'sensor_id').
+        @param indice (int): Posição do sensor no registo (ordem de chegada).
+        @param historico (HistoricoNiveis): O histórico (já alocado) do sensor.
+        """
+        self.group = group
+        self.sensor_id = sensor_id
+        self.indice = indice
+        # Histórico (timestamp epoch, valor) usado pelo gráfico e pela tabela:
+        # amostras brutas recentes e níveis agregados mais antigos
+        self.historico = historico
+        self.unidade = ''
+        self.ultimo_valor = None
+        self.ultimo_tempo = None
+        self.em_alerta = False
+        # Estatísticas móveis (um ResumoJanela por janela) e alerta de declive
+        self.estatisticas = ()
+        # Bytes usados pelo processamento para este sensor fora do histórico
+        self.memoria_extra = 0
+        self.alerta_declive = False
+        self.total_amostras = 0
+
+    @property
+    def chave(self):
+        """!
+        @brief A chave do sensor no registo.
+        @return (tuple): O par (group, sensor_id).
+        """
+        return (self.group, self.sensor_id)
+
+    @property
+    def nome(self):
+        """!
+        @brief Nome legível do sensor, usado no seletor e na visão geral.
+        @return (str): "group / sensor_id".
+        """
+        return f"{self.group} / {self.sensor_id}"
+
+
+class SensorRegistry:
+    """!
+    @brief Dicionário (group, sensor_id) -> SensorBuffer.
+    @details Os buffers são criados sob demanda e nunca por pacote; a ordem de
+             criação é preservada (ver SensorBuffer.indice), o que permite à UI
+             manter uma linha/curva estável por sensor. Quem lê ou escreve os
+             buffers a partir de threads diferentes deve usar `lock`.
+    """
+
+    def __init__(self, tamanho_historico, janela_segundos=0.0, larguras=(), memoria_maxima=0,
+                 tamanho_minimo=1, memoria_reservada=0):
+        """!
+        @brief Construtor do SensorRegistry.
+        @param tamanho_historico (int): Amostras brutas no histórico de cada sensor.
+        @param janela_segundos (float): A janela do histórico (coberta pelos níveis agregados).
+        @param larguras (tuple): As larguras (s) dos níveis agregados (vazio = só amostras brutas).
+        @param memoria_maxima (int): Bytes para todos os sensores (0 = sem limite).
+        @param tamanho_minimo (int): Amostras brutas mantidas por sensor mesmo sem memória.
+        @param memoria_reservada (int): Bytes do orçamento usados fora dos sensores.
+        """
+        self.tamanho_historico = tamanho_historico
+        self.janela_segundos = janela_segundos
+        self.larguras = tuple(larguras)
+        self.memoria_maxima = memoria_maxima
+        self.memoria_reservada = memoria_reservada
+        self.tamanho_minimo = tamanho_minimo
+        self.sensores = {}
+        self.lock = threading.Lock()
+        # Bytes alocados por todos os históricos e no total (lidos pelas métricas sem o lock)
+        self.memoria_historicos = 0
+        self.memoria_total = memoria_reservada
+        self._avisado = False
+
+    @staticmethod
+    def chave_do_pacote(data_dict):
+        """!
+        @brief Extrai a chave de roteamento de um pacote recebido.
+        @param data_dict (dict): O dicionário de dados do sensor.
+        @return (tuple): O par (group, sensor_id), com 'N/A' para campos ausentes.
+        """
+        return (str(data_dict.get('group', 'N/A')), str(data_dict.get('sensor_id', 'N/A')))
+
+    def obter(self, chave):
+        """!
+        @brief Devolve o buffer de um sensor, criando-o se for a primeira vez.
+        @param chave (tuple): O par (group, sensor_id).
+        @return (SensorBuffer): O buffer do sensor.
+        """
+        buffer = self.sensores.get(chave)
+        if buffer is None:
+            parte = self._parte(len(self.sensores) + 1)
+            historico = HistoricoNiveis(self.janela_segundos, self.tamanho_historico, self.larguras,
+                                        parte, self.tamanho_minimo)
+            buffer = SensorBuffer(chave[0], chave[1], len(self.sensores), historico)
+            self.sensores[chave] = buffer
+            self._aplicar_orcamento(parte)
+        return buffer
+
+    def _parte(self, n_sensores):
+        # Bytes de cada sensor (histórico + extra)
+        return max(0, self.memoria_maxima - self.memoria_reservada) // max(1, n_sensores)
+
+    def _limitar(self, buffer, parte):
+        # Encolhe o histórico se o sensor passou da sua parte do orçamento
+        historico = buffer.historico
+        if historico.memoria() + buffer.memoria_extra <= parte:
+            return
+        historico.limitar(max(1, int(parte * FOLGA_ORCAMENTO) - buffer.memoria_extra))
+        if not self._avisado and historico.minimo() + buffer.memoria_extra > parte:
+            self._avisado = True
+            print(f"Aviso: MEMORIA_MB não chega para {len(self.sensores)} sensores: cada um "
+                  f"precisa de pelo menos {historico.minimo() + buffer.memoria_extra} bytes "
+                  f"(histórico mínimo e estatísticas) e a parte é de {parte} bytes.")
+
+    def _aplicar_orcamento(self, parte):
+        if self.memoria_maxima > 0:
+            for buffer in self.sensores.values():
+                self._limitar(buffer, parte)
+        self.memoria_historicos = sum(buffer.historico.memoria() for buffer in self.sensores.values())
+        self.memoria_total = (self.memoria_reservada + self.memoria_historicos
+                              + sum(buffer.memoria_extra for buffer in self.sensores.values()))
+
+    def reajustar(self, buffer, memoria_extra):
+        """!
+        @brief Atualiza a memória extra de um sensor e, se preciso, encolhe o seu histórico.
+        @details Chamado (com o lock) pela thread de processamento quando a memória
+                 que dedica ao sensor muda. O(1): só este sensor é ajustado.
+        @param buffer (SensorBuffer): O sensor.
+        @param memoria_extra (int): Os bytes usados fora do histórico.
+        """
+        antes = buffer.historico.memoria()
+        self.memoria_total += memoria_extra - buffer.memoria_extra
+        buffer.memoria_extra = memoria_extra
+        if self.memoria_maxima > 0:
+            self._limitar(buffer, self._parte(len(self.sensores)))
+        diferenca = buffer.historico.memoria() - antes
+        self.memoria_historicos += diferenca
+        self.memoria_total += diferenca
+
+    def get(self, chave):
+        """!
+        @brief Devolve o buffer de um sensor sem o criar.
+        @param chave (tuple): O par (group, sensor_id).
+        @return (SensorBuffer | None): O buffer, ou None se o sensor é desconhecido.
+        """
+        return self.sensores.get(chave)
+
+    def __len__(self):
+        return len(self.sensores)
+
+    def __iter__(self):
+        return iter(self.sensores.values())
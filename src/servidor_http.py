@@ -0,0 +1,74 @@
+"""!
+@file servidor_http.py
+@brief Peças comuns aos servidores HTTP locais (métricas e consultas).
+@details Cada servidor é um HTTPServer atendido numa QThread própria, um
+         pedido de cada vez com handle_request(). Os timeouts garantem que a
+         thread verifica 'running' com regularidade e que um cliente parado
+         (ou uma ligação meio aberta) nunca a bloqueia por muito tempo.
+"""
+
+import json
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Tempo máximo (s) que a thread espera por um pedido antes de verificar 'running'
+INTERVALO_ESPERA = 0.5
+# Tempo máximo (s) de cada leitura/escrita num cliente (um cliente parado não bloqueia a thread)
+TEMPO_MAXIMO_CLIENTE = 5
+
+
+class HandlerLocal(BaseHTTPRequestHandler):
+    """!
+    @brief Base dos handlers: timeout por cliente, sem log por pedido e respostas com Content-Length.
+    """
+
+    # Sem isto, um cliente que liga e não envia nada bloqueia handle_request() (e o stop())
+    timeout = TEMPO_MAXIMO_CLIENTE
+
+    def responder(self, estado, corpo, tipo):
+        """!
+        @brief Envia uma resposta completa.
+        @param estado (int): O código HTTP.
+        @param corpo (bytes): O corpo da resposta.
+        @param tipo (str): O Content-Type.
+        """
+        self.send_response(estado)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def responder_json(self, estado, dados):
+        """!
+        @brief Envia `dados` em JSON (UTF-8).
+        @param estado (int): O código HTTP.
+        @param dados (object): Estrutura aceite por json.dumps.
+        """
+        corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+        self.responder(estado, corpo, 'application/json; charset=utf-8')
+
+    def log_message(self, format, *args):
+        pass  # Sem uma linha no terminal por cada pedido (nem pelos clientes que expiram)
+
+
+def abrir_servidor(ip, porta, handler, descricao, titulo, caminho, **atributos):
+    """!
+    @brief Cria um servidor HTTP para ser atendido com handle_request() na thread que o chama.
+    @param ip (str): IP do servidor (use 127.0.0.1 para ficar só local).
+    @param porta (int): Porta do servidor.
+    @param handler (type): A subclasse de HandlerLocal que responde aos pedidos.
+    @param descricao (str): O serviço, para a mensagem de erro (ex: "o serviço de consultas").
+    @param titulo (str): O serviço, para a mensagem com o endereço (ex: "Consultas").
+    @param caminho (str): O caminho anunciado nessa mensagem (ex: "/sensores").
+    @param atributos: Atributos do servidor lidos pelo handler (self.server.<nome>).
+    @return (HTTPServer | None): O servidor, ou None se o bind falhar.
+    """
+    try:
+        servidor = HTTPServer((ip, porta), handler)
+    except OSError as e:
+        print(f"ERRO: Não foi possível abrir {descricao} em {ip}:{porta}. {e}")
+        return None
+    for nome, valor in atributos.items():
+        setattr(servidor, nome, valor)
+    servidor.timeout = INTERVALO_ESPERA
+    print(f"{titulo} em http://{ip}:{porta}{caminho}")
+    return servidor
@@ -0,0 +1,155 @@
+"""!
+@file timestamps.py
+@brief Conversão rápida entre o campo 'ts' (ISO 8601) e segundos desde a epoch.
+@details O timestamp de cada pacote é convertido uma única vez, no listener,
+         para um float (segundos desde a epoch, UTC) guardado em 'ts_epoch';
+         o gráfico, a tabela e o log usam só esse valor numérico.
+
+         O caminho rápido cobre o formato enviado pelas placas,
+         "AAAA-MM-DDTHH:MM:SS[.fff]Z": a parte até aos segundos é convertida
+         uma vez e guardada em cache, por isso pacotes do mesmo segundo custam
+         apenas um acesso a um dicionário. Outros formatos ISO passam por
+         datetime.fromisoformat().
+"""
+
+import calendar
+import time
+from datetime import datetime, timezone
+
+DEFAULT_TAMANHO_CACHE = 4096
+
+
+def _segundos_utc(prefixo):
+    # "AAAA-MM-DDTHH:MM:SS" -> segundos desde a epoch, ou None se algum campo
+    # estiver fora do intervalo (o timegm "normalizaria" ex: o dia 40 noutro instante)
+    campos = (prefixo[0:4], prefixo[5:7], prefixo[8:10], prefixo[11:13], prefixo[14:16], prefixo[17:19])
+    if not all(campo.isascii() and campo.isdigit() for campo in campos):
+        return None
+    ano, mes, dia, hora, minuto, segundo = map(int, campos)
+    if ano == 0 or not (1 <= mes <= 12 and 1 <= dia <= calendar.monthrange(ano, mes)[1]
+                        and hora < 24 and minuto < 60 and segundo < 60):
+        return None
+    return calendar.timegm((ano, mes, dia, hora, minuto, segundo, 0, 0, 0))
+
+
+class ConversorTimestamp:
+    """!
+    @brief Conversor ISO 8601 <-> epoch com cache por segundo.
+    """
+
+    def __init__(self, tamanho_cache=DEFAULT_TAMANHO_CACHE):
+        """!
+        @brief Construtor do ConversorTimestamp.
+        @param tamanho_cache (int): Número máximo de segundos distintos em cache
+                                    (a cache é esvaziada quando enche).
+        """
+        self.tamanho_cache = tamanho_cache
+        self._para_epoch = {}
+        self._para_iso = {}
+
+    def para_epoch(self, ts):
+        """!
+        @brief Converte um timestamp ISO 8601 para segundos desde a epoch.
+        @param ts (str | float): O timestamp (ex: "2025-11-09T21:38:26Z"); números
+                                 são devolvidos sem alteração (bool não é aceite).
+        @return (float | None): O timestamp em segundos, ou None se não for válido.
+                 Timestamps sem fuso horário são tratados como UTC.
+        """
+        if isinstance(ts, bool):
+            return None     # JSON true/false não é um timestamp
+        if isinstance(ts, (int, float)):
+            return float(ts)
+        if not isinstance(ts, str):
+            return None
+
+        # --- Caminho rápido: "AAAA-MM-DDTHH:MM:SSZ" ou "AAAA-MM-DDTHH:MM:SS.fffZ" ---
+        n = len(ts)
+        if (n == 20 or (n == 24 and ts[19] == '.')) and ts[-1] == 'Z' and ts[10] == 'T' \
+                and ts[4] == ts[7] == '-' and ts[13] == ts[16] == ':':
+            prefixo = ts[:19]
+            base = self._para_epoch.get(prefixo)
+            if base is None:
+                base = _segundos_utc(prefixo)
+                if base is None:
+                    return self._para_epoch_lento(ts)
+                if len(self._para_epoch) >= self.tamanho_cache:
+                    self._para_epoch.clear()
+                self._para_epoch[prefixo] = base
+            if n == 20:
+                return float(base)
+            if not (ts[20:23].isascii() and ts[20:23].isdigit()):
+                return self._para_epoch_lento(ts)
+            return base + int(ts[20:23]) / 1000.0
+
+        return self._para_epoch_lento(ts)
+
+    @staticmethod
+    def _para_epoch_lento(ts):
+        try:
+            dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+
+    def para_iso(self, tempo):
+        """!
+        @brief Formata segundos desde a epoch como ISO 8601 UTC.
+        @details Os milissegundos só aparecem quando não são zero, para que
+                 timestamps de segundo inteiro saiam iguais aos enviados pelas
+                 placas (ex: "2025-11-09T21:38:26Z").
+        @param tempo (float): O timestamp.
+        @return (str): Ex: "2025-11-09T21:38:26Z" ou "2025-11-09T21:38:26.250Z".
+        """
+        ms = int(round(tempo * 1000))
+        segundo, resto = divmod(ms, 1000)
+        prefixo = self._para_iso.get(segundo)
+        if prefixo is None:
+            prefixo = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(segundo))
+            if len(self._para_iso) >= self.tamanho_cache:
+                self._para_iso.clear()
+            self._para_iso[segundo] = prefixo
+        if resto:
+            return f"{prefixo}.{resto:03d}Z"
+        return prefixo + "Z"
+
+
+_conversor_padrao = ConversorTimestamp()
+
+
+def para_epoch(ts):
+    """!
+    @brief Atalho para ConversorTimestamp.para_epoch() com um conversor partilhado.
+    """
+    return _conversor_padrao.para_epoch(ts)
+
+
+def para_iso(tempo):
+    """!
+    @brief Atalho para ConversorTimestamp.para_iso() com um conversor partilhado.
+    """
+    return _conversor_padrao.para_iso(tempo)
+
+
+def normalizar_timestamp(data_dict, conversor=_conversor_padrao):
+    """!
+    @brief Garante que o pacote tem 'ts_epoch' (convertendo 'ts' se preciso).
+    @details Sem 'ts' válido, usa a hora de receção.
+    @param data_dict (dict): O pacote recebido (é alterado no lugar).
+    @param conversor (ConversorTimestamp): O conversor a usar (e a sua cache).
+    @return (dict): O próprio pacote.
+    """
+    if 'ts_epoch' not in data_dict:
+        tempo = conversor.para_epoch(data_dict.get('ts'))
+        data_dict['ts_epoch'] = time.time() if tempo is None else tempo
+    return data_dict
+
+
+def formatar_hora(tempo):
+    """!
+    @brief Formata um timestamp (segundos desde a epoch, UTC) como 'hh:mm:ss'.
+    @param tempo (float): O timestamp.
+    @return (str): A hora formatada.
+    """
+    return para_iso(tempo)[11:19]
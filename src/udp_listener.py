@@ -3,94 +3,314 @@
 @brief Implementa a thread de escuta (listener) UDP.
 @details Este módulo contém a classe UDPListener, que herda de QThread.
          Sua responsabilidade é escutar por pacotes UDP em uma thread separada
-         para não bloquear a interface gráfica principal. Ele usa um timeout
-         para permitir um encerramento limpo.
+         para não bloquear a interface gráfica principal. Uma única thread pode
+         escutar vários endpoints (IP:porta) ao mesmo tempo, via 'selectors';
+         um par de sockets interno acorda a thread imediatamente em stop().
+         Opcionalmente, reenvia os pacotes válidos para outros monitores
+         (src/relay.py) e junta-se a grupos multicast (para receber de um relay).
 """
 
+import selectors
 import socket
-import json
+import struct
+import sys
+import time
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from src.wire_format import decodificar_datagrama
+from src.timestamps import ConversorTimestamp, normalizar_timestamp
+from src.metrics import Histograma, LIMITES_MICROSSEGUNDOS, LIMITES_TAMANHO
+
+# Tamanho máximo de um datagrama UDP (um pacote pode trazer várias amostras)
+TAMANHO_MAXIMO_DATAGRAMA = 65535
+# Máximo de pacotes juntados num lote antes de emitir o sinal
+DEFAULT_MAXIMO_LOTE = 1000
+# Opção Linux que anexa a cada datagrama o total de pacotes descartados pelo kernel
+SO_RXQ_OVFL = getattr(socket, 'SO_RXQ_OVFL', 40)
+
+
+def parse_endpoints(texto):
+    """!
+    @brief Converte uma lista de endpoints em texto para tuplos (ip, porta).
+    @details Formato: "IP:PORTA" separados por vírgula, ex:
+             "0.0.0.0:5000, 0.0.0.0:5001, [::]:5002" (IPv6 entre parênteses retos).
+    @param texto (str): A lista de endpoints (ex: valor de ENDPOINTS no config.ini).
+    @return (list): Lista de tuplos (ip, porta).
+    @exception ValueError Se algum endpoint não estiver no formato esperado.
+    """
+    endpoints = []
+    for item in texto.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        ip, sep, porta = item.rpartition(':')
+        if not sep:
+            raise ValueError(f"Endpoint inválido (esperado IP:PORTA): {item}")
+        endpoints.append((ip.strip('[]'), int(porta)))
+    return endpoints
+
 class UDPListener(QThread):
     """!
     @brief Thread que escuta pacotes UDP e emite sinais com os dados.
     @details Esta classe é a principal trabalhadora de rede. Ela faz o 'bind'
-             a um IP e porta e entra em um loop, emitindo um sinal
-             'data_received' para cada pacote JSON válido que recebe.
+             a um ou mais pares IP/porta e espera (sem polling) que algum deles
+             tenha dados. A cada vez que acorda, esvazia todos os datagramas já
+             recebidos pelo kernel e emite-os de uma vez:
+             um sinal 'batch_received' com a lista de pacotes (modo lote) ou um
+             sinal 'data_received' por pacote válido. Cada datagrama pode ser
+             JSON ou binário (ver wire_format.py); o formato é detetado pelo
+             primeiro byte. O campo 'ts' de cada pacote é convertido aqui, uma
+             única vez, para 'ts_epoch' (segundos desde a epoch).
     """
     
     data_received = pyqtSignal(dict)
     """!
     @brief Sinal emitido quando um novo pacote de dados (dict) é recebido.
     @details A MainWindow (ou qualquer outra classe) pode se conectar a este sinal
-             para ser notificada quando novos dados chegarem.
+             para ser notificada quando novos dados chegarem. Só é emitido
+             quando o listener não está em modo lote.
     """
 
-    def __init__(self, ip, port, parent=None):
+    batch_received = pyqtSignal(list)
+    """!
+    @brief Sinal emitido (em modo lote) com a lista de pacotes (dicts) recebidos numa só vez.
+    @details Um único sinal entre threads por lote, em vez de um por datagrama.
+    """
+
+    def __init__(self, ip, port, parent=None, batch=True, rcvbuf=0,
+                 maximo_lote=DEFAULT_MAXIMO_LOTE, endpoints=None,
+                 sensores_binarios=None, relay=None, grupos_multicast=None):
         """!
         @brief Construtor da classe UDPListener.
         
         @param ip (str): O endereço IP para fazer o 'bind' (ex: '0.0.0.0').
         @param port (int): A porta UDP para escutar.
         @param parent (QObject): O objeto pai do Qt (opcional).
+        @param batch (bool): True para emitir 'batch_received' (lotes) em vez de 'data_received'.
+        @param rcvbuf (int): Tamanho pedido para o buffer de receção do socket
+                             (SO_RCVBUF, em bytes); 0 mantém o padrão do sistema.
+        @param maximo_lote (int): Número máximo de pacotes por lote emitido.
+        @param endpoints (list): Lista de tuplos (ip, porta) a escutar na mesma
+                                 thread. Se None, escuta só (ip, port).
+        @param sensores_binarios (dict): Mapa indice -> (group, sensor_id, unit)
+                                         dos pacotes binários.
+        @param relay (RelayUDP): Reenvia os pacotes válidos (usado só nesta thread;
+                                 fechado quando a thread termina). None = sem relay.
+        @param grupos_multicast (list): Grupos multicast IPv4 (ex: '239.0.0.50') a
+                                        que os sockets se juntam depois do bind.
         """
         super().__init__(parent)
         self.UDP_IP = ip
         self.UDP_PORT = port
+        self.endpoints = list(endpoints) if endpoints else [(ip, port)]
+        self.batch = batch
+        self.rcvbuf = rcvbuf
+        self.maximo_lote = maximo_lote
+        self.sensores_binarios = sensores_binarios or {}
+        self.relay = relay
+        self.grupos_multicast = list(grupos_multicast or [])
+        self.conversor_ts = ConversorTimestamp()
         self.running = True
+        # Escrever em _despertar_w acorda o select() de run() (usado por stop())
+        self._despertar_r, self._despertar_w = socket.socketpair()
+        self._despertar_r.setblocking(False)
 
-    def run(self):
+        # --- Contadores (lidos pela UI) ---
+        self.pacotes_recebidos = 0
+        self.pacotes_malformados = 0
+        # Só disponível em Linux (SO_RXQ_OVFL); fica a 0 nos outros sistemas
+        self.pacotes_descartados_kernel = 0
+        # Contador acumulado de descartes de cada socket (fileno -> total)
+        self._descartes_por_socket = {}
+        self.erros = 0
+        self.ultimo_erro = None
+
+        # --- Métricas (ver src/metrics.py) ---
+        # Tempo médio por datagrama e número de datagramas de cada rajada lida
+        self.tempo_parse = Histograma(LIMITES_MICROSSEGUNDOS)
+        self.tamanho_rajada = Histograma(LIMITES_TAMANHO)
+
+    def configurar_socket(self, sock):
         """!
-        @brief O "coração" da thread, executado quando .start() é chamado.
-        @details Configura o socket, entra no loop 'while self.running', e escuta por pacotes.
-                 O 'sock.settimeout(1.0)' é crucial para permitir que a thread feche
-                 de forma limpa, pois o loop verifica 'self.running' a cada segundo,
-                 mesmo se não houver dados (graças ao 'except socket.timeout').
+        @brief Ajusta o buffer de receção e ativa a contagem de descartes do kernel.
+        @param sock (socket.socket): O socket UDP (antes do bind).
+        @return (bool): True se os descartes do kernel podem ser lidos via recvmsg.
         """
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        
-        # --- [A CORREÇÃO ESTÁ AQUI] ---
-        # Define um timeout de 1.0 segundo
-        sock.settimeout(1.0)
-        # -------------------------------
+        if self.rcvbuf:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+            except OSError as e:
+                print(f"Aviso: não foi possível definir SO_RCVBUF={self.rcvbuf}. {e}")
+            efetivo = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            print(f"Buffer de receção UDP: {efetivo} bytes")
+
+        if sys.platform.startswith('linux') and hasattr(sock, 'recvmsg'):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+                return True
+            except OSError:
+                pass
+        return False
+
+    def receber(self, sock, conta_descartes):
+        """!
+        @brief Lê um datagrama do socket (atualizando a contagem de descartes, se disponível).
+        @param sock (socket.socket): O socket UDP.
+        @param conta_descartes (bool): True para usar recvmsg com SO_RXQ_OVFL.
+        @return (bytes): O conteúdo do datagrama.
+        """
+        if not conta_descartes:
+            data, addr = sock.recvfrom(TAMANHO_MAXIMO_DATAGRAMA)
+            return data
+        data, ancdata, flags, addr = sock.recvmsg(TAMANHO_MAXIMO_DATAGRAMA, socket.CMSG_SPACE(4))
+        for nivel, tipo, dados in ancdata:
+            if nivel == socket.SOL_SOCKET and tipo == SO_RXQ_OVFL and len(dados) >= 4:
+                # Contador acumulado desde a criação do socket
+                self._descartes_por_socket[sock.fileno()] = struct.unpack('I', dados[:4])[0]
+                self.pacotes_descartados_kernel = sum(self._descartes_por_socket.values())
+        return data
+
+    def processar_datagrama(self, data, lote):
+        """!
+        @brief Converte um datagrama (JSON ou binário) em dicionários e acrescenta-os ao lote.
+        @param data (bytes): O conteúdo do datagrama (ex: b'{...}').
+        @param lote (list): A lista onde os pacotes são acrescentados.
+        """
+        self.pacotes_recebidos += 1
+        try:
+            pacotes = decodificar_datagrama(data, self.sensores_binarios)
+        except (UnicodeDecodeError, ValueError):
+            self.pacotes_malformados += 1
+            return
+        for data_dict in pacotes:
+            normalizar_timestamp(data_dict, self.conversor_ts)
+        if self.relay is not None:
+            self.relay.reenviar(data, pacotes)
+        lote.extend(pacotes)
 
+    def abrir_socket(self, ip, port):
+        """!
+        @brief Cria, configura e faz o 'bind' de um socket não bloqueante.
+        @param ip (str): O endereço IP (IPv4 ou IPv6).
+        @param port (int): A porta UDP.
+        @return (tuple): O par (socket, conta_descartes), ou None se o bind falhar.
+        """
+        familia = socket.AF_INET6 if ':' in ip else socket.AF_INET
+        sock = socket.socket(familia, socket.SOCK_DGRAM)
+        conta_descartes = self.configurar_socket(sock)
+        if self.grupos_multicast:
+            # Vários monitores na mesma máquina podem escutar o mesmo grupo/porta
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         try:
-            sock.bind((self.UDP_IP, self.UDP_PORT))
-            print(f"A escutar em {self.UDP_IP}:{self.UDP_PORT}")
+            sock.bind((ip, port))
         except Exception as e:
-            print(f"ERRO: Não foi possível fazer o bind em {self.UDP_IP}:{self.UDP_PORT}. {e}")
+            print(f"ERRO: Não foi possível fazer o bind em {ip}:{port}. {e}")
+            sock.close()
+            return None
+        if familia == socket.AF_INET:
+            self.juntar_grupos(sock, ip)
+        sock.setblocking(False)
+        print(f"A escutar em {ip}:{port}")
+        return sock, conta_descartes
+
+    def juntar_grupos(self, sock, ip):
+        """!
+        @brief Junta um socket IPv4 aos grupos multicast configurados.
+        @param sock (socket.socket): O socket (já com o bind feito).
+        @param ip (str): O IP do bind; a interface usada (0.0.0.0 = a escolhida pelo sistema).
+        """
+        for grupo in self.grupos_multicast:
+            try:
+                pedido = struct.pack('4s4s', socket.inet_aton(grupo), socket.inet_aton(ip))
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, pedido)
+                print(f"No grupo multicast {grupo} ({ip})")
+            except OSError as e:
+                print(f"Aviso: não foi possível entrar no grupo multicast {grupo}. {e}")
+
+    def run(self):
+        """!
+        @brief O "coração" da thread, executado quando .start() é chamado.
+        @details Abre um socket por endpoint e regista-os num seletor junto com
+                 o socket de despertar. O select() bloqueia sem timeout até algum
+                 socket ter dados (ou stop() ser chamado); cada socket pronto é
+                 então esvaziado e os pacotes são emitidos em lotes de até
+                 'maximo_lote'. Com relay, o select() acorda também no prazo
+                 de envio das amostras pendentes.
+        """
+        seletor = selectors.DefaultSelector()
+        sockets = []
+        for ip, port in self.endpoints:
+            aberto = self.abrir_socket(ip, port)
+            if aberto is not None:
+                sockets.append(aberto[0])
+                seletor.register(aberto[0], selectors.EVENT_READ, aberto[1])
+        if not sockets:
+            seletor.close()
+            if self.relay is not None:
+                self.relay.fechar()
             return # Termina a thread se não conseguir escutar
+        seletor.register(self._despertar_r, selectors.EVENT_READ, None)
 
         while self.running:
-            try:
-                # Espera (bloqueia) por até 1.0 segundo
-                data, addr = sock.recvfrom(1024) 
-                
-                # Converte os bytes recebidos (ex: b'{...}') para string
-                json_string = data.decode('utf-8')
-                
-                # Converte a string JSON num dicionário Python
-                data_dict = json.loads(json_string)
-                
-                # Emite o sinal com os dados (o dicionário)
-                self.data_received.emit(data_dict)
-            
-            except socket.timeout:
-                # Se der timeout (1s se passou sem dados),
-                # o loop continua. Isso permite que o 'self.running'
-                # seja verificado novamente, permitindo um fecho limpo.
-                pass 
-            except Exception as e:
-                # Ignora outros erros menores de JSON ou rede
-                print(f"Erro ao processar pacote: {e}")
-        
-        sock.close()
+            lote = []
+            espera = self.relay.espera() if self.relay is not None else None
+            for key, _ in seletor.select(espera):
+                if key.fileobj is self._despertar_r:
+                    continue # stop() foi chamado; o while verifica 'self.running'
+                inicio = time.perf_counter()
+                recebidos = self.pacotes_recebidos
+                try:
+                    # Esvazia o que já estiver no buffer do kernel, sem bloquear
+                    while True:
+                        self.processar_datagrama(self.receber(key.fileobj, key.data), lote)
+                        if len(lote) >= self.maximo_lote:
+                            self.emitir(lote)
+                            lote = []
+                except BlockingIOError:
+                    pass # Buffer vazio
+                except Exception as e:
+                    # Ignora outros erros de rede (mas conta-os, para as métricas)
+                    self.erros += 1
+                    self.ultimo_erro = str(e)
+                    print(f"Erro ao processar pacote: {e}")
+                n = self.pacotes_recebidos - recebidos
+                if n:
+                    self.tamanho_rajada.observar(n)
+                    self.tempo_parse.observar((time.perf_counter() - inicio) * 1e6 / n)
+            self.emitir(lote)
+            if self.relay is not None:
+                self.relay.enviar_vencidos()
+
+        seletor.close()
+        if self.relay is not None:
+            self.relay.fechar()
+        for sock in sockets:
+            sock.close()
+        self._despertar_r.close()
+        self._despertar_w.close()
         print("Thread UDP terminada.")
 
+    def emitir(self, lote):
+        """!
+        @brief Emite os pacotes recebidos (um lote, ou um dicionário por pacote).
+        @param lote (list): Os pacotes (dicts) a emitir; nada é emitido se vazio.
+        """
+        if not lote:
+            return
+        if self.batch:
+            self.batch_received.emit(lote)
+        else:
+            for data_dict in lote:
+                self.data_received.emit(data_dict)
+
     def stop(self):
         """!
         @brief Pára a thread de forma limpa.
-        @details Define a flag 'self.running' como False, o que faz com que
-                 o loop em run() termine na próxima iteração (após o timeout).
+        @details Define a flag 'self.running' como False e acorda o select()
+                 de run() imediatamente, pelo socket de despertar.
         """
-        self.running = False
\ No newline at end of file
+        self.running = False
+        try:
+            self._despertar_w.send(b'\0')
+        except OSError:
+            pass # A thread já terminou e fechou o socket
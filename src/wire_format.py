@@ -0,0 +1,121 @@
+"""!
+@file wire_format.py
+@brief Formatos dos pacotes UDP: JSON (original) e binário compacto.
+@details O formato binário evita as chaves repetidas e o timestamp ISO do JSON.
+         Um datagrama binário começa pelo byte MAGIC_BINARIO (que nunca inicia
+         um JSON em UTF-8) e pode trazer várias amostras:
+
+         - cabeçalho: struct FORMATO_CABECALHO = magic (uint8), versão (uint8),
+           número de amostras (uint16);
+         - cada amostra: struct FORMATO_AMOSTRA = índice do sensor (uint16),
+           valor (float32), timestamp em milissegundos desde a epoch (uint64).
+
+         Tudo em little-endian. O índice do sensor é traduzido para
+         (group, sensor_id, unit) pela secção [SensoresBinarios] do config.ini.
+
+         Um datagrama JSON pode trazer um objeto (um pacote, como as placas
+         enviam) ou uma lista de objetos (várias amostras, como o relay envia).
+"""
+
+import json
+import struct
+
+MAGIC_BINARIO = 0xA5
+VERSAO_BINARIO = 1
+FORMATO_CABECALHO = '<BBH'
+FORMATO_AMOSTRA = '<HfQ'
+TAMANHO_CABECALHO = struct.calcsize(FORMATO_CABECALHO)
+TAMANHO_AMOSTRA = struct.calcsize(FORMATO_AMOSTRA)
+# Máximo de amostras que cabem num datagrama UDP
+MAXIMO_AMOSTRAS_DATAGRAMA = (65507 - TAMANHO_CABECALHO) // TAMANHO_AMOSTRA
+
+_estrutura_amostra = struct.Struct(FORMATO_AMOSTRA)
+
+
+def parse_sensores_binarios(secao):
+    """!
+    @brief Lê o mapa índice -> sensor da secção [SensoresBinarios] do config.ini.
+    @details Cada entrada tem o formato "indice = group, sensor_id, unit", ex:
+             "1 = grupo6, SensorDeTemperatura, °C" (a unidade é opcional).
+    @param secao (configparser.SectionProxy | dict): A secção (ou {} se não existir).
+    @return (dict): indice (int) -> (group, sensor_id, unit).
+    """
+    mapa = {}
+    for indice, valor in secao.items():
+        campos = [c.strip() for c in valor.split(',')]
+        if len(campos) < 2:
+            raise ValueError(f"[SensoresBinarios] {indice}: esperado 'group, sensor_id[, unit]'")
+        mapa[int(indice)] = (campos[0], campos[1], campos[2] if len(campos) > 2 else '')
+    return mapa
+
+
+def decodificar_datagrama(data, sensores_binarios):
+    """!
+    @brief Converte um datagrama (JSON ou binário) numa lista de pacotes.
+    @details O formato é detetado pelo primeiro byte. Pacotes binários são
+             devolvidos já com o timestamp numérico em 'ts_epoch' (segundos).
+    @param data (bytes): O conteúdo do datagrama.
+    @param sensores_binarios (dict): indice -> (group, sensor_id, unit).
+    @return (list): Os pacotes (dicts com 'group', 'sensor_id', 'value', 'unit' e 'ts' ou 'ts_epoch').
+    @exception ValueError Se o datagrama estiver malformado.
+    """
+    if data[:1] == bytes((MAGIC_BINARIO,)):
+        return decodificar_binario(data, sensores_binarios)
+    # Converte os bytes para string e a string JSON num dicionário Python
+    data_dict = json.loads(data.decode('utf-8'))
+    if isinstance(data_dict, list):
+        if not all(isinstance(item, dict) for item in data_dict):
+            raise ValueError("A lista JSON recebida não contém só objetos")
+        return data_dict
+    if not isinstance(data_dict, dict):
+        raise ValueError("O JSON recebido não é um objeto")
+    return [data_dict]
+
+
+def decodificar_binario(data, sensores_binarios):
+    """!
+    @brief Descodifica um datagrama no formato binário.
+    @param data (bytes): O conteúdo do datagrama (começa por MAGIC_BINARIO).
+    @param sensores_binarios (dict): indice -> (group, sensor_id, unit). Índices
+                                     desconhecidos viram ('bin', '<indice>', '').
+    @return (list): Um dicionário por amostra.
+    @exception ValueError Se o magic, a versão ou o tamanho não baterem com o cabeçalho.
+    """
+    if len(data) < TAMANHO_CABECALHO:
+        raise ValueError("Datagrama binário menor que o cabeçalho")
+    magic, versao, n = struct.unpack_from(FORMATO_CABECALHO, data, 0)
+    if magic != MAGIC_BINARIO:
+        raise ValueError(f"Magic de pacote binário inválido: {magic:#04x}")
+    if versao != VERSAO_BINARIO:
+        raise ValueError(f"Versão de pacote binário não suportada: {versao}")
+    if len(data) != TAMANHO_CABECALHO + n * TAMANHO_AMOSTRA:
+        raise ValueError(f"Datagrama binário com {len(data)} bytes para {n} amostras")
+
+    pacotes = []
+    for indice, valor, ms in _estrutura_amostra.iter_unpack(data[TAMANHO_CABECALHO:]):
+        sensor = sensores_binarios.get(indice)
+        if sensor is None:
+            sensor = ('bin', str(indice), '')
+        pacotes.append({
+            'group': sensor[0],
+            'sensor_id': sensor[1],
+            'value': valor,
+            'unit': sensor[2],
+            'ts_epoch': ms / 1000.0,
+        })
+    return pacotes
+
+
+def codificar_binario(amostras):
+    """!
+    @brief Codifica amostras num datagrama binário (usado por emissores/simuladores).
+    @param amostras (list): Tuplos (indice_sensor, valor, ts_epoch_segundos);
+                            no máximo MAXIMO_AMOSTRAS_DATAGRAMA.
+    @return (bytes): O datagrama.
+    """
+    if len(amostras) > MAXIMO_AMOSTRAS_DATAGRAMA:
+        raise ValueError(f"Máximo de {MAXIMO_AMOSTRAS_DATAGRAMA} amostras por datagrama")
+    partes = [struct.pack(FORMATO_CABECALHO, MAGIC_BINARIO, VERSAO_BINARIO, len(amostras))]
+    for indice, valor, ts_epoch in amostras:
+        partes.append(_estrutura_amostra.pack(indice, valor, int(round(ts_epoch * 1000))))
+    return b''.join(partes)
@@ -0,0 +1,197 @@
+"""!
+@file test_sender.py
+@brief Gerador de carga UDP para testar o monitor sem o STM32.
+@details Sem argumentos, envia um único pacote JSON do "Sensor_Simulado_01"
+         para 127.0.0.1:5000 (o comportamento do script de teste original).
+         Com argumentos, simula vários sensores a uma taxa configurável, em
+         JSON ou no formato binário (ver src/wire_format.py), com envio
+         contínuo ou em rajadas:
+
+             python test_sender.py --taxa 5000 --sensores 50 --duracao 10
+             python test_sender.py --formato binario --por-datagrama 100 --taxa 100000
+             python test_sender.py --rajada 500 --taxa 2000
+
+         O campo 'ts' leva a hora de envio (com milissegundos), o que permite
+         ao benchmark.py medir a latência ponta-a-ponta.
+"""
+
+import argparse
+import json
+import math
+import socket
+import time
+
+from src.timestamps import ConversorTimestamp
+from src.wire_format import codificar_binario, MAXIMO_AMOSTRAS_DATAGRAMA
+
+DEFAULT_IP = "127.0.0.1"
+DEFAULT_PORTA = 5000
+DEFAULT_GRUPO = "grupo6"
+DEFAULT_SENSOR = "Sensor_Simulado_01"
+FORMATO_JSON = 'json'
+FORMATO_BINARIO = 'binario'
+
+
+class GeradorCarga:
+    """!
+    @brief Envia amostras simuladas de N sensores a uma taxa fixa.
+    @details A taxa é em amostras por segundo (somando todos os sensores). Em
+             modo rajada, `rajada` datagramas são enviados seguidos e depois o
+             gerador espera o tempo correspondente, mantendo a taxa média.
+    """
+
+    def __init__(self, ip=DEFAULT_IP, porta=DEFAULT_PORTA, taxa=1000.0, n_sensores=1,
+                 formato=FORMATO_JSON, rajada=1, por_datagrama=1, grupo=DEFAULT_GRUPO):
+        """!
+        @brief Construtor do GeradorCarga.
+        @param ip (str): O IP de destino.
+        @param porta (int): A porta de destino.
+        @param taxa (float): Amostras por segundo (0 = o mais depressa possível).
+        @param n_sensores (int): Número de sensores simulados (as amostras alternam entre eles).
+        @param formato (str): FORMATO_JSON ou FORMATO_BINARIO.
+        @param rajada (int): Datagramas enviados seguidos antes de cada pausa.
+        @param por_datagrama (int): Amostras por datagrama (só no formato binário).
+        @param grupo (str): O campo 'group' dos pacotes JSON.
+        """
+        if formato not in (FORMATO_JSON, FORMATO_BINARIO):
+            raise ValueError(f"Formato desconhecido: {formato}")
+        if formato == FORMATO_JSON and por_datagrama != 1:
+            raise ValueError("O formato JSON leva uma amostra por datagrama")
+        if not 1 <= por_datagrama <= MAXIMO_AMOSTRAS_DATAGRAMA:
+            raise ValueError(f"Amostras por datagrama: entre 1 e {MAXIMO_AMOSTRAS_DATAGRAMA}")
+        self.destino = (ip, porta)
+        self.taxa = taxa
+        self.n_sensores = max(1, n_sensores)
+        self.formato = formato
+        self.rajada = max(1, rajada)
+        self.por_datagrama = por_datagrama
+        self.grupo = grupo
+        self.sock = socket.socket(
+            socket.AF_INET6 if ':' in ip else socket.AF_INET, socket.SOCK_DGRAM
+        )
+        self.conversor = ConversorTimestamp()
+
+        # --- Contadores ---
+        self.amostras_enviadas = 0
+        self.datagramas_enviados = 0
+        self.erros_envio = 0
+
+    def nome_sensor(self, i):
+        """!
+        @brief Nome do i-ésimo sensor simulado (o primeiro é "Sensor_Simulado_01").
+        @param i (int): O índice do sensor (a partir de 0).
+        @return (str): O sensor_id.
+        """
+        return f"Sensor_Simulado_{i + 1:02d}"
+
+    def valor(self, i, tempo):
+        """!
+        @brief Valor simulado: uma onda lenta (período de 60 s) de fase diferente por sensor.
+        @details Oscila entre 12 e 32 °C, por isso atravessa os limites de alerta padrão.
+        @param i (int): O índice do sensor.
+        @param tempo (float): A hora de envio (segundos desde a epoch).
+        @return (float): O valor da amostra.
+        """
+        return 22.0 + 10.0 * math.sin(2 * math.pi * tempo / 60.0 + i)
+
+    def datagrama(self):
+        """!
+        @brief Gera o próximo datagrama (com a hora atual em 'ts').
+        @return (bytes): O conteúdo do datagrama.
+        """
+        agora = time.time()
+        if self.formato == FORMATO_BINARIO:
+            amostras = []
+            for _ in range(self.por_datagrama):
+                i = self.amostras_enviadas % self.n_sensores
+                # Índices do [SensoresBinarios] começam em 1
+                amostras.append((i + 1, self.valor(i, agora), agora))
+                self.amostras_enviadas += 1
+            return codificar_binario(amostras)
+
+        i = self.amostras_enviadas % self.n_sensores
+        self.amostras_enviadas += 1
+        pacote = {
+            "group": self.grupo,
+            "sensor_id": self.nome_sensor(i),
+            "value": round(self.valor(i, agora), 3),
+            "unit": "°C",
+            "ts": self.conversor.para_iso(agora),
+        }
+        return json.dumps(pacote).encode('utf-8')
+
+    def enviar_um(self):
+        """!
+        @brief Envia um datagrama (erros de envio, ex: ENOBUFS, são só contados).
+        """
+        try:
+            self.sock.sendto(self.datagrama(), self.destino)
+            self.datagramas_enviados += 1
+        except OSError:
+            self.erros_envio += 1
+
+    def executar(self, duracao=None, total=None, parar=None):
+        """!
+        @brief Envia até passar `duracao` segundos, enviar `total` amostras ou `parar()` ser verdadeiro.
+        @param duracao (float): Duração máxima em segundos (None = sem limite).
+        @param total (int): Número máximo de amostras (None = sem limite).
+        @param parar (callable): Função sem argumentos; o envio pára quando devolve True.
+        """
+        inicio = time.perf_counter()
+        amostras_por_rajada = self.rajada * self.por_datagrama
+        proxima = inicio
+        while True:
+            if total is not None and self.amostras_enviadas >= total:
+                break
+            if duracao is not None and time.perf_counter() - inicio >= duracao:
+                break
+            if parar is not None and parar():
+                break
+            for _ in range(self.rajada):
+                if total is not None and self.amostras_enviadas >= total:
+                    break
+                self.enviar_um()
+            if self.taxa > 0:
+                # Agenda pela hora absoluta, para o erro de sleep() não se acumular
+                proxima += amostras_por_rajada / self.taxa
+                espera = proxima - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+
+    def close(self):
+        self.sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gerador de carga UDP para o monitor de sensores")
+    parser.add_argument('--ip', default=DEFAULT_IP)
+    parser.add_argument('--porta', type=int, default=DEFAULT_PORTA)
+    parser.add_argument('--taxa', type=float, default=1000.0,
+                        help="Amostras por segundo, somando todos os sensores (0 = máximo)")
+    parser.add_argument('--sensores', type=int, default=1, help="Número de sensores simulados")
+    parser.add_argument('--formato', choices=(FORMATO_JSON, FORMATO_BINARIO), default=FORMATO_JSON)
+    parser.add_argument('--por-datagrama', type=int, default=1,
+                        help="Amostras por datagrama (só no formato binário)")
+    parser.add_argument('--rajada', type=int, default=1,
+                        help="Datagramas enviados seguidos antes de cada pausa")
+    parser.add_argument('--duracao', type=float, default=None, help="Duração do envio em segundos")
+    parser.add_argument('--total', type=int, default=None, help="Número de amostras a enviar")
+    args = parser.parse_args()
+
+    # Sem duração nem total: um único pacote, como o script de teste original
+    total = args.total if args.total is not None or args.duracao is not None else args.por_datagrama
+
+    gerador = GeradorCarga(args.ip, args.porta, args.taxa, args.sensores, args.formato,
+                           args.rajada, args.por_datagrama)
+    inicio = time.perf_counter()
+    try:
+        gerador.executar(duracao=args.duracao, total=total)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gerador.close()
+    decorrido = time.perf_counter() - inicio
+    print(f"Enviadas {gerador.amostras_enviadas} amostras em {gerador.datagramas_enviados} "
+          f"datagramas para {args.ip}:{args.porta} em {decorrido:.2f} s "
+          f"({gerador.amostras_enviadas / max(decorrido, 1e-9):.0f} amostras/s, "
+          f"{gerador.erros_envio} erros de envio)")
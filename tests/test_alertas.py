@@ -0,0 +1,114 @@
+"""!
+@file test_alertas.py
+@brief Testes do motor de alertas (histerese, debounce, limite da histerese, limpar()).
+"""
+
+import numpy as np
+import pytest
+
+from src.alertas import MotorAlertas, MOTIVO_MAXIMO, MOTIVO_MINIMO, MOTIVO_DECLIVE
+from src.sensor_registry import SensorRegistry
+
+
+@pytest.fixture
+def registry():
+    return SensorRegistry(10)
+
+
+def _avaliar(motor, buffer, tempos, valores, declive=None):
+    return motor.avaliar(buffer, list(tempos), list(valores), declive)
+
+
+def test_ruido_a_volta_do_limite_nao_gera_eventos(registry):
+    buffer = registry.obter(('g', 's'))
+    motor = MotorAlertas(0.0, 10.0, histerese=0.5, atraso=1.0)
+    tempos = np.arange(0.0, 60.0, 0.1)
+    # Alterna acima e abaixo do máximo a cada amostra: nunca dura 1 s seguido
+    valores = np.where(np.arange(len(tempos)) % 2 == 0, 10.2, 9.8)
+    assert _avaliar(motor, buffer, tempos, valores) == []
+    assert not motor.estado(buffer.chave).ativo
+
+
+def test_ruido_dentro_da_histerese_nao_termina_o_alerta(registry):
+    buffer = registry.obter(('g', 's'))
+    motor = MotorAlertas(0.0, 10.0, histerese=0.5, atraso=1.0)
+    eventos = _avaliar(motor, buffer, np.arange(0.0, 2.0, 0.1), [11.0] * 20)
+    assert [(e.inicio, e.motivo) for e in eventos] == [(True, MOTIVO_MAXIMO)]
+    # Abaixo do máximo mas ainda acima de máximo - histerese: continua em alerta
+    tempos = np.arange(2.0, 30.0, 0.1)
+    valores = np.where(np.arange(len(tempos)) % 2 == 0, 9.9, 10.1)
+    assert _avaliar(motor, buffer, tempos, valores) == []
+    assert motor.estado(buffer.chave).ativo
+
+
+def test_debounce(registry):
+    buffer = registry.obter(('g', 's'))
+    motor = MotorAlertas(0.0, 10.0, histerese=0.5, atraso=1.0)
+    # Excursão de 0.9 s: não conta; a seguinte, a partir de t=2, confirma em t=3
+    tempos = [0.0, 0.5, 0.9, 1.0, 2.0, 2.5, 2.99, 3.0, 3.5]
+    valores = [-1.0, -1.0, -1.0, 5.0, -1.0, -2.0, -1.0, -1.0, -1.0]
+    eventos = _avaliar(motor, buffer, tempos, valores)
+    assert [(e.tempo, e.inicio, e.motivo, e.valor) for e in eventos] == [(3.0, True, MOTIVO_MINIMO, -1.0)]
+    # O fim também espera `atraso` segundos dentro da banda [0.5, 9.5]
+    eventos = _avaliar(motor, buffer, [4.0, 4.5, 4.8, 5.0, 6.0, 6.99, 7.0],
+                       [5.0, 5.0, 0.2, 5.0, 5.0, 5.0, 5.0])
+    assert [(e.tempo, e.inicio, e.motivo) for e in eventos] == [(6.0, False, MOTIVO_MINIMO)]
+    assert eventos[0].linha_log() == [6.0, 'g', 's', 'fim', MOTIVO_MINIMO, 5.0, buffer.unidade]
+
+
+def test_sem_atraso_transicao_imediata(registry):
+    buffer = registry.obter(('g', 's'))
+    motor = MotorAlertas(0.0, 10.0, histerese=1.0, atraso=0.0)
+    eventos = _avaliar(motor, buffer, [0.0, 1.0, 2.0, 3.0], [11.0, 9.5, 8.9, 12.0])
+    assert [(e.tempo, e.inicio) for e in eventos] == [(0.0, True), (2.0, False), (3.0, True)]
+
+
+def test_alerta_de_declive(registry):
+    buffer = registry.obter(('g', 's'))
+    motor = MotorAlertas(0.0, 10.0, atraso=0.0, limite_declive=6.0)
+    # 6 unidades/min = 0.1 unidades/s
+    assert _avaliar(motor, buffer, [0.0], [5.0], declive=0.05) == []
+    eventos = _avaliar(motor, buffer, [1.0], [5.0], declive=-0.2)
+    assert [(e.inicio, e.motivo) for e in eventos] == [(True, MOTIVO_DECLIVE)]
+    eventos = _avaliar(motor, buffer, [2.0], [5.0], declive=0.0)
+    assert [(e.inicio, e.motivo) for e in eventos] == [(False, MOTIVO_DECLIVE)]
+
+
+def test_histerese_limitada_ao_intervalo_entre_limites(registry, capsys):
+    motor = MotorAlertas(0.0, 100.0, histerese=5.0)
+    assert motor.histerese == 5.0 and capsys.readouterr().out == ''
+    # 5 > 0.25 * (10 - 0): reduzida para 2.5, com um aviso
+    motor.definir_limites(0.0, 10.0)
+    assert motor.histerese == 2.5
+    assert 'Aviso: histerese' in capsys.readouterr().out
+    # O mesmo valor efetivo não repete o aviso
+    motor.definir_limites(0.0, 10.0)
+    assert capsys.readouterr().out == ''
+    # Limites invertidos: sem histerese; limites largos: volta ao valor pedido
+    motor.definir_limites(10.0, 0.0)
+    assert motor.histerese == 0.0
+    motor.definir_limites(-50.0, 50.0)
+    assert motor.histerese == 5.0
+
+    # Com a histerese limitada, o alerta continua a poder terminar
+    buffer = registry.obter(('g', 's'))
+    motor = MotorAlertas(0.0, 10.0, histerese=20.0, atraso=0.0)
+    assert len(_avaliar(motor, buffer, [0.0], [11.0])) == 1
+    eventos = _avaliar(motor, buffer, [1.0], [5.0])
+    assert [e.inicio for e in eventos] == [False]
+
+
+def test_limpar_devolve_os_alertas_ativos(registry):
+    quente = registry.obter(('g', 'quente'))
+    frio = registry.obter(('g', 'frio'))
+    normal = registry.obter(('g', 'normal'))
+    motor = MotorAlertas(0.0, 10.0, atraso=0.0)
+    _avaliar(motor, quente, [0.0], [20.0])
+    _avaliar(motor, frio, [0.0], [-5.0])
+    _avaliar(motor, normal, [0.0], [5.0])
+    assert sorted(motor.limpar()) == [(('g', 'frio'), MOTIVO_MINIMO), (('g', 'quente'), MOTIVO_MAXIMO)]
+    assert motor.estado(quente.chave) is None
+    assert motor.limpar() == []
+    # Depois de limpar, um sensor ainda fora dos limites volta a gerar o início
+    eventos = _avaliar(motor, quente, [1.0], [20.0])
+    assert [(e.inicio, e.motivo) for e in eventos] == [(True, MOTIVO_MAXIMO)]
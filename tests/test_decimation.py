@@ -0,0 +1,84 @@
+"""!
+@file test_decimation.py
+@brief Testes do DecimadorMinMax contra uma redução por coluna feita por força bruta.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from src.decimation import DecimadorMinMax
+
+
+def _referencia(tempos, valores, largura):
+    # Redução por força bruta: (coluna, mínimo, máximo) das amostras de cada coluna
+    colunas = {}
+    for tempo, valor in zip(tempos.tolist(), valores.tolist()):
+        colunas.setdefault(math.floor(tempo / largura), []).append(valor)
+    return [(coluna, min(v), max(v)) for coluna, v in sorted(colunas.items())]
+
+
+def _verificar(x, y, tempos, valores, janela, n_colunas):
+    largura = janela / n_colunas
+    esperado = _referencia(tempos, valores, largura)
+    colunas = np.round(x[0::2] / largura - 0.5).astype(np.int64).tolist()
+    assert x[0::2].tolist() == x[1::2].tolist()
+    # As colunas da janela, por ordem; antes delas, no máximo a coluna em cache
+    # onde a janela começa (já sem amostras na janela)
+    extra = len(colunas) - len(esperado)
+    assert extra in (0, 1)
+    assert colunas[extra:] == [coluna for coluna, _, _ in esperado]
+    if extra:
+        assert colunas[0] == math.floor((tempos[-1] - janela) / largura)
+    minimos, maximos = y[0::2].tolist()[extra:], y[1::2].tolist()[extra:]
+    # Exato em todas as colunas menos a primeira, que pode guardar amostras que já saíram da janela
+    assert minimos[1:] == [minimo for _, minimo, _ in esperado[1:]]
+    assert maximos[1:] == [maximo for _, _, maximo in esperado[1:]]
+    assert minimos[0] <= esperado[0][1] and maximos[0] >= esperado[0][2]
+    # No máximo dois pontos por coluna (mais a coluna parcial no início da janela)
+    assert len(x) <= 2 * (n_colunas + 1)
+
+
+@pytest.mark.parametrize('n_colunas', [1, 7, 300])
+@pytest.mark.parametrize('por_frame', [1, 13, 500])
+def test_contra_forca_bruta(n_colunas, por_frame):
+    rng = np.random.default_rng(n_colunas * 1000 + por_frame)
+    janela = 60.0
+    n = 6000
+    # Timestamps não decrescentes (com repetidos) e picos isolados
+    tempos = 1.7e9 + np.cumsum(rng.choice([0.0, 0.05, 0.1], n))
+    valores = rng.normal(size=n)
+    picos = rng.integers(0, n, 40)
+    valores[picos] = rng.choice([-1e6, 1e6], len(picos))
+
+    decimador = DecimadorMinMax(janela)
+    # O decimador corre em todos os frames; a força bruta só em ~200 deles
+    verificar_a_cada = max(1, n // por_frame // 200)
+    for frame, fim in enumerate(range(por_frame, n + 1, por_frame)):
+        inicio = int(np.searchsorted(tempos[:fim], tempos[fim - 1] - janela, side='left'))
+        t, v = tempos[inicio:fim], valores[inicio:fim]
+        x, y = decimador.decimar(t, v, n_colunas)
+        if len(v) <= 2 * n_colunas:
+            # Série pequena: devolvida sem cópia
+            assert x is t and y is v
+            continue
+        if frame % verificar_a_cada:
+            continue
+        _verificar(x, y, t, v, janela, n_colunas)
+        # Os picos dentro da janela nunca se perdem
+        for pico in picos[(picos >= inicio) & (picos < fim)]:
+            assert valores[pico] in y
+
+
+def test_mudanca_de_colunas_limpa_a_cache():
+    tempos = 1.7e9 + np.arange(5000) * 0.01
+    valores = np.sin(tempos)
+    decimador = DecimadorMinMax(10.0)
+    decimador.decimar(tempos[:2000], valores[:2000], 50)
+    assert decimador.memoria() > 0
+    janela = tempos >= tempos[-1] - 10.0
+    x, y = decimador.decimar(tempos[janela], valores[janela], 20)
+    _verificar(x, y, tempos[janela], valores[janela], 10.0, 20)
+    decimador.limpar()
+    assert decimador.memoria() == 0
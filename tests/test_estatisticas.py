@@ -0,0 +1,95 @@
+"""!
+@file test_estatisticas.py
+@brief Testes das estatísticas móveis contra um cálculo por força bruta.
+"""
+
+import numpy as np
+import pytest
+
+from src.estatisticas import EstatisticasSensor, parse_janelas
+
+JANELAS = (5.0, 60.0, 300.0)
+T0 = 1.76e9
+
+
+def _sinais(n, rng):
+    tempos = T0 + np.cumsum(rng.uniform(0.05, 0.15, n))
+    return {
+        'passeio': (tempos, np.cumsum(rng.normal(0.0, 1.0, n))),
+        'crescente': (tempos, np.arange(n, dtype=np.float64)),
+        'decrescente': (tempos, -np.arange(n, dtype=np.float64)),
+        'empates': (tempos, rng.integers(0, 3, n).astype(np.float64)),
+    }
+
+
+def _verificar(estatisticas, tempos, valores):
+    for resumo in estatisticas.resumos():
+        mascara = tempos >= tempos[-1] - resumo.segundos
+        janela = valores[mascara]
+        assert resumo.n == len(janela)
+        assert resumo.minimo == janela.min()
+        assert resumo.maximo == janela.max()
+        assert resumo.media == pytest.approx(janela.mean(), rel=1e-9, abs=1e-9)
+        desvio = janela.std(ddof=1) if len(janela) > 1 else 0.0
+        assert resumo.desvio == pytest.approx(desvio, rel=1e-7, abs=1e-9)
+
+
+@pytest.mark.parametrize('sinal', ['passeio', 'crescente', 'decrescente', 'empates'])
+@pytest.mark.parametrize('lotes', [(1,), (1, 3, 20), (17, 300)])
+def test_janelas_iguais_a_forca_bruta(sinal, lotes):
+    rng = np.random.default_rng(len(sinal) * 100 + sum(lotes))
+    tempos, valores = _sinais(8000, rng)[sinal]
+    estatisticas = EstatisticasSensor(JANELAS)
+    i = 0
+    while i < len(valores):
+        k = int(rng.choice(lotes))
+        estatisticas.acrescentar(tempos[i:i + k], valores[i:i + k])
+        i = min(len(valores), i + k)
+        if rng.random() < 0.05 or i == len(valores):
+            _verificar(estatisticas, tempos[:i], valores[:i])
+
+
+def test_lotes_em_listas_iguais_a_arrays():
+    rng = np.random.default_rng(7)
+    tempos, valores = _sinais(2000, rng)['passeio']
+    com_listas = EstatisticasSensor(JANELAS)
+    com_arrays = EstatisticasSensor(JANELAS)
+    for i in range(0, len(valores), 5):
+        com_listas.acrescentar(tempos[i:i + 5].tolist(), valores[i:i + 5].tolist())
+        com_arrays.acrescentar(tempos[i:i + 5], valores[i:i + 5])
+    for a, b in zip(com_listas.resumos(), com_arrays.resumos()):
+        assert (a.n, a.minimo, a.maximo) == (b.n, b.minimo, b.maximo)
+        assert a.media == pytest.approx(b.media)
+
+
+def test_declive_de_reta():
+    tempos = T0 + np.arange(1000) * 0.1
+    estatisticas = EstatisticasSensor((10.0,))
+    estatisticas.acrescentar(tempos, 2.0 * (tempos - T0) + 5.0)
+    assert estatisticas.resumos()[0].declive == pytest.approx(2.0)
+
+
+def test_janela_vazia_e_amostra_unica():
+    estatisticas = EstatisticasSensor((10.0,))
+    resumo = estatisticas.resumos()[0]
+    assert (resumo.n, resumo.minimo, resumo.media, resumo.declive) == (0, None, None, None)
+    estatisticas.acrescentar([T0], [3.0])
+    resumo = estatisticas.resumos()[0]
+    assert (resumo.n, resumo.minimo, resumo.maximo, resumo.desvio) == (1, 3.0, 3.0, 0.0)
+
+
+def test_memoria_nao_cresce_com_o_tempo():
+    estatisticas = EstatisticasSensor((60.0,))
+    tempos = T0 + np.arange(200000) * 0.1
+    valores = np.sin(tempos / 10.0)
+    for i in range(0, len(tempos), 100):
+        estatisticas.acrescentar(tempos[i:i + 100], valores[i:i + 100])
+        if i == 20000:
+            memoria = estatisticas.memoria()
+    assert estatisticas.memoria() <= 2 * memoria
+
+
+def test_parse_janelas():
+    assert parse_janelas('900, 60,60') == (60.0, 900.0)
+    with pytest.raises(ValueError):
+        parse_janelas('60, -1')
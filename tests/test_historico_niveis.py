@@ -0,0 +1,55 @@
+"""!
+@file test_historico_niveis.py
+@brief Testes do histórico em níveis (consultas por intervalo).
+"""
+
+import numpy as np
+import pytest
+
+from src.historico_niveis import HistoricoNiveis
+
+
+def _historico(n, semente):
+    rng = np.random.default_rng(semente)
+    tempos = 1.7e9 + np.cumsum(rng.random(n) * 2)
+    valores = rng.normal(size=n)
+    historico = HistoricoNiveis(3600, 500, (1.0, 60.0))
+    i = 0
+    while i < n:
+        k = int(rng.integers(1, 50))
+        historico.extend(tempos[i:i + k], valores[i:i + k])
+        i += k
+    return historico, tempos
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_depois_de_igual_a_janela(semente):
+    historico, tempos = _historico(3000, semente)
+    t_janela, _ = historico.janela(tempos[-1] - 3600, media=True)
+    # Início antes de tudo, no meio do bruto e exatamente sobre pontos agregados/brutos
+    inicios = [tempos[0] - 5, tempos[-100], t_janela[0], t_janela[len(t_janela) // 2], t_janela[-1]]
+    for t_inicio in inicios:
+        esperado_t, esperado_v = historico.janela(t_inicio, media=True)
+        primeiro = int(esperado_t.searchsorted(t_inicio, side='right'))
+        for maximo in (1, 7, 400, 100000):
+            t, v, truncado = historico.depois_de(t_inicio, maximo)
+            assert np.array_equal(t, esperado_t[primeiro:primeiro + maximo])
+            assert np.array_equal(v, esperado_v[primeiro:primeiro + maximo])
+            assert truncado == (len(esperado_t) - primeiro > maximo)
+
+
+def test_depois_de_vazio():
+    historico = HistoricoNiveis(3600, 500, (1.0, 60.0))
+    t, v, truncado = historico.depois_de(0.0, 10)
+    assert len(t) == len(v) == 0 and not truncado
+
+
+def test_janela_media_com_larguras():
+    historico, tempos = _historico(3000, 7)
+    t_inicio = tempos[-1] - 3600
+    esperado_t, esperado_v = historico.janela(t_inicio, media=True)
+    t, v, larguras = historico.janela_media(t_inicio)
+    assert np.array_equal(t, esperado_t) and np.array_equal(v, esperado_v)
+    brutos = len(historico.bruto.desde(t_inicio)[0])
+    assert brutos and not larguras[-brutos:].any()
+    assert set(larguras[:-brutos].tolist()) <= {1.0, 60.0} and len(larguras) > brutos
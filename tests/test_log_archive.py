@@ -0,0 +1,37 @@
+"""!
+@file test_log_archive.py
+@brief Testes do log binário e da lista de ficheiros rodados.
+"""
+
+import math
+
+from src.log_archive import ArchiveReader, ArchiveWriter, arquivos_rotacionados
+
+
+def test_arquivos_rotacionados_so_aceita_o_padrao(tmp_path):
+    nomes = ['log.csv', 'log.backup.csv', 'log.20250101-000000-000.csv',
+             'log.x.20250101-000000-000Z.csv', 'log.20250101-000000-000Z.csv.tmp',
+             'log.20250101-000000-000Z.csv', 'log.20240101-120000-999Z.csv']
+    for nome in nomes:
+        (tmp_path / nome).touch()
+    caminhos = arquivos_rotacionados(str(tmp_path / 'log.csv'))
+    assert [caminho.rsplit('/', 1)[-1] for caminho in caminhos] == [
+        'log.20240101-120000-999Z.csv', 'log.20250101-000000-000Z.csv', 'log.csv']
+
+
+def test_linhas_sem_tempo_descartadas(tmp_path):
+    caminho = str(tmp_path / 'log.slog')
+    writer = ArchiveWriter(caminho)
+    aceites = writer.writerows([
+        [1.7e9, 'g', 's', 1.0, 'C'],
+        [math.nan, 'g', 's', 2.0, 'C'],
+        ['lixo', 'g', 's', 3.0, 'C'],
+        [math.inf, 'g', 's', 4.0, 'C'],
+        ['2023-11-14T22:13:21Z', 'g', 's', 5.0, 'C'],
+    ])
+    writer.close()
+    assert aceites == 2 and writer.linhas_sem_tempo == 3
+    dados = ArchiveReader(caminho).carregar()
+    tempos, valores = dados[('g', 's', 'C')]
+    assert tempos.tolist() == [1.7e9, 1.7e9 + 1] and valores.tolist() == [1.0, 5.0]
+    assert ArchiveReader(caminho).intervalo() == (1.7e9, 1.7e9 + 1)
@@ -0,0 +1,89 @@
+"""!
+@file test_orcamento_memoria.py
+@brief Testes do orçamento de memória (MEMORIA_MB) e dos níveis agregados do histórico.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from src.historico_niveis import HistoricoNiveis, INICIO, CONTAGEM, MINIMO, MAXIMO, MEDIA
+from src.sensor_registry import SensorRegistry
+
+MB = 1024 * 1024
+JANELA = 86400.0
+LARGURAS = (1.0, 60.0)
+
+
+def _alocado(registry):
+    return (registry.memoria_reservada
+            + sum(buffer.historico.memoria() + buffer.memoria_extra for buffer in registry))
+
+
+@pytest.mark.parametrize('memoria_maxima', [1 * MB, 4 * MB])
+def test_orcamento_respeitado_ao_acrescentar_sensores(memoria_maxima):
+    registry = SensorRegistry(100000, JANELA, LARGURAS, memoria_maxima,
+                              tamanho_minimo=10, memoria_reservada=100000)
+    tempos = 1.7e9 + np.arange(200) * 0.5
+    for i in range(150):
+        buffer = registry.obter(('g', f's{i}'))
+        # Dados e memória extra (estatísticas, decimador) não podem furar o orçamento
+        buffer.historico.extend(tempos, np.sin(tempos))
+        registry.reajustar(buffer, 256 + 8 * i)
+        assert registry.memoria_total == _alocado(registry)
+        assert registry.memoria_historicos == sum(b.historico.memoria() for b in registry)
+        assert registry.memoria_total <= memoria_maxima
+
+
+def test_dados_nao_alocam_memoria():
+    registry = SensorRegistry(1000, JANELA, LARGURAS, 2 * MB)
+    buffer = registry.obter(('g', 's'))
+    antes = registry.memoria_total
+    for inicio in range(0, 50000, 500):
+        tempos = 1.7e9 + np.arange(inicio, inicio + 500, dtype=np.float64)
+        buffer.historico.extend(tempos, tempos)
+    assert buffer.historico.memoria() + registry.memoria_reservada == antes == _alocado(registry)
+
+
+def test_orcamento_impossivel_avisa_e_fica_no_minimo(capsys):
+    registry = SensorRegistry(100000, JANELA, LARGURAS, 64 * 1024, tamanho_minimo=10)
+    for i in range(100):
+        registry.obter(('g', f's{i}'))
+    assert 'Aviso: MEMORIA_MB' in capsys.readouterr().out
+    assert all(buffer.historico.memoria() == buffer.historico.minimo() for buffer in registry)
+
+
+def _referencia(tempos, valores, largura):
+    # Redução por força bruta: um intervalo por floor(t / largura)
+    grupos = {}
+    for tempo, valor in zip(tempos.tolist(), valores.tolist()):
+        grupos.setdefault(math.floor(tempo / largura), []).append(valor)
+    return [(indice * largura, len(v), min(v), max(v), sum(v) / len(v))
+            for indice, v in sorted(grupos.items())]
+
+
+@pytest.mark.parametrize('lotes', [(1,), (5, 13), (16, 100), (3, 700, 1)])
+def test_niveis_agregados_contra_forca_bruta(lotes):
+    rng = np.random.default_rng(len(lotes))
+    n = 20000
+    tempos = 1.7e9 + np.cumsum(rng.exponential(0.05, n))
+    valores = rng.normal(size=n) * 10
+    valores[rng.integers(0, n, 20)] = 1e6   # picos
+    historico = HistoricoNiveis(JANELA, 500, LARGURAS)
+    i = 0
+    while i < n:
+        for tamanho in lotes:
+            historico.extend(tempos[i:i + tamanho], valores[i:i + tamanho])
+            i += tamanho
+
+    for nivel in historico.niveis:
+        linhas = nivel.intervalos(-math.inf, math.inf)
+        esperado = _referencia(tempos, valores, nivel.largura)
+        assert linhas.shape[1] == len(esperado)
+        obtido = np.array(esperado).T
+        np.testing.assert_array_equal(linhas[INICIO], obtido[0])
+        np.testing.assert_array_equal(linhas[CONTAGEM], obtido[1])
+        np.testing.assert_array_equal(linhas[MINIMO], obtido[2])
+        np.testing.assert_array_equal(linhas[MAXIMO], obtido[3])
+        np.testing.assert_allclose(linhas[MEDIA], obtido[4], rtol=1e-9, atol=1e-9)
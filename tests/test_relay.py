@@ -0,0 +1,119 @@
+"""!
+@file test_relay.py
+@brief Testes do RelayUDP sobre um socket de loopback (tamanho dos datagramas, amostras entregues, modo bruto).
+"""
+
+import json
+import socket
+
+import numpy as np
+import pytest
+
+from src.relay import RelayUDP, MODO_BRUTO, MODO_LOTE
+from src.wire_format import MAGIC_BINARIO, codificar_binario, decodificar_datagrama
+
+SENSORES = {1: ('grupo6', 'SensorDeTemperatura', '°C'), 2: ('grupo6', 'Pressao', 'bar')}
+
+
+@pytest.fixture
+def recetor():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(1.0)
+    yield sock
+    sock.close()
+
+
+def _receber(sock, n):
+    return [sock.recv(65535) for _ in range(n)]
+
+
+def _pacotes(n, inicio=0):
+    # Sensores binários (1 e 2) misturados com sensores só em JSON
+    pacotes = []
+    for i in range(inicio, inicio + n):
+        group, sensor_id, unidade = SENSORES[1 + i % 2] if i % 3 else ('grupo7', f'json{i % 5}', 'V')
+        pacotes.append({'group': group, 'sensor_id': sensor_id, 'value': float(np.sin(i)) * 100,
+                        'unit': unidade, 'ts_epoch': 1.7e9 + i * 0.001})
+    return pacotes
+
+
+def _chave(pacote):
+    # Valor em float32 e timestamp em milissegundos no formato binário
+    return (pacote['group'], pacote['sensor_id'], float(np.float32(pacote['value'])),
+            round(pacote['ts_epoch'] * 1000))
+
+
+@pytest.mark.parametrize('bytes_datagrama', [60, 512, 1400])
+def test_lote_respeita_o_tamanho_e_entrega_todas_as_amostras(recetor, bytes_datagrama):
+    relay = RelayUDP([recetor.getsockname()], modo=MODO_LOTE, sensores_binarios=SENSORES,
+                     bytes_datagrama=bytes_datagrama, intervalo=10.0)
+    enviados = []
+    recebidos = []
+    for lote in range(40):
+        pacotes = _pacotes(25, lote * 25)
+        relay.reenviar(b'', pacotes)
+        enviados.extend(pacotes)
+        recebidos.extend(_receber(recetor, relay.datagramas_enviados - len(recebidos)))
+    # O prazo ainda não passou: os pendentes só saem ao fechar
+    relay.enviar_vencidos()
+    relay.fechar()
+    recebidos.extend(_receber(recetor, relay.datagramas_enviados - len(recebidos)))
+
+    assert relay.datagramas_nao_enviados == 0
+    assert relay.amostras_reenviadas == len(enviados)
+    entregues = []
+    for datagrama in recebidos:
+        pacotes = decodificar_datagrama(datagrama, SENSORES)
+        # Só um pacote JSON maior que o limite (que não se pode partir) o ultrapassa
+        assert len(datagrama) <= bytes_datagrama or len(pacotes) == 1
+        # Cada datagrama leva só um formato: binário para os sensores de SENSORES
+        binario = datagrama[0] == MAGIC_BINARIO
+        assert all(((p['group'], p['sensor_id']) in {(g, s) for g, s, _ in SENSORES.values()}) == binario
+                   for p in pacotes)
+        entregues.extend(pacotes)
+    assert sorted(map(_chave, entregues)) == sorted(map(_chave, enviados))
+
+
+def test_lote_valor_fora_do_float32_segue_em_json(recetor):
+    relay = RelayUDP([recetor.getsockname()], sensores_binarios=SENSORES)
+    pacote = {'group': 'grupo6', 'sensor_id': 'Pressao', 'value': 1e39, 'unit': 'bar',
+              'ts_epoch': 1.7e9}
+    relay.reenviar(b'', [pacote])
+    relay.fechar()
+    datagrama, = _receber(recetor, 1)
+    assert json.loads(datagrama) == [pacote]
+
+
+def test_lote_envia_quando_o_prazo_passa(recetor):
+    relay = RelayUDP([recetor.getsockname()], sensores_binarios=SENSORES, intervalo=0.0)
+    assert relay.espera() is None
+    relay.reenviar(b'', _pacotes(2, 1))
+    assert relay.espera() == 0.0
+    relay.enviar_vencidos()
+    assert relay.espera() is None and relay.datagramas_enviados == 1
+    assert len(decodificar_datagrama(_receber(recetor, 1)[0], SENSORES)) == 2
+    relay.fechar()
+
+
+def test_bruto_reenvia_os_datagramas_sem_alteracoes(recetor):
+    outro = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    outro.bind(('127.0.0.1', 0))
+    outro.settimeout(1.0)
+    try:
+        relay = RelayUDP([recetor.getsockname(), outro.getsockname()], modo=MODO_BRUTO,
+                         sensores_binarios=SENSORES, bytes_datagrama=60)
+        datagramas = [codificar_binario([(1, 21.5, 1.7e9), (2, 1.01, 1.7e9 + 0.5)]),
+                      json.dumps(_pacotes(30)).encode('utf-8'),
+                      json.dumps({'group': 'g', 'sensor_id': 's', 'value': 1}).encode('utf-8')]
+        for datagrama in datagramas:
+            relay.reenviar(datagrama, decodificar_datagrama(datagrama, SENSORES))
+        relay.fechar()
+        # Cada destino recebe os mesmos bytes, pela mesma ordem, mesmo acima de bytes_datagrama
+        assert _receber(recetor, 3) == datagramas
+        assert _receber(outro, 3) == datagramas
+        assert relay.datagramas_enviados == 6 and relay.datagramas_nao_enviados == 0
+        assert relay.amostras_reenviadas == 2 + 30 + 1
+    finally:
+        outro.close()
@@ -0,0 +1,101 @@
+"""!
+@file test_ring_buffer.py
+@brief Testes do RingBuffer contra um deque de referência (volta do buffer, capacidade 1).
+"""
+
+from collections import deque
+
+import numpy as np
+import pytest
+
+from src.ring_buffer import RingBuffer
+
+
+def _verificar(buffer, referencia):
+    tempos = [t for t, _ in referencia]
+    valores = [v for _, v in referencia]
+    assert len(buffer) == len(referencia)
+    assert buffer.tempos().tolist() == tempos
+    assert buffer.valores().tolist() == valores
+    assert buffer.ultimo() == (referencia[-1] if referencia else None)
+    for indice in range(-len(referencia), len(referencia)):
+        assert buffer.amostra(indice) == referencia[indice]
+    for corte in (-1.0, *tempos[::3], tempos[-1] + 1.0 if tempos else 0.0):
+        esperado = [(t, v) for t, v in referencia if t >= corte]
+        t_desde, v_desde = buffer.desde(corte)
+        assert list(zip(t_desde.tolist(), v_desde.tolist())) == esperado
+
+
+@pytest.mark.parametrize('capacidade', [1, 2, 5, 16])
+@pytest.mark.parametrize('lotes', [(1,), (1, 3), (4, 7, 1), (20,), (2, 33)])
+def test_contra_deque(capacidade, lotes):
+    buffer = RingBuffer(capacidade)
+    referencia = deque(maxlen=capacidade)
+    proximo = 0
+    # Várias voltas, alternando append e extend de vários tamanhos (incluindo > capacidade)
+    for _ in range(6):
+        for tamanho in lotes:
+            amostras = [(float(proximo + i), float(-(proximo + i))) for i in range(tamanho)]
+            proximo += tamanho
+            if tamanho == 1:
+                buffer.append(*amostras[0])
+            else:
+                buffer.extend([t for t, _ in amostras], [v for _, v in amostras])
+            referencia.extend(amostras)
+            _verificar(buffer, referencia)
+
+
+def test_capacidade_um():
+    buffer = RingBuffer(1)
+    assert buffer.ultimo() is None and len(buffer.tempos()) == 0
+    assert buffer.desde(0.0)[0].size == 0
+    with pytest.raises(IndexError):
+        buffer.amostra(0)
+    buffer.append(1.0, 10.0)
+    buffer.append(2.0, 20.0)
+    assert buffer.amostra(0) == buffer.amostra(-1) == buffer.ultimo() == (2.0, 20.0)
+    buffer.extend([3.0, 4.0, 5.0], [30.0, 40.0, 50.0])
+    assert buffer.tempos().tolist() == [5.0] and buffer.valores().tolist() == [50.0]
+    assert buffer.desde(5.0)[1].tolist() == [50.0] and buffer.desde(5.5)[1].size == 0
+    with pytest.raises(IndexError):
+        buffer.amostra(1)
+    with pytest.raises(IndexError):
+        buffer.amostra(-2)
+
+
+def test_extend_vazio_e_maior_que_a_capacidade():
+    buffer = RingBuffer(4)
+    buffer.extend([], [])
+    assert len(buffer) == 0
+    buffer.extend(np.arange(3.0), np.arange(3.0))
+    buffer.extend(np.arange(3.0, 13.0), np.arange(3.0, 13.0) * 2)
+    assert buffer.tempos().tolist() == [9.0, 10.0, 11.0, 12.0]
+    assert buffer.valores().tolist() == [18.0, 20.0, 22.0, 24.0]
+    buffer.append(13.0, 26.0)
+    assert buffer.tempos().tolist() == [10.0, 11.0, 12.0, 13.0]
+
+
+def test_views_so_de_leitura_e_contiguas():
+    buffer = RingBuffer(3)
+    buffer.extend([1.0, 2.0, 3.0, 4.0], [1.0, 2.0, 3.0, 4.0])
+    tempos = buffer.tempos()
+    assert tempos.flags.c_contiguous and not tempos.flags.writeable
+    with pytest.raises(ValueError):
+        tempos[0] = 0.0
+
+
+def test_descartar_limpar_e_redimensionar():
+    buffer = RingBuffer(5)
+    buffer.extend(np.arange(8.0), np.arange(8.0))
+    buffer.descartar_antigas(2)
+    assert buffer.tempos().tolist() == [5.0, 6.0, 7.0]
+    buffer.redimensionar(2)
+    assert buffer.capacidade == 2 and buffer.tempos().tolist() == [6.0, 7.0]
+    buffer.redimensionar(6)
+    buffer.extend([8.0, 9.0], [8.0, 9.0])
+    assert buffer.tempos().tolist() == [6.0, 7.0, 8.0, 9.0]
+    buffer.descartar_antigas(10)
+    assert len(buffer) == 0 and buffer.ultimo() is None
+    buffer.append(1.0, 1.0)
+    buffer.limpar()
+    assert len(buffer) == 0 and buffer.memoria() == 6 * 2 * 2 * 8
@@ -0,0 +1,43 @@
+"""!
+@file test_timestamps.py
+@brief Testes da conversão ISO 8601 <-> epoch (caminho rápido e validação).
+"""
+
+import pytest
+
+from src.timestamps import ConversorTimestamp
+
+
+@pytest.mark.parametrize('ts, esperado', [
+    ("2025-11-09T21:38:26Z", 1762724306.0),
+    ("2025-11-09T21:38:26.250Z", 1762724306.25),
+    ("2024-02-29T00:00:00Z", 1709164800.0),
+    ("2025-11-09T21:38:26+01:00", 1762720706.0),
+    (1762724306, 1762724306.0),
+])
+def test_validos(ts, esperado):
+    assert ConversorTimestamp().para_epoch(ts) == esperado
+
+
+@pytest.mark.parametrize('ts', [
+    "2025x11x09T21:38:26Z",
+    "2025-11-40T21:38:26Z",
+    "2025-13-09T21:38:26Z",
+    "2025-02-29T00:00:00Z",
+    "2025-11-09T25:38:26Z",
+    "2025-11-09T21:60:26Z",
+    "2025-11-09T21:38:60Z",
+    "2025-11-09T21:38:26.-12Z",
+    "2025-+1-09T21:38:26Z",
+    "abc",
+    True,
+    None,
+])
+def test_invalidos(ts):
+    assert ConversorTimestamp().para_epoch(ts) is None
+
+
+def test_ida_e_volta():
+    conversor = ConversorTimestamp()
+    for ts in ("2025-11-09T21:38:26Z", "2025-11-09T21:38:26.250Z"):
+        assert conversor.para_iso(conversor.para_epoch(ts)) == ts
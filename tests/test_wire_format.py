@@ -0,0 +1,91 @@
+"""!
+@file test_wire_format.py
+@brief Testes dos formatos dos datagramas: ida e volta do binário, JSON e datagramas inválidos.
+"""
+
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from src.wire_format import (
+    FORMATO_CABECALHO, MAGIC_BINARIO, MAXIMO_AMOSTRAS_DATAGRAMA, TAMANHO_AMOSTRA,
+    TAMANHO_CABECALHO, VERSAO_BINARIO, codificar_binario, decodificar_binario,
+    decodificar_datagrama, parse_sensores_binarios
+)
+
+SENSORES = {1: ('grupo6', 'SensorDeTemperatura', '°C'), 2: ('grupo6', 'Pressao', 'bar')}
+
+
+@pytest.mark.parametrize('n', [0, 1, 3, MAXIMO_AMOSTRAS_DATAGRAMA])
+def test_binario_ida_e_volta(n):
+    rng = np.random.default_rng(n)
+    amostras = [(int(rng.choice([1, 2, 7])), float(rng.normal() * 100), 1.7e9 + i * 0.001)
+                for i in range(n)]
+    datagrama = codificar_binario(amostras)
+    assert len(datagrama) == TAMANHO_CABECALHO + n * TAMANHO_AMOSTRA
+    pacotes = decodificar_datagrama(datagrama, SENSORES)
+    assert len(pacotes) == n
+    for (indice, valor, ts_epoch), pacote in zip(amostras, pacotes):
+        group, sensor_id, unidade = SENSORES.get(indice, ('bin', str(indice), ''))
+        assert (pacote['group'], pacote['sensor_id'], pacote['unit']) == (group, sensor_id, unidade)
+        # Valor em float32 e timestamp em milissegundos
+        assert pacote['value'] == float(np.float32(valor))
+        assert pacote['ts_epoch'] == round(ts_epoch * 1000) / 1000.0
+
+
+def test_binario_demasiadas_amostras():
+    with pytest.raises(ValueError):
+        codificar_binario([(1, 0.0, 1.7e9)] * (MAXIMO_AMOSTRAS_DATAGRAMA + 1))
+
+
+def test_binario_magic_invalido():
+    datagrama = bytearray(codificar_binario([(1, 1.0, 1.7e9)]))
+    datagrama[0] = 0x5A
+    with pytest.raises(ValueError):
+        decodificar_binario(bytes(datagrama), SENSORES)
+    # Sem o magic, o datagrama é tratado como JSON (e rejeitado)
+    with pytest.raises(ValueError):
+        decodificar_datagrama(bytes(datagrama), SENSORES)
+
+
+def test_binario_versao_invalida():
+    datagrama = struct.pack(FORMATO_CABECALHO, MAGIC_BINARIO, VERSAO_BINARIO + 1, 0)
+    with pytest.raises(ValueError):
+        decodificar_datagrama(datagrama, SENSORES)
+
+
+@pytest.mark.parametrize('corte', [1, TAMANHO_CABECALHO - 1, TAMANHO_CABECALHO,
+                                   TAMANHO_CABECALHO + TAMANHO_AMOSTRA - 1, -1])
+def test_binario_truncado(corte):
+    datagrama = codificar_binario([(1, 1.0, 1.7e9), (2, 2.0, 1.7e9 + 1)])
+    with pytest.raises(ValueError):
+        decodificar_datagrama(datagrama[:corte], SENSORES)
+
+
+def test_binario_com_bytes_a_mais():
+    datagrama = codificar_binario([(1, 1.0, 1.7e9)])
+    with pytest.raises(ValueError):
+        decodificar_datagrama(datagrama + b'\x00', SENSORES)
+
+
+def test_json_objeto_e_lista():
+    pacote = {'group': 'g', 'sensor_id': 's', 'value': 1.5, 'unit': 'C', 'ts': '2025-11-09T21:38:26Z'}
+    assert decodificar_datagrama(json.dumps(pacote).encode('utf-8'), {}) == [pacote]
+    lista = [pacote, dict(pacote, value=2.5)]
+    assert decodificar_datagrama(json.dumps(lista).encode('utf-8'), {}) == lista
+
+
+@pytest.mark.parametrize('datagrama', [b'', b'{', b'42', b'"texto"', b'[1, {}]', b'\xff\xfe{}'])
+def test_json_invalido(datagrama):
+    with pytest.raises(ValueError):
+        decodificar_datagrama(datagrama, {})
+
+
+def test_parse_sensores_binarios():
+    secao = {'1': 'grupo6, SensorDeTemperatura, °C', '2': ' grupo6 ,Pressao'}
+    assert parse_sensores_binarios(secao) == {1: ('grupo6', 'SensorDeTemperatura', '°C'),
+                                              2: ('grupo6', 'Pressao', '')}
+    with pytest.raises(ValueError):
+        parse_sensores_binarios({'3': 'so_o_grupo'})